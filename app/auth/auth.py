@@ -7,7 +7,7 @@ from jose import jwt, JWTError
 
 from app.config import Config
 
-from fastapi_oidc import get_auth
+from app.auth.tokens import OIDCAuthenticator
 from typing import Callable
 
 config = Config()
@@ -17,12 +17,16 @@ OIDC_config = {
     "issuer": os.getenv("OIDC_AUTHORITY", "https://some.authority"),
     "client_id": os.getenv("OIDC_FRONTEND_CLIENT_ID", "client-frontend-local"),
     "base_authorization_server_uri": os.getenv("BASE_AUTHORIZATION_SERVER_URI"),
-    "signature_cache_ttl": 3600,
+    "token_cache_size": Config.AUTH_TOKEN_CACHE_SIZE,
+    "jwks_min_refresh_interval": Config.AUTH_JWKS_MIN_REFRESH_INTERVAL,
     #"validate_access_token": True,
     #"client_secret": os.getenv("OIDC_BACKEND_CLIENT_SECRET", "")
 }
 
-authenticate_user: Callable = get_auth(**OIDC_config)
+# Validates each token once and caches it until it expires; signing keys are loaded at
+# startup and refreshed in the background (see app.main)
+authenticator = OIDCAuthenticator(**OIDC_config)
+authenticate_user: Callable = authenticator.dependency()
 
 
 
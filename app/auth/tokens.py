@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from fastapi import Depends, HTTPException, Response
+from fastapi.security import OpenIdConnect
+from fastapi_oidc.types import IDToken
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from app.services.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    """
+    The issuer's signing keys, constructed once per key rather than once per request.
+
+    ``refresh`` runs at startup and in the background; a token signed with an unknown
+    ``kid`` (key rotation) triggers an early refresh, at most once per
+    ``min_refresh_interval`` seconds so made-up kids cannot hammer the issuer.
+    """
+
+    def __init__(self, base_authorization_server_uri: str, min_refresh_interval: float = 30,
+                 client: Optional[httpx.AsyncClient] = None):
+        self.base_uri = base_authorization_server_uri
+        self.min_refresh_interval = min_refresh_interval
+        self.client = client
+
+        self.keys: Dict[Optional[str], Key] = {}
+        self.algorithms = ["RS256"]
+        self.refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._refresh_lock = asyncio.Lock()
+        self._attempted_at = 0.0
+        self._forced_at = float("-inf")
+
+    async def _get_json(self, url: str) -> Dict[str, Any]:
+        response = await (self.client or get_http_client()).get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def refresh(self) -> None:
+        """Fetch discovery and JWKS and swap in the new keys; raises if the issuer is unreachable."""
+        self._attempted_at = time.monotonic()
+        try:
+            discovery = await self._get_json(f"{self.base_uri}/.well-known/openid-configuration")
+            jwks = await self._get_json(discovery["jwks_uri"])
+            algorithms = discovery.get("id_token_signing_alg_values_supported") or self.algorithms
+            keys = {}
+            for key in jwks.get("keys", []):
+                if key.get("use", "sig") != "sig":
+                    continue
+                try:
+                    keys[key.get("kid")] = jwk.construct(key, key.get("alg", algorithms[0]))
+                except JWTError as e:
+                    logger.warning(f"Skipping JWKS key '{key.get('kid')}': {e}")
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+
+        self.keys, self.algorithms = keys, algorithms
+        self.refreshed_at = time.monotonic()
+        self.refreshes += 1
+        self.last_error = None
+        logger.info(f"Loaded {len(keys)} signing key(s) from the identity provider")
+
+    async def refresh_for_unknown_key(self) -> None:
+        """Refresh unless one was forced recently; concurrent callers share one fetch."""
+        attempted = self._attempted_at
+        async with self._refresh_lock:
+            if self._attempted_at != attempted or time.monotonic() - self._forced_at < self.min_refresh_interval:
+                return
+            self._forced_at = time.monotonic()
+            await self.refresh()
+
+    def key_for(self, kid: Optional[str]):
+        """The key for ``kid``; every key when the token names none, None when unknown."""
+        if kid is None:
+            return list(self.keys.values()) or None
+        return self.keys.get(kid)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "keys": [kid for kid in self.keys],
+            "algorithms": self.algorithms,
+            "age": round(time.monotonic() - self.refreshed_at) if self.refreshed_at else None,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+
+class TokenCache:
+    """
+    Validated tokens keyed by SHA-256 of the raw token, each kept until its ``exp``.
+
+    Least recently used entries are dropped beyond ``max_entries``, and entries signed by
+    a key that has left the JWKS are dropped on the next lookup.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[IDToken, float, Optional[str]]]" = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token_key: str, keys: Dict[Optional[str], Key]) -> Optional[IDToken]:
+        entry = self._entries.get(token_key)
+        if entry is None:
+            return None
+        claims, expires_at, kid = entry
+        if time.time() >= expires_at or (kid is not None and kid not in keys):
+            del self._entries[token_key]
+            return None
+        self._entries.move_to_end(token_key)
+        return claims
+
+    def set(self, token_key: str, claims: IDToken, expires_at: float, kid: Optional[str]) -> None:
+        self._entries[token_key] = (claims, expires_at, kid)
+        self._entries.move_to_end(token_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AuthMetrics:
+    """Count, total and max auth time per outcome (cache_hit, verified, rejected, unavailable)."""
+
+    def __init__(self):
+        self.outcomes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, outcome: str, seconds: float) -> None:
+        stats = self.outcomes.setdefault(outcome, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        ms = seconds * 1000
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            outcome: {
+                "count": stats["count"],
+                "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_ms": round(stats["max_ms"], 3)
+            }
+            for outcome, stats in self.outcomes.items()
+        }
+
+
+class OIDCAuthenticator:
+    """
+    Drop-in replacement for ``fastapi_oidc.get_auth`` that validates each token once.
+
+    The checks are the same - signature against the issuer's JWKS, audience, issuer and
+    expiry - but the result is cached until the token expires, keys are fetched ahead of
+    time instead of inside a request, and verification never blocks on the network unless
+    a token names a key that has not been seen yet.
+    """
+
+    def __init__(self, *, client_id: str, issuer: str, base_authorization_server_uri: str,
+                 audience: Optional[str] = None, token_cache_size: int = 10000,
+                 jwks_min_refresh_interval: float = 30, client: Optional[httpx.AsyncClient] = None,
+                 token_type=IDToken):
+        self.audience = audience or client_id
+        self.issuer = issuer
+        self.base_uri = base_authorization_server_uri
+        self.token_type = token_type
+        self.jwks = JWKSCache(base_authorization_server_uri, jwks_min_refresh_interval, client)
+        self.tokens = TokenCache(token_cache_size)
+        self.metrics = AuthMetrics()
+
+    def verify(self, token: str, key) -> IDToken:
+        claims = jwt.decode(
+            token,
+            key,
+            self.jwks.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            # Disabled at_hash check since we aren't using the access token
+            options={"verify_at_hash": False},
+        )
+        return self.token_type.model_validate(claims)
+
+    async def _validate(self, token: str) -> Tuple[str, IDToken]:
+        token_key = self.tokens.key(token)
+        claims = self.tokens.get(token_key, self.jwks.keys)
+        if claims is not None:
+            return "cache_hit", claims
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError as err:
+            raise HTTPException(status_code=401, detail=f"Unauthorized: {err}")
+
+        key = self.jwks.key_for(kid)
+        if key is None:
+            try:
+                await self.jwks.refresh_for_unknown_key()
+            except Exception as e:
+                logger.error(f"Could not load signing keys from the identity provider: {e}")
+            key = self.jwks.key_for(kid)
+            # Also when this request's refresh was skipped: without keys no token can be judged
+            if key is None and not self.jwks.keys and self.jwks.last_error:
+                raise HTTPException(status_code=503, detail="Identity provider unavailable")
+            if key is None:
+                raise HTTPException(status_code=401, detail="Unauthorized: Signing key not found")
+
+        try:
+            claims = self.verify(token, key)
+        except JWTError as err:
+            raise HTTPException(status_code=401, detail=f"Unauthorized: {err}")
+        self.tokens.set(token_key, claims, claims.exp, kid)
+        return "verified", claims
+
+    async def authenticate(self, token: str) -> IDToken:
+        start = time.perf_counter()
+        outcome = "rejected"
+        try:
+            outcome, claims = await self._validate(token)
+            return claims
+        except HTTPException as e:
+            if e.status_code == 503:
+                outcome = "unavailable"
+            raise
+        finally:
+            self.metrics.record(outcome, time.perf_counter() - start)
+
+    def dependency(self) -> Callable:
+        """The FastAPI dependency, documented in OpenAPI as an OpenID Connect scheme."""
+        oauth2_scheme = OpenIdConnect(
+            openIdConnectUrl=f"{self.base_uri}/.well-known/openid-configuration"
+        )
+
+        async def authenticate_user(response: Response, auth_header: str = Depends(oauth2_scheme)) -> IDToken:
+            start = time.perf_counter()
+            claims = await self.authenticate(auth_header.split(" ")[-1])
+            response.headers["Server-Timing"] = f"auth;dur={(time.perf_counter() - start) * 1000:.3f}"
+            return claims
+
+        return authenticate_user
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"cached_tokens": len(self.tokens), "timings": self.metrics.snapshot(), "jwks": self.jwks.snapshot()}
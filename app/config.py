@@ -1,4 +1,5 @@
 
+import json
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -8,6 +9,19 @@ class Config:
     LOG_LEVEL  = os.getenv('LOG_LEVEL', 'INFO').upper()
 
     MONGO_URI = os.getenv("MONGO_URI")
+    # Shared Mongo client: connection pool per worker, timeouts in milliseconds (a socket timeout
+    # of 0 waits indefinitely), and wire compressors in order of preference (those whose module
+    # is not installed are skipped with a warning; with none left, traffic is uncompressed).
+    # requirements.txt installs zstd only; snappy needs python-snappy, and zlib costs more CPU than
+    # it saves on a fast network, so either is only used when listed here
+    MONGO_APP_NAME = os.getenv("MONGO_APP_NAME", "ride-console-api")
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+    MONGO_COMPRESSORS = [c.strip() for c in os.getenv("MONGO_COMPRESSORS", "zstd").split(",") if c.strip()]
     API_PATH = os.getenv("API_PATH", "/api/v1")
     OIDC_AUTHORITY = os.getenv("OIDC_AUTHORITY", "https://some.authority")
     OIDC_FRONTEND_CLIENT_ID = os.getenv("OIDC_FRONTEND_CLIENT_ID", "client-frontend-local")
@@ -17,7 +31,109 @@ class Config:
     OIDC_BACKEND_CLIENT_SECRET=os.getenv("OIDC_BACKEND_CLIENT_SECRET", "")
     BASE_AUTHORIZATION_SERVER_URI=os.getenv("BASE_AUTHORIZATION_SERVER_URI", "BASE_AUTHORIZATION_SERVER_URI")
     VITE_GRAFANA_URL= os.getenv("VITE_GRAFANA_URL",'')
+    # Token validation: validated tokens cached until they expire, seconds between background
+    # JWKS refreshes, and least seconds between refreshes forced by an unknown signing key
+    AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+    AUTH_JWKS_REFRESH_INTERVAL = int(os.getenv("AUTH_JWKS_REFRESH_INTERVAL", "600"))
+    AUTH_JWKS_MIN_REFRESH_INTERVAL = int(os.getenv("AUTH_JWKS_MIN_REFRESH_INTERVAL", "30"))
 
+    # Seconds between background recounts of the materialised status counters, run by one worker
+    # at a time. Writes made through this API update the counters at once; documents the RIDE
+    # pipeline inserts into errors, mainstaging, errortable or errorstaging are only counted by
+    # the next recount, so those counts can lag by up to this interval
+    COUNTER_RECONCILE_INTERVAL = int(os.getenv("COUNTER_RECONCILE_INTERVAL", "300"))
+
+    # Archival of resolved errors and stale recon rows into *_archive collections (0 days disables)
+    ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", "3600"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+    ARCHIVE_FIXED_ERRORS_AFTER_DAYS = int(os.getenv("ARCHIVE_FIXED_ERRORS_AFTER_DAYS", "30"))
+    ARCHIVE_RECON_AFTER_DAYS = int(os.getenv("ARCHIVE_RECON_AFTER_DAYS", "0"))
+
+    # Pooled SFTP connections (times in seconds)
+    SFTP_POOL_SIZE = int(os.getenv("SFTP_POOL_SIZE", "4"))
+    SFTP_POOL_IDLE_TIMEOUT = int(os.getenv("SFTP_POOL_IDLE_TIMEOUT", "300"))
+    SFTP_POOL_VALIDATE_AFTER = int(os.getenv("SFTP_POOL_VALIDATE_AFTER", "30"))
+    SFTP_POOL_ACQUIRE_TIMEOUT = int(os.getenv("SFTP_POOL_ACQUIRE_TIMEOUT", "30"))
+    SFTP_KEEPALIVE_INTERVAL = int(os.getenv("SFTP_KEEPALIVE_INTERVAL", "30"))
+    # Deadlines for establishing a connection (TCP connect, SSH banner, authentication)
+    SFTP_CONNECT_TIMEOUT = int(os.getenv("SFTP_CONNECT_TIMEOUT", "10"))
+    SFTP_BANNER_TIMEOUT = int(os.getenv("SFTP_BANNER_TIMEOUT", "15"))
+    SFTP_AUTH_TIMEOUT = int(os.getenv("SFTP_AUTH_TIMEOUT", "15"))
+    # Circuit breaker: consecutive failures before FTP routes fail fast with 503, and seconds
+    # between background probes while it is open
+    SFTP_BREAKER_FAILURE_THRESHOLD = int(os.getenv("SFTP_BREAKER_FAILURE_THRESHOLD", "3"))
+    SFTP_BREAKER_RESET_TIMEOUT = int(os.getenv("SFTP_BREAKER_RESET_TIMEOUT", "15"))
+    # Thread pool that runs blocking SFTP calls off the event loop
+    SFTP_MAX_WORKERS = int(os.getenv("SFTP_MAX_WORKERS", "8"))
+    SFTP_OPERATION_TIMEOUT = int(os.getenv("SFTP_OPERATION_TIMEOUT", "60"))
+    SFTP_DOWNLOAD_CHUNK_SIZE = int(os.getenv("SFTP_DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+    SFTP_UPLOAD_CHUNK_SIZE = int(os.getenv("SFTP_UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+    SFTP_UPLOAD_MAX_BYTES = int(os.getenv("SFTP_UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+    # SFTP transfer tuning: channel window and packet size in bytes, outstanding read requests
+    # per prefetched download, and SSH compression (0 keeps paramiko's default; run
+    # `python -m app.tests.benchmark_sftp` to tune for the network)
+    SFTP_WINDOW_SIZE = int(os.getenv("SFTP_WINDOW_SIZE", "0"))
+    SFTP_MAX_PACKET_SIZE = int(os.getenv("SFTP_MAX_PACKET_SIZE", "0"))
+    SFTP_PREFETCH_CONCURRENCY = int(os.getenv("SFTP_PREFETCH_CONCURRENCY", "0"))
+    SFTP_COMPRESS = os.getenv("SFTP_COMPRESS", "false").lower() == "true"
+    # Folder listing cache: max age, and how long an unread folder keeps being refreshed
+    SFTP_LISTING_TTL = int(os.getenv("SFTP_LISTING_TTL", "30"))
+    SFTP_LISTING_KEEP_WARM = int(os.getenv("SFTP_LISTING_KEEP_WARM", "600"))
+    # Batch move/delete/rename: SFTP channels in flight per batch, and max files per request
+    SFTP_BATCH_CONCURRENCY = int(os.getenv("SFTP_BATCH_CONCURRENCY", "4"))
+    SFTP_BATCH_MAX_FILES = int(os.getenv("SFTP_BATCH_MAX_FILES", "1000"))
+    SFTP_BUNDLE_MAX_FILES = int(os.getenv("SFTP_BUNDLE_MAX_FILES", "500"))
+    # Report previews: parsed summaries and pages kept per file version (name, size, mtime)
+    REPORT_PREVIEW_CACHE_SIZE = int(os.getenv("REPORT_PREVIEW_CACHE_SIZE", "256"))
+    # Report reconciliation: eventids per $in lookup, identifier columns when the report has no
+    # header row, and how many results are kept per file version (seconds / records)
+    RECON_MATCH_BATCH_SIZE = int(os.getenv("RECON_MATCH_BATCH_SIZE", "500"))
+    RECON_REPORT_TICKET_FIELD = int(os.getenv("RECON_REPORT_TICKET_FIELD", "0"))
+    RECON_REPORT_EVENT_FIELD = int(os.getenv("RECON_REPORT_EVENT_FIELD", "1"))
+    RECON_RESULT_CACHE_SIZE = int(os.getenv("RECON_RESULT_CACHE_SIZE", "8"))
+    RECON_RESULT_TTL = int(os.getenv("RECON_RESULT_TTL", "300"))
+    RECON_RESULT_CACHE_MAX_RECORDS = int(os.getenv("RECON_RESULT_CACHE_MAX_RECORDS", "100000"))
+    # Checksum indexer: seconds between runs, and most files hashed per run
+    CHECKSUM_INDEX_INTERVAL = int(os.getenv("CHECKSUM_INDEX_INTERVAL", "600"))
+    CHECKSUM_INDEX_MAX_FILES = int(os.getenv("CHECKSUM_INDEX_MAX_FILES", "200"))
+
+    # Shared outbound HTTP client (producer API): timeouts in seconds and connection pool limits;
+    # HTTP/2 needs the h2 package, installed by httpx[http2] in requirements.txt (without it the
+    # client logs a warning and uses HTTP/1.1)
+    HTTP_CLIENT_CONNECT_TIMEOUT = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "5"))
+    HTTP_CLIENT_READ_TIMEOUT = float(os.getenv("HTTP_CLIENT_READ_TIMEOUT", "30"))
+    HTTP_CLIENT_POOL_TIMEOUT = float(os.getenv("HTTP_CLIENT_POOL_TIMEOUT", "10"))
+    HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "50"))
+    HTTP_CLIENT_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "20"))
+    HTTP_CLIENT_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "60"))
+    HTTP_CLIENT_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "true").lower() == "true"
+    # Producer batch sends: max sends in flight per batch, and max items per request
+    PRODUCER_BATCH_CONCURRENCY = int(os.getenv("PRODUCER_BATCH_CONCURRENCY", "16"))
+    PRODUCER_BATCH_MAX_ITEMS = int(os.getenv("PRODUCER_BATCH_MAX_ITEMS", "10000"))
+    # Producer outbox: seconds between dispatcher polls, entries delivered in parallel (each claimed
+    # just before its send), claim lease in seconds - longer than one send, rate-limit wait included -
+    # attempts before dead-lettering, retry backoff (seconds) and how long delivered entries are kept (days)
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "5"))
+    OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "8"))
+    OUTBOX_LEASE = int(os.getenv("OUTBOX_LEASE", "120"))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))
+    OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "900"))
+    OUTBOX_DELIVERED_RETENTION_DAYS = int(os.getenv("OUTBOX_DELIVERED_RETENTION_DAYS", "7"))
+    # Limits on calls to the producer, per apipath: requests per second (0 = unlimited) and burst,
+    # plus an adaptive concurrency limit that halves on 429/5xx or latency above tolerance x the
+    # best recent latency (and above the floor, in seconds). PRODUCER_LIMITS overrides these per
+    # apipath as JSON, e.g. {"/dfEvent": {"rate": 20, "max_concurrency": 8}}. Every limit is per
+    # worker process: with gunicorn's --workers 4 (see Dockerfile) the producer sees up to 4x the
+    # rate and concurrency, so divide the producer's own limits by the worker count when setting them
+    PRODUCER_RATE_LIMIT = float(os.getenv("PRODUCER_RATE_LIMIT", "50"))
+    PRODUCER_RATE_BURST = float(os.getenv("PRODUCER_RATE_BURST", "100"))
+    PRODUCER_CONCURRENCY_INITIAL = int(os.getenv("PRODUCER_CONCURRENCY_INITIAL", "8"))
+    PRODUCER_CONCURRENCY_MIN = int(os.getenv("PRODUCER_CONCURRENCY_MIN", "1"))
+    PRODUCER_CONCURRENCY_MAX = int(os.getenv("PRODUCER_CONCURRENCY_MAX", "64"))
+    PRODUCER_LATENCY_TOLERANCE = float(os.getenv("PRODUCER_LATENCY_TOLERANCE", "2.0"))
+    PRODUCER_LATENCY_FLOOR = float(os.getenv("PRODUCER_LATENCY_FLOOR", "0.25"))
+    PRODUCER_LIMITS = json.loads(os.getenv("PRODUCER_LIMITS", "{}"))
     
     FRONTEND_CONFIG = {
         "apiPath": API_PATH,
@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict
+import logging
+import uuid
+
+from bson import ObjectId
+
+from app.config import Config
+from app.db.counters import error_counters, recon_counters, FIXED_QUERY
+from app.db.mongo import recon_db, ride_services_db
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIX = "_archive"
+RECON_COLLECTIONS = ["mainstaging", "errortable", "errorstaging"]
+
+# Outcome of the most recent archival run in this worker
+last_run: Dict = {}
+# Where the most recent run by any worker is recorded, since only the lease holder archives
+RUNS_COLLECTION = "archive_runs"
+
+
+def archive_collection_name(collection_name: str) -> str:
+    return f"{collection_name}{ARCHIVE_SUFFIX}"
+
+
+def created_before(days: int) -> dict:
+    """Match documents whose ObjectId was generated more than ``days`` days ago."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    return {"_id": {"$lt": ObjectId.from_datetime(cutoff)}}
+
+
+def fixed_before(days: int) -> dict:
+    """
+    Match errors marked fixed more than ``days`` days ago. Errors fixed before ``fixed_at``
+    was recorded fall back to their creation time.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    return {"$and": [FIXED_QUERY, {"$or": [
+        {"fixed_at": {"$lt": cutoff}},
+        {"fixed_at": {"$exists": False}, **created_before(days)}
+    ]}]}
+
+
+async def archive_documents(db, collection_name: str, query: dict, batch_size: int) -> int:
+    """
+    Move documents matching ``query`` into ``<collection>_archive`` in batches.
+
+    Each batch is copied server side with ``$merge`` (replacing any earlier copy), tagged with
+    an id of its own. Only the documents whose copy carries that tag, and that still match
+    ``query``, are then deleted from the hot collection, so a document that starts matching
+    between the copy and the delete, or whose copy a concurrent run replaced, is never lost.
+    Returns the number of documents moved.
+    """
+    source = db[collection_name]
+    target = archive_collection_name(collection_name)
+    moved = 0
+
+    while True:
+        ids = [doc["_id"] async for doc in source.find(query, {"_id": 1}).sort("_id", 1).limit(batch_size)]
+        if not ids:
+            break
+
+        batch_id = uuid.uuid4().hex
+        await source.aggregate([
+            {"$match": {"$and": [{"_id": {"$in": ids}}, query]}},
+            {"$set": {"archived_at": "$$NOW", "archive_batch": batch_id}},
+            {"$merge": {"into": target, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ]).to_list(None)
+
+        archived = [doc["_id"] async for doc in db[target].find({"_id": {"$in": ids}, "archive_batch": batch_id}, {"_id": 1})]
+        result = await source.delete_many({"$and": [{"_id": {"$in": archived}}, query]}) if archived else None
+        deleted = result.deleted_count if result else 0
+        moved += deleted
+        logger.debug(f"Archived {deleted} documents from '{collection_name}' to '{target}'")
+
+        if deleted == 0 or len(ids) < batch_size:
+            break
+
+    return moved
+
+
+async def run_archival() -> Dict[str, int]:
+    """Archive old fixed errors and, when enabled, stale recon rows."""
+    started = datetime.now(timezone.utc)
+    moved = {}
+
+    if Config.ARCHIVE_FIXED_ERRORS_AFTER_DAYS > 0:
+        query = fixed_before(Config.ARCHIVE_FIXED_ERRORS_AFTER_DAYS)
+        moved["errors"] = await archive_documents(ride_services_db, "errors", query, Config.ARCHIVE_BATCH_SIZE)
+        if moved["errors"]:
+            await error_counters.reconcile()
+
+    if Config.ARCHIVE_RECON_AFTER_DAYS > 0:
+        query = created_before(Config.ARCHIVE_RECON_AFTER_DAYS)
+        for collection_name in RECON_COLLECTIONS:
+            moved[collection_name] = await archive_documents(recon_db, collection_name, query, Config.ARCHIVE_BATCH_SIZE)
+            if moved[collection_name]:
+                await recon_counters[collection_name].reconcile()
+
+    last_run.clear()
+    last_run.update({
+        "started_at": started,
+        "finished_at": datetime.now(timezone.utc),
+        "moved": moved
+    })
+    if any(moved.values()):
+        logger.info(f"Archival run moved documents: {moved}")
+    await recon_db[RUNS_COLLECTION].replace_one({"_id": "last"}, last_run, upsert=True)
+    return moved
+
+
+async def get_last_run() -> Dict:
+    """The most recent archival run by any worker."""
+    doc = await recon_db[RUNS_COLLECTION].find_one({"_id": "last"}, {"_id": 0})
+    return doc or dict(last_run)
@@ -0,0 +1,75 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import logging
+
+from app.db.mongo import recon_db
+
+logger = logging.getLogger(__name__)
+
+CHECKSUMS_COLLECTION = "ftp_checksums"
+
+
+class ChecksumIndex:
+    """
+    SHA-256 of remote FTP files, one document per path.
+
+    Each entry records the size and mtime it was computed for, so a checksum is only
+    trusted while the file is unchanged and each file version is hashed once.
+    """
+
+    def __init__(self, db, collection: str = CHECKSUMS_COLLECTION):
+        self.db = db
+        self.collection = collection
+
+    @property
+    def _store(self):
+        return self.db[self.collection]
+
+    async def ensure_indexes(self) -> None:
+        await self._store.create_index("sha256")
+        await self._store.create_index("folder")
+
+    async def record(self, path: str, folder: str, name: str, size: int, mtime: Optional[int], sha256: str) -> None:
+        await self._store.update_one(
+            {"_id": path},
+            {"$set": {
+                "folder": folder,
+                "name": name,
+                "size": size,
+                "mtime": mtime,
+                "sha256": sha256,
+                "indexed_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    async def known(self, paths: List[str]) -> Dict[str, dict]:
+        """Index entries for ``paths``, keyed by path."""
+        docs = await self._store.find({"_id": {"$in": paths}}).to_list(None)
+        return {doc["_id"]: doc for doc in docs}
+
+    async def find(self, sha256: str) -> List[dict]:
+        return await self._store.find({"sha256": sha256}).to_list(None)
+
+    async def prune(self, folder: str, paths: List[str]) -> int:
+        """Drop entries for files of ``folder`` that are no longer in ``paths``."""
+        result = await self._store.delete_many({"folder": folder, "_id": {"$nin": paths}})
+        return result.deleted_count
+
+    async def duplicates(self, folders: List[str]) -> List[dict]:
+        """Groups of entries in ``folders`` that share a checksum."""
+        pipeline = [
+            {"$match": {"folder": {"$in": folders}}},
+            {"$group": {
+                "_id": "$sha256",
+                "size": {"$first": "$size"},
+                "files": {"$push": {"folder": "$folder", "name": "$name", "size": "$size", "mtime": "$mtime"}},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$sort": {"size": -1}}
+        ]
+        return await self._store.aggregate(pipeline).to_list(None)
+
+
+ftp_checksums = ChecksumIndex(recon_db)
@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+import logging
+
+from app.db.mongo import recon_db, ride_services_db
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_COLLECTION = "counters"
+RETRY_EXCEPTION_THRESHOLD = 10
+
+FIXED_QUERY = {"fixed": True}
+UNDER_ANALYSIS_QUERY = {"under_analysis": True}
+NEW_QUERY = {
+    "$and": [
+        {"$or": [{"fixed": False}, {"fixed": {"$exists": False}}]},
+        {"$or": [{"under_analysis": False}, {"under_analysis": {"$exists": False}}]}
+    ]
+}
+RETRY_EXCEPTIONS_QUERY = {"recon_count": {"$gt": RETRY_EXCEPTION_THRESHOLD}}
+
+
+def _is_unset(doc: dict, field: str) -> bool:
+    """Mirror of ``{"$or": [{field: False}, {field: {"$exists": False}}]}``."""
+    return field not in doc or doc[field] is False
+
+
+def classify_error(doc: dict) -> List[str]:
+    """Return the error counters a document is counted under."""
+    names = []
+    if doc.get("fixed") is True:
+        names.append("fixed")
+    if doc.get("under_analysis") is True:
+        names.append("under_analysis")
+    if _is_unset(doc, "fixed") and _is_unset(doc, "under_analysis"):
+        names.append("new")
+    return names
+
+
+def classify_mainstaging(doc: dict) -> List[str]:
+    """Return the mainstaging counters a document is counted under."""
+    names = ["total"]
+    recon_count = doc.get("recon_count")
+    if isinstance(recon_count, (int, float)) and recon_count > RETRY_EXCEPTION_THRESHOLD:
+        names.append("retry_exceptions")
+    return names
+
+
+def classify_total(doc: dict) -> List[str]:
+    return ["total"]
+
+
+class Counters:
+    """
+    Materialised document counts for one source collection.
+
+    The counts live in a single document of the ``counters`` collection of the same
+    database, so reading them is one primary key lookup. Write paths keep them current
+    with atomic ``$inc``/``$set`` updates, and ``reconcile`` recomputes them exactly to
+    correct drift from writers outside this API (e.g. the RIDE pipeline inserting errors).
+    """
+
+    def __init__(self, db, collection: str, queries: Dict[str, dict], classify: Callable[[dict], List[str]]):
+        self.db = db
+        self.collection = collection
+        self.queries = queries
+        self.classify = classify
+
+    @property
+    def _store(self):
+        return self.db[COUNTERS_COLLECTION]
+
+    async def get(self, name: str) -> int:
+        """Read a counter, seeding the counter document on first use."""
+        doc = await self._store.find_one({"_id": self.collection})
+        counts = (doc or {}).get("counts", {})
+        if name not in counts:
+            counts = await self.reconcile()
+        return counts[name]
+
+    async def apply(self, before: Optional[dict], after: Optional[dict]) -> None:
+        """Record a single document transition; ``None`` stands for inserted/deleted."""
+        deltas: Dict[str, int] = {}
+        for name in self.classify(before) if before else []:
+            deltas[name] = deltas.get(name, 0) - 1
+        for name in self.classify(after) if after else []:
+            deltas[name] = deltas.get(name, 0) + 1
+
+        inc = {f"counts.{name}": delta for name, delta in deltas.items() if delta}
+        if not inc:
+            return
+        # No upsert: a missing counter document is seeded with exact counts on read.
+        await self._store.update_one({"_id": self.collection}, {"$inc": inc})
+
+    async def reconcile(self) -> Dict[str, int]:
+        """Recompute exact counts from the source collection and store them, e.g. after a bulk update."""
+        counts = {}
+        for name, query in self.queries.items():
+            counts[name] = await self.db[self.collection].count_documents(query)
+
+        previous = await self._store.find_one_and_update(
+            {"_id": self.collection},
+            {"$set": {"counts": counts, "reconciled_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+        stored = (previous or {}).get("counts")
+        if stored is not None and stored != counts:
+            logger.info(f"Corrected counter drift for '{self.collection}': {stored} -> {counts}")
+        return counts
+
+
+error_counters = Counters(
+    ride_services_db, "errors",
+    {"fixed": FIXED_QUERY, "under_analysis": UNDER_ANALYSIS_QUERY, "new": NEW_QUERY},
+    classify_error
+)
+
+recon_counters = {
+    "mainstaging": Counters(
+        recon_db, "mainstaging",
+        {"total": {}, "retry_exceptions": RETRY_EXCEPTIONS_QUERY},
+        classify_mainstaging
+    ),
+    "errortable": Counters(recon_db, "errortable", {"total": {}}, classify_total),
+    "errorstaging": Counters(recon_db, "errorstaging", {"total": {}}, classify_total),
+}
+
+
+async def reconcile_all_counters() -> None:
+    """Recompute every materialised counter; run periodically in the background."""
+    for counters in [error_counters, *recon_counters.values()]:
+        try:
+            await counters.reconcile()
+        except Exception as e:
+            logger.error(f"Failed to reconcile counters for '{counters.collection}': {e}")
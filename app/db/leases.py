@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+import logging
+import os
+import socket
+import uuid
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongo import recon_db
+
+logger = logging.getLogger(__name__)
+
+LEASES_COLLECTION = "task_leases"
+
+
+class TaskLease:
+    """
+    A named lease in Mongo that elects one runner for a periodic job across every worker.
+
+    The holder renews the lease each time it runs, so the job stays with one worker; if that
+    worker stops, another takes over once ``ttl`` seconds have passed without a renewal.
+    Taking or renewing is a single upsert guarded by the unique ``_id``, so two workers can
+    never both hold the lease.
+    """
+
+    def __init__(self, db, name: str, collection: str = LEASES_COLLECTION, owner: Optional[str] = None):
+        self.db = db
+        self.name = name
+        self.collection = collection
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @property
+    def _store(self):
+        return self.db[self.collection]
+
+    async def acquire(self, ttl: float) -> bool:
+        """Take or renew the lease for ``ttl`` seconds; False while another worker holds it."""
+        now = datetime.now(timezone.utc)
+        try:
+            await self._store.update_one(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=ttl), "renewed_at": now}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # The lease document exists and is held by someone else, so the upsert tried to insert
+            return False
+        return True
+
+    async def release(self) -> None:
+        """Give the lease up early, e.g. on shutdown, so another worker need not wait out the ttl."""
+        await self._store.delete_one({"_id": self.name, "owner": self.owner})
+
+    def exclusive(self, func: Callable[[], Awaitable], ttl: float) -> Callable[[], Awaitable]:
+        """``func`` wrapped to run only while this worker holds the lease."""
+        async def run():
+            if await self.acquire(ttl):
+                await func()
+            else:
+                logger.debug(f"Skipping '{self.name}': another worker holds the lease")
+        return run
+
+
+counter_reconciler_lease = TaskLease(recon_db, "counter-reconciler")
+archiver_lease = TaskLease(recon_db, "archiver")
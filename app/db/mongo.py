@@ -1,11 +1,77 @@
-import os
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import Dict, List, Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config import Config
 
-from dotenv import load_dotenv
+logger = logging.getLogger(__name__)
+
+# Modules each wire compressor needs; zlib ships with Python
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+
+
+def available_compressors(requested: List[str]) -> List[str]:
+    """The requested compressors whose module is installed, in order of preference."""
+    available = [
+        name for name in requested
+        if name in COMPRESSOR_MODULES and (COMPRESSOR_MODULES[name] is None or importlib.util.find_spec(COMPRESSOR_MODULES[name]))
+    ]
+    missing = [name for name in requested if name not in available]
+    if missing:
+        logger.warning(f"Mongo compressors unavailable: {', '.join(missing)}; using {', '.join(available) or 'none'}")
+    return available
+
+
+def create_mongo_client(uri: Optional[str] = None) -> AsyncIOMotorClient:
+    """
+    The one Mongo client for this worker, configured from Config.
+
+    Creating it does no I/O: connections open on first use, or in ``warm_up_mongo``.
+    Options given here take precedence over the same options in the URI.
+    """
+    return AsyncIOMotorClient(
+        uri or Config.MONGO_URI,
+        appname=Config.MONGO_APP_NAME,
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        compressors=available_compressors(Config.MONGO_COMPRESSORS)
+    )
+
 
-load_dotenv()
-MONGO_URI = Config.MONGO_URI
-client = AsyncIOMotorClient(MONGO_URI)
+client = create_mongo_client()
 recon_db =  client["recon-db"]
 ride_services_db = client["ride-services-db"]
+
+# Databases checked by warm-up and /api/ready
+DATABASES = {"recon-db": recon_db, "ride-services-db": ride_services_db}
+
+
+async def ping_databases(databases=None) -> Dict[str, Optional[str]]:
+    """Ping every database concurrently; maps each name to None when reachable, else the error."""
+    databases = databases or DATABASES
+    results = await asyncio.gather(*(db.command("ping") for db in databases.values()), return_exceptions=True)
+    return {
+        name: f"{type(result).__name__}: {result}" if isinstance(result, Exception) else None
+        for name, result in zip(databases, results)
+    }
+
+
+async def warm_up_mongo() -> None:
+    """Open connections before the worker takes traffic; an outage is logged, not fatal."""
+    start = time.perf_counter()
+    errors = {name: error for name, error in (await ping_databases()).items() if error}
+    if errors:
+        logger.warning(f"Mongo warm-up failed for {', '.join(errors)}: {next(iter(errors.values()))}")
+    else:
+        logger.info(f"Mongo connections ready in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def close_mongo_client() -> None:
+    client.close()
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import logging
+import random
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.db.mongo import recon_db
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "producer_outbox"
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DELIVERED = "delivered"
+DEAD = "dead"
+STATUSES = (PENDING, IN_FLIGHT, DELIVERED, DEAD)
+
+
+def backoff_delay(attempts: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter: a random delay up to base * 2^(attempts-1), capped."""
+    return random.uniform(0, min(cap, base * 2 ** max(0, attempts - 1)))
+
+
+class ProducerOutbox:
+    """
+    Durable queue of producer sends, one document per idempotency key.
+
+    Entries move pending -> in_flight -> delivered, or back to pending with a later
+    ``next_attempt_at`` after a failed attempt, and to dead once attempts run out or the
+    producer rejects the payload outright. A claim is an atomic find-and-update with a
+    lease, so several workers can dispatch from the same collection, and entries whose
+    worker died mid-send become claimable again once the lease expires. Each claim carries
+    its own ``claim_id``, and only its holder can record the outcome, so a worker that
+    outlives its lease cannot overwrite the result of the worker that took the entry over.
+    """
+
+    def __init__(self, db, collection: str = OUTBOX_COLLECTION):
+        self.db = db
+        self.collection = collection
+
+    @property
+    def _store(self):
+        return self.db[self.collection]
+
+    async def ensure_indexes(self, delivered_retention: Optional[int] = None) -> None:
+        await self._store.create_index([("status", 1), ("next_attempt_at", 1)])
+        if delivered_retention:
+            # Only delivered entries have delivered_at, so nothing else expires
+            await self._store.create_index("delivered_at", expireAfterSeconds=delivered_retention)
+
+    async def enqueue(self, key: str, apipath: str, payload: Any) -> Dict[str, Any]:
+        """Add a send; returns the existing entry with ``duplicate`` set if the key was seen before."""
+        now = datetime.now(timezone.utc)
+        doc = {
+            "_id": key,
+            "apipath": apipath,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+            "updated_at": now,
+            "last_error": None
+        }
+        try:
+            await self._store.insert_one(doc)
+            return {**doc, "duplicate": False}
+        except DuplicateKeyError:
+            return {**await self._store.find_one({"_id": key}), "duplicate": True}
+
+    async def claim(self, lease: float) -> Optional[dict]:
+        """Atomically take the longest-due entry (or an expired lease) for ``lease`` seconds."""
+        now = datetime.now(timezone.utc)
+        due = {"$or": [
+            {"status": PENDING, "next_attempt_at": {"$lte": now}},
+            {"status": IN_FLIGHT, "lease_until": {"$lt": now}}
+        ]}
+        update = {
+            "$set": {
+                "status": IN_FLIGHT,
+                "claim_id": uuid.uuid4().hex,
+                "lease_until": now + timedelta(seconds=lease),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        }
+        return await self._store.find_one_and_update(
+            due, update, sort=[("next_attempt_at", 1)], return_document=ReturnDocument.AFTER
+        )
+
+    async def mark_delivered(self, key: str, claim_id: str, response: Any = None) -> bool:
+        """Record a delivery; False when the claim was lost to another worker after its lease ran out."""
+        now = datetime.now(timezone.utc)
+        result = await self._store.update_one(
+            {"_id": key, "claim_id": claim_id},
+            {"$set": {"status": DELIVERED, "delivered_at": now, "updated_at": now, "response": response, "last_error": None},
+             "$unset": {"lease_until": "", "claim_id": ""}}
+        )
+        return result.matched_count == 1
+
+    async def mark_failed(self, key: str, claim_id: str, error: str, retry_in: Optional[float]) -> bool:
+        """
+        Schedule another attempt in ``retry_in`` seconds, or dead-letter the entry when None.
+        False when the claim was lost, as for ``mark_delivered``.
+        """
+        now = datetime.now(timezone.utc)
+        fields = {"last_error": error, "updated_at": now}
+        if retry_in is None:
+            fields["status"] = DEAD
+        else:
+            fields.update(status=PENDING, next_attempt_at=now + timedelta(seconds=retry_in))
+        result = await self._store.update_one(
+            {"_id": key, "claim_id": claim_id},
+            {"$set": fields, "$unset": {"lease_until": "", "claim_id": ""}}
+        )
+        return result.matched_count == 1
+
+    async def requeue(self, key: str) -> Optional[dict]:
+        """Give a dead entry a fresh set of attempts, due now."""
+        now = datetime.now(timezone.utc)
+        return await self._store.find_one_and_update(
+            {"_id": key, "status": DEAD},
+            {"$set": {"status": PENDING, "attempts": 0, "next_attempt_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await self._store.find_one({"_id": key})
+
+    async def list(self, status: str, limit: int) -> List[dict]:
+        return await self._store.find({"status": status}).sort("updated_at", -1).limit(limit).to_list(None)
+
+    async def depth(self) -> Dict[str, Any]:
+        """Entry counts per status and the age of the oldest undelivered entry."""
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}, "oldest": {"$min": "$created_at"}}}]
+        groups = {g["_id"]: g for g in await self._store.aggregate(pipeline).to_list(None)}
+        waiting = [groups[s]["oldest"] for s in (PENDING, IN_FLIGHT) if s in groups]
+        oldest = min(waiting) if waiting else None
+        if oldest is not None and oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        return {
+            "counts": {status: groups.get(status, {}).get("count", 0) for status in STATUSES},
+            "oldest_pending_age": (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else None
+        }
+
+
+producer_outbox = ProducerOutbox(recon_db)
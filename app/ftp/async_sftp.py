@@ -0,0 +1,222 @@
+import asyncio
+import functools
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+import paramiko
+
+from app.ftp.breaker import CircuitBreaker
+from app.ftp.ftputil import FTPUtil
+from app.ftp.pool import SFTPPool, CONNECTION_ERRORS
+
+
+def paths_in(args) -> List[str]:
+    """Absolute remote paths among call arguments, including inside (path, target) tuples."""
+    paths = []
+    for arg in args:
+        for value in (arg if isinstance(arg, tuple) else (arg,)):
+            if isinstance(value, str) and value.startswith('/'):
+                paths.append(value)
+    return paths
+
+
+class AsyncSFTP:
+    """
+    Async facade that runs blocking paramiko work on a dedicated, bounded thread pool.
+
+    At most ``max_workers`` SFTP operations run at once across the process; each one is
+    bounded by ``operation_timeout`` seconds so a slow server never blocks the event loop
+    or ties up a request indefinitely. Sessions wait for a free pooled connection on the
+    event loop, so worker threads are never parked on an exhausted pool. Failed connects and
+    broken connections feed ``breaker``, which makes sessions fail fast during an outage.
+    """
+
+    def __init__(self, pool: SFTPPool, max_workers: int = 8, operation_timeout: float = 60,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.pool = pool
+        self.max_workers = max_workers
+        self.operation_timeout = operation_timeout
+        self.breaker = breaker or CircuitBreaker("SFTP server")
+
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sftp")
+        self._limit = asyncio.Semaphore(max_workers)
+        self._sessions = asyncio.Semaphore(pool.max_size)
+
+    async def call(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Runs ``func(*args)`` on the SFTP thread pool and awaits its result."""
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, functools.partial(func, *args))
+            return await asyncio.wait_for(future, timeout or self.operation_timeout)
+
+    @asynccontextmanager
+    async def session(self, record_failures: bool = True) -> AsyncIterator["AsyncSFTPSession"]:
+        """
+        Borrows a pooled connection for the duration of the block.
+
+        With ``record_failures`` False, operations that time out or break the connection do
+        not count toward the breaker; for background work whose slowness says nothing about
+        the server's health. A failure to connect always counts.
+
+        Raises:
+            CircuitOpenError: Immediately, while the server is considered down.
+        """
+        self.breaker.check()
+        try:
+            await asyncio.wait_for(self._sessions.acquire(), self.pool.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError("Timed out waiting for a free SFTP connection")
+        try:
+            try:
+                ftputil = await self._acquire()
+            except Exception as e:
+                self.breaker.record_failure(e)
+                raise
+            self.breaker.record_success()
+            session = AsyncSFTPSession(self, ftputil, record_failures)
+            try:
+                yield session
+            except CONNECTION_ERRORS:
+                session.broken = True
+                raise
+            finally:
+                await self.call(self.pool.release, ftputil, session.broken)
+        finally:
+            self._sessions.release()
+
+    async def _acquire(self) -> FTPUtil:
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, self.pool.acquire)
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), self.operation_timeout)
+            except asyncio.TimeoutError:
+                # The connection may still come up after we gave up; hand it straight back
+                future.add_done_callback(lambda f: f.cancelled() or f.exception() or self.pool.release(f.result()))
+                raise
+
+    async def probe(self) -> None:
+        """Background half-open check: one connection attempt once the open breaker is due a retry."""
+        if not self.breaker.probe_due():
+            return
+        self.breaker.start_probe()
+        try:
+            ftputil = await self._acquire()
+        except Exception as e:
+            self.breaker.record_failure(e)
+            return
+        await self.call(self.pool.release, ftputil)
+        self.breaker.record_success()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AsyncSFTPSession:
+    """Awaitable SFTP operations bound to one pooled connection."""
+
+    def __init__(self, runner: AsyncSFTP, ftputil: FTPUtil, record_failures: bool = True):
+        self.runner = runner
+        self.ftputil = ftputil
+        self.record_failures = record_failures
+        self.broken = False
+        # Let paramiko itself give up on a stalled channel, not just the awaiting coroutine
+        self.sftp.get_channel().settimeout(runner.operation_timeout)
+
+    @property
+    def sftp(self) -> paramiko.SFTPClient:
+        return self.ftputil.sftp
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        Runs a blocking callable that uses this session's connection on the SFTP thread pool.
+        A timeout or transport error marks the connection as broken so it is not reused (and
+        feeds the breaker unless the session opted out), and ENOENT makes the pool forget the
+        folders of the paths involved.
+        """
+        try:
+            return await self.runner.call(func, *args, timeout=timeout)
+        except (asyncio.TimeoutError, *CONNECTION_ERRORS) as e:
+            self.broken = True
+            if self.record_failures:
+                self.runner.breaker.record_failure(e)
+            raise
+        except FileNotFoundError:
+            for path in paths_in(args):
+                self.runner.pool.folders.forget(posixpath.dirname(path))
+            raise
+
+    async def ensure_folder(self, path: str) -> None:
+        """Creates ``path`` and any missing parents; free once the pool has verified it."""
+        folders = self.runner.pool.folders
+        if not folders.is_verified(path):
+            await self.run(folders.ensure, self.sftp, path)
+
+    async def map(self, func: Callable, items: List, concurrency: int) -> List:
+        """
+        Runs ``func(sftp, item)`` for every item with up to ``concurrency`` in flight. A blocking
+        ``func`` is one operation per item; a coroutine function runs on the event loop and can
+        split the item into several operations of its own via ``run``.
+
+        paramiko's SFTPClient cannot serve concurrent requests, so parallel work is spread
+        over extra SFTP channels multiplexed on this session's SSH connection (no new
+        handshakes). Results come back in item order, with failures as exception instances.
+        """
+        count = max(1, min(concurrency, len(items)))
+        clients = [self.sftp]
+        try:
+            for _ in range(count - 1):
+                client = await self.run(self.ftputil.open_extra_sftp_channel)
+                client.get_channel().settimeout(self.runner.operation_timeout)
+                clients.append(client)
+
+            idle: asyncio.Queue = asyncio.Queue()
+            for client in clients:
+                idle.put_nowait(client)
+
+            async def worker(item):
+                client = await idle.get()
+                try:
+                    if asyncio.iscoroutinefunction(func):
+                        return await func(client, item)
+                    return await self.run(func, client, item)
+                except Exception as e:
+                    return e
+                finally:
+                    idle.put_nowait(client)
+
+            return await asyncio.gather(*(worker(item) for item in items))
+        finally:
+            for client in clients[1:]:
+                await self.run(client.close)
+
+    async def listdir(self, path: str) -> List[str]:
+        return await self.run(self.sftp.listdir, path)
+
+    async def listdir_attr(self, path: str) -> List[paramiko.SFTPAttributes]:
+        return await self.run(self.sftp.listdir_attr, path)
+
+    async def stat(self, path: str) -> paramiko.SFTPAttributes:
+        return await self.run(self.sftp.stat, path)
+
+    async def remove(self, path: str) -> None:
+        await self.run(self.sftp.remove, path)
+
+    async def rename(self, old_path: str, new_path: str) -> None:
+        await self.run(self.sftp.rename, old_path, new_path)
+
+    async def posix_rename(self, old_path: str, new_path: str) -> None:
+        await self.run(self.sftp.posix_rename, old_path, new_path)
+
+    async def mkdir(self, path: str) -> None:
+        await self.run(self.sftp.mkdir, path)
+
+    async def open(self, path: str, mode: str = 'r') -> paramiko.SFTPFile:
+        return await self.run(self.sftp.open, path, mode)
+
+    async def getfo(self, path: str, file_obj) -> int:
+        return await self.run(self.sftp.getfo, path, file_obj)
@@ -0,0 +1,95 @@
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.config import Config
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the breaker opens and ``check`` fails
+    immediately. Requests never probe the backend themselves: a background task calls
+    ``probe_due``/``start_probe`` every so often, and the probe's outcome closes the
+    breaker again or keeps it open for another ``reset_timeout`` seconds.
+
+    Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 15):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.logger = logging.getLogger(__name__)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_change = datetime.now(timezone.utc)
+
+    def check(self) -> None:
+        """Raises CircuitOpenError unless the breaker is closed."""
+        if self.state != CLOSED:
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            self.logger.info(f"{self.name} recovered; circuit closed")
+            self._set_state(CLOSED)
+            self.opened_at = None
+
+    def record_failure(self, error: BaseException) -> None:
+        self.failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.logger.warning(f"{self.name} circuit opened after {self.failures} failure(s): {self.last_error}")
+            self._set_state(OPEN)
+            self.opened_at = time.monotonic()
+
+    def probe_due(self) -> bool:
+        return self.state == OPEN and self.retry_after() == 0
+
+    def start_probe(self) -> None:
+        self._set_state(HALF_OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "since": self.last_change.isoformat(),
+            "retry_after": round(self.retry_after(), 1) if self.state != CLOSED else None,
+            "last_error": self.last_error
+        }
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        self.last_change = datetime.now(timezone.utc)
+
+
+# Guards the PRIME SFTP server for every FTP route in this worker
+sftp_breaker = CircuitBreaker(
+    "SFTP server",
+    failure_threshold=Config.SFTP_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=Config.SFTP_BREAKER_RESET_TIMEOUT
+)
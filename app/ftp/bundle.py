@@ -0,0 +1,80 @@
+import io
+import time
+import zipfile
+from typing import AsyncIterator, List, Optional
+
+from app.ftp.async_sftp import AsyncSFTP
+from app.models.ftp_file import FtpFile
+
+
+class ZipStreamBuffer(io.RawIOBase):
+    """
+    Write-only, non-seekable sink for zipfile.ZipFile.
+
+    ZipFile falls back to data descriptors when it cannot seek, so archive bytes can be
+    drained and sent as soon as they are written.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_info(f: FtpFile) -> zipfile.ZipInfo:
+    # ZIP timestamps cannot predate 1980
+    mtime = max(f.mtime or time.time(), 315532800)
+    info = zipfile.ZipInfo(f.name, date_time=time.localtime(mtime)[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = f.size or 0
+    return info
+
+
+def copy_chunk(remote_file, member, chunk_size: int) -> bool:
+    """Read one chunk from the remote file into the zip member (blocking); False at end of file."""
+    data = remote_file.read(chunk_size)
+    if not data:
+        return False
+    member.write(data)
+    return True
+
+
+async def stream_zip(runner: AsyncSFTP, folder: str, files: List[FtpFile], chunk_size: int,
+                     prefetch_concurrency: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Yield a ZIP archive of remote files as it is built.
+
+    Members are read from SFTP and deflated chunk by chunk on the SFTP thread pool, so
+    neither the archive nor any single file is held in memory.
+    """
+    sink = ZipStreamBuffer()
+    async with runner.session() as session:
+        archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED)
+        for f in files:
+            remote_file = await session.open(f"{folder.rstrip('/')}/{f.name}", 'rb')
+            try:
+                await session.run(remote_file.prefetch, f.size, prefetch_concurrency)
+                with archive.open(zip_info(f), 'w') as member:
+                    while await session.run(copy_chunk, remote_file, member, chunk_size):
+                        data = sink.drain()
+                        if data:
+                            yield data
+            finally:
+                await session.run(remote_file.close)
+            # Member trailer (data descriptor)
+            data = sink.drain()
+            if data:
+                yield data
+        archive.close()
+    # Central directory
+    yield sink.drain()
@@ -0,0 +1,72 @@
+import logging
+import posixpath
+import threading
+from typing import Set
+
+
+def normalize(path: str) -> str:
+    return posixpath.normpath(path) if path else path
+
+
+class FolderManager:
+    """
+    Creates remote folders on demand and remembers which ones are known to exist.
+
+    Verified folders (and their ancestors) are kept in memory, so checking a folder that
+    was already seen costs no round trip. Entries are forgotten when an operation under
+    them fails with ENOENT, since the folder may have been removed on the server.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._verified: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def is_verified(self, folder: str) -> bool:
+        with self._lock:
+            return normalize(folder) in self._verified
+
+    def ensure(self, sftp, folder: str) -> None:
+        """
+        Creates ``folder`` and any missing parents (blocking; run via the SFTP thread pool).
+
+        Raises:
+            IOError: If a folder cannot be checked or created.
+        """
+        folder = normalize(folder)
+        if self.is_verified(folder):
+            return
+
+        # Walk up until an existing (or already verified) folder is found
+        missing = []
+        path = folder
+        while path not in ("", "/", ".") and not self.is_verified(path):
+            try:
+                sftp.stat(path)
+                break
+            except FileNotFoundError:
+                missing.append(path)
+                path = posixpath.dirname(path)
+
+        for path in reversed(missing):
+            self.logger.info(f"Creating folder: {path}")
+            try:
+                sftp.mkdir(path)
+            except IOError:
+                # Another worker may have created it meanwhile; anything else fails the stat
+                sftp.stat(path)
+
+        self._remember(folder)
+
+    def forget(self, path: str) -> None:
+        """Drops ``path`` and every verified folder below it."""
+        path = normalize(path)
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            self._verified = {f for f in self._verified if f != path and not f.startswith(prefix)}
+
+    def _remember(self, folder: str) -> None:
+        with self._lock:
+            while folder not in ("", "/", ".") and folder not in self._verified:
+                self._verified.add(folder)
+                folder = posixpath.dirname(folder)
@@ -4,11 +4,38 @@ import os
 import logging
 from typing import Optional
 
+def parse_private_key(priv_key_str: str, passphrase: Optional[str] = None) -> paramiko.PKey:
+    """
+    Parses a private key, trying each supported key type in turn.
+
+    Raises:
+        ValueError: If the key type is unsupported or the format is invalid.
+    """
+    priv_key_io = io.StringIO(priv_key_str)
+    key_types = [
+        ('Ed25519Key', paramiko.Ed25519Key),
+        ('RSAKey', paramiko.RSAKey)
+    ]
+
+    for key_name, key_class in key_types:
+        try:
+            priv_key_io.seek(0)
+            return key_class.from_private_key(priv_key_io, password=passphrase)
+        except paramiko.SSHException:
+            continue
+
+    raise ValueError("Unsupported key type or invalid key format")
+
+
 class FTPUtil:
     def __init__(self, host: str, user: str, user_password: str, port: int,
                  priv_key_str: Optional[str], pub_key_str: Optional[str],
                  passphrase: Optional[str] = None, known_hosts: Optional[str] = None,
-                 base_path: str = "", clean_up: str = 'Y'):
+                 base_path: str = "", clean_up: str = 'Y', keepalive_interval: int = 0,
+                 private_key: Optional[paramiko.PKey] = None, window_size: Optional[int] = None,
+                 max_packet_size: Optional[int] = None, compress: bool = False,
+                 connect_timeout: Optional[float] = None, banner_timeout: Optional[float] = None,
+                 auth_timeout: Optional[float] = None, operation_timeout: Optional[float] = None):
         self.host = host
         self.user = user
         self.user_password = user_password
@@ -19,6 +46,18 @@ class FTPUtil:
         self.known_hosts = known_hosts
         self.base_path = base_path
         self.clean_up = clean_up
+        self.keepalive_interval = keepalive_interval
+        # An already parsed key (shared across connections) takes precedence over priv_key_str
+        self.private_key = private_key
+        # SFTP channel flow control (None keeps paramiko's defaults) and SSH compression
+        self.window_size = window_size
+        self.max_packet_size = max_packet_size
+        self.compress = compress
+        # Deadlines in seconds (None waits indefinitely, as paramiko does by default)
+        self.connect_timeout = connect_timeout
+        self.banner_timeout = banner_timeout
+        self.auth_timeout = auth_timeout
+        self.operation_timeout = operation_timeout
 
         self.logger = logging.getLogger(__name__)
         self.sftp: Optional[paramiko.SFTPClient] = None
@@ -27,6 +66,7 @@ class FTPUtil:
     def acquire_sftp_channel(self) -> paramiko.SFTPClient:
         """
         Establishes an SFTP connection and returns the SFTP client.
+        An already established, live connection is returned as is.
         
         Returns:
             paramiko.SFTPClient: The SFTP client object.
@@ -35,6 +75,10 @@ class FTPUtil:
             paramiko.SSHException: If there's an error during SSH connection.
             IOError: If there's an error during SFTP session creation.
         """
+        if self.is_alive():
+            return self.sftp
+
+        self.release_sftp_channel()
         try:
             self._initialize_ssh_client()
             self._load_known_hosts()
@@ -64,7 +108,7 @@ class FTPUtil:
 
     def _load_private_key(self) -> Optional[paramiko.PKey]:
         """
-        Loads the private key from the provided string.
+        Returns the pre-parsed private key, or loads it from the provided string.
         
         Returns:
             Optional[paramiko.PKey]: The loaded private key object, or None if not provided.
@@ -72,25 +116,14 @@ class FTPUtil:
         Raises:
             ValueError: If the key type is unsupported or the format is invalid.
         """
+        if self.private_key is not None:
+            return self.private_key
         if not self.priv_key_str:
             return None
 
-        priv_key_io = io.StringIO(self.priv_key_str)
-        key_types = [
-            ('Ed25519Key', paramiko.Ed25519Key),
-            ('RSAKey', paramiko.RSAKey)
-        ]
-
-        for key_name, key_class in key_types:
-            try:
-                priv_key_io.seek(0)
-                private_key = key_class.from_private_key(priv_key_io, password=self.passphrase)
-                self.logger.debug("Private key loaded ")
-                return private_key
-            except paramiko.SSHException:
-                continue
-
-        raise ValueError("Unsupported key type or invalid key format")
+        private_key = parse_private_key(self.priv_key_str, self.passphrase)
+        self.logger.debug("Private key loaded ")
+        return private_key
 
     def _connect_ssh(self, private_key: Optional[paramiko.PKey]) -> None:
         """
@@ -108,9 +141,16 @@ class FTPUtil:
                 port=self.port,
                 username=self.user,
                 password=self.user_password,
-                pkey=private_key
+                pkey=private_key,
+                compress=self.compress,
+                timeout=self.connect_timeout,
+                banner_timeout=self.banner_timeout,
+                auth_timeout=self.auth_timeout,
+                channel_timeout=self.connect_timeout
             )
             self.logger.debug("SSH connection established")
+            if self.keepalive_interval:
+                self.ssh.get_transport().set_keepalive(self.keepalive_interval)
         except paramiko.SSHException as e:
             self.logger.error(f"Failed to establish SSH connection: {str(e)}")
             raise
@@ -123,12 +163,47 @@ class FTPUtil:
             IOError: If there's an error during SFTP session creation.
         """
         try:
-            self.sftp = self.ssh.open_sftp()
+            self.sftp = self._open_sftp_client()
             self.logger.debug("SFTP session started")
         except IOError as e:
             self.logger.error(f"Failed to open SFTP session: {str(e)}")
             raise
 
+    def is_alive(self) -> bool:
+        """Returns True if the SSH transport and SFTP channel are open (no round trip)."""
+        if not self.ssh or not self.sftp:
+            return False
+        transport = self.ssh.get_transport()
+        channel = self.sftp.get_channel()
+        return bool(transport and transport.is_active() and channel and not channel.closed)
+
+    def ping(self) -> bool:
+        """Returns True if the server answers a cheap SFTP request on the open channel."""
+        if not self.is_alive():
+            return False
+        try:
+            self.sftp.normalize('.')
+            return True
+        except Exception as e:
+            self.logger.debug(f"SFTP liveness check failed: {str(e)}")
+            return False
+
+    def open_extra_sftp_channel(self) -> paramiko.SFTPClient:
+        """
+        Opens an additional SFTP channel over the existing SSH connection (no new handshake).
+        The caller owns the returned client and must close it.
+        """
+        return self._open_sftp_client()
+
+    def _open_sftp_client(self) -> paramiko.SFTPClient:
+        sftp = paramiko.SFTPClient.from_transport(
+            self.ssh.get_transport(),
+            window_size=self.window_size,
+            max_packet_size=self.max_packet_size
+        )
+        sftp.get_channel().settimeout(self.operation_timeout)
+        return sftp
+
     def release_sftp_channel(self) -> None:
         """Closes the SFTP and SSH connections."""
         self._close_sftp()
@@ -0,0 +1,134 @@
+import asyncio
+import fnmatch
+import re
+import time
+import logging
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.models.ftp_file import FtpFile
+
+logger = logging.getLogger(__name__)
+
+
+class ListingCache:
+    """
+    TTL cache of remote folder listings, keyed by folder path.
+
+    Concurrent misses for the same folder share one load. Folders that were read
+    recently are reloaded by ``refresh`` (run in the background) so requests are
+    normally served from memory; our own write routes call ``invalidate``.
+    """
+
+    def __init__(self, loader: Callable[[str], Awaitable[List[FtpFile]]], ttl: float = 30, keep_warm: float = 600):
+        self.loader = loader
+        self.ttl = ttl
+        self.keep_warm = keep_warm
+        self._entries: Dict[str, Tuple[float, List[FtpFile]]] = {}
+        self._last_read: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Bumped on invalidation so a load that started earlier cannot store a stale listing
+        self._generation: Dict[str, int] = {}
+
+    async def get(self, folder: str) -> List[FtpFile]:
+        self._last_read[folder] = time.monotonic()
+        entry = self._fresh(folder)
+        if entry is not None:
+            return entry
+
+        lock = self._locks.setdefault(folder, asyncio.Lock())
+        async with lock:
+            entry = self._fresh(folder)
+            if entry is not None:
+                return entry
+            return await self._load(folder)
+
+    def invalidate(self, folder: Optional[str] = None) -> None:
+        """Drop one folder's listing, or every listing when no folder is given."""
+        folders = list(self._last_read) if folder is None else [folder]
+        for name in folders:
+            self._entries.pop(name, None)
+            self._generation[name] = self._generation.get(name, 0) + 1
+
+    async def refresh(self) -> None:
+        """Reload listings of folders read within the last ``keep_warm`` seconds."""
+        now = time.monotonic()
+        for folder, last_read in list(self._last_read.items()):
+            if now - last_read > self.keep_warm:
+                self._last_read.pop(folder, None)
+                self._entries.pop(folder, None)
+                continue
+            try:
+                await self._load(folder)
+            except Exception as e:
+                logger.warning(f"Background refresh of '{folder}' failed: {e}")
+
+    def _fresh(self, folder: str) -> Optional[List[FtpFile]]:
+        entry = self._entries.get(folder)
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+        return None
+
+    async def _load(self, folder: str) -> List[FtpFile]:
+        loaded_at = time.monotonic()
+        generation = self._generation.get(folder, 0)
+        files = await self.loader(folder)
+        if self._generation.get(folder, 0) == generation:
+            self._entries[folder] = (loaded_at, files)
+        return files
+
+
+REPORT_DATE_PATTERN = re.compile(r"_(\d{8})(?!\d)")
+SORT_KEYS = {
+    "name": lambda f: f.name,
+    "date": lambda f: (report_date(f.name) or date.min, f.name),
+    "size": lambda f: (f.size or 0, f.name),
+    "mtime": lambda f: (f.mtime or 0, f.name),
+}
+
+
+def report_date(name: str) -> Optional[date]:
+    """Date from the _YYYYMMDD part of a PRIME_RSI report filename, if present."""
+    for match in REPORT_DATE_PATTERN.finditer(name):
+        try:
+            return datetime.strptime(match.group(1), "%Y%m%d").date()
+        except ValueError:
+            continue
+    return None
+
+
+def query_files(files: List[FtpFile], pattern: Optional[str] = None, regex: Optional[str] = None,
+                date_from: Optional[date] = None, date_to: Optional[date] = None,
+                sort: Optional[str] = None, descending: bool = False,
+                offset: int = 0, limit: Optional[int] = None) -> Tuple[int, List[FtpFile]]:
+    """
+    Filter, sort and page a folder listing.
+
+    ``pattern`` is a glob and ``regex`` a regular expression (searched) on the filename;
+    the date range is inclusive and matches on the report date in the filename.
+    Returns the number of matching files and the requested page.
+
+    Raises:
+        re.error: If ``regex`` is not a valid regular expression.
+    """
+    compiled = re.compile(regex) if regex else None
+
+    if pattern or compiled or date_from or date_to:
+        matched = []
+        for f in files:
+            if pattern and not fnmatch.fnmatchcase(f.name, pattern):
+                continue
+            if compiled and not compiled.search(f.name):
+                continue
+            if date_from or date_to:
+                file_date = report_date(f.name)
+                if file_date is None or (date_from and file_date < date_from) or (date_to and file_date > date_to):
+                    continue
+            matched.append(f)
+        files = matched
+
+    if sort:
+        files = sorted(files, key=SORT_KEYS[sort], reverse=descending)
+
+    end = offset + limit if limit is not None else None
+    return len(files), files[offset:end]
@@ -0,0 +1,168 @@
+import asyncio
+import socket
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator
+
+import paramiko
+
+from app.ftp.folders import FolderManager
+from app.ftp.ftputil import FTPUtil
+
+# Errors that mean the connection itself is unusable and must not go back to the pool.
+# Plain OSError/IOError (e.g. FileNotFoundError) is a per-request failure and is not listed.
+CONNECTION_ERRORS = (paramiko.SSHException, EOFError, ConnectionError, socket.timeout)
+
+
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class SFTPPool:
+    """
+    Thread-safe, process-wide pool of connected FTPUtil instances.
+
+    At most ``max_size`` connections exist at once. Idle connections are reused
+    most-recently-used first; one that sat idle for longer than ``validate_after``
+    seconds is pinged before reuse, and one idle for longer than ``idle_timeout``
+    seconds is closed instead of reused.
+    """
+
+    def __init__(self, factory: Callable[[], FTPUtil], max_size: int = 4,
+                 idle_timeout: float = 300, validate_after: float = 30,
+                 acquire_timeout: float = 30):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self.acquire_timeout = acquire_timeout
+
+        # Remote folders known to exist, shared by every connection of this pool
+        self.folders = FolderManager()
+
+        self.logger = logging.getLogger(__name__)
+        self._idle: Deque[FTPUtil] = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._in_use = 0
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+
+    def acquire(self) -> FTPUtil:
+        """
+        Returns a connected FTPUtil, reusing an idle one when possible.
+
+        Blocks for up to ``acquire_timeout`` seconds and may do an SSH handshake, so it must run
+        on a worker thread (see AsyncSFTP). On the event loop thread it would also block the
+        coroutines that release slots, stalling the worker until the timeout.
+
+        Raises:
+            RuntimeError: If called on a thread with a running event loop.
+            TimeoutError: If every connection stays busy for ``acquire_timeout`` seconds.
+            paramiko.SSHException, IOError: If a new connection cannot be established.
+        """
+        if on_event_loop():
+            raise RuntimeError("SFTPPool.acquire blocks; run it off the event loop (AsyncSFTP.session)")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError("Timed out waiting for a free SFTP connection")
+        try:
+            ftputil = self._take_idle() or self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+        return ftputil
+
+    def release(self, ftputil: FTPUtil, discard: bool = False) -> None:
+        """Returns a connection to the pool, closing it if it is broken or ``discard`` is set."""
+        try:
+            if discard or not ftputil.is_alive():
+                self._close(ftputil)
+            else:
+                ftputil.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(ftputil)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[FTPUtil]:
+        """Context manager around acquire/release that discards connections on transport errors."""
+        ftputil = self.acquire()
+        discard = False
+        try:
+            yield ftputil
+        except CONNECTION_ERRORS:
+            discard = True
+            raise
+        finally:
+            self.release(ftputil, discard=discard)
+
+    def evict_idle(self) -> int:
+        """Closes connections idle for longer than ``idle_timeout``; returns how many were closed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [c for c in self._idle if now - c.last_used > self.idle_timeout]
+            for ftputil in expired:
+                self._idle.remove(ftputil)
+        for ftputil in expired:
+            self._close(ftputil)
+        if expired:
+            self.logger.debug(f"Evicted {len(expired)} idle SFTP connection(s)")
+        return len(expired)
+
+    def close(self) -> None:
+        """Closes every idle connection; busy ones are closed when released."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for ftputil in idle:
+            self._close(ftputil)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "created": self._created,
+                "reused": self._reused,
+                "discarded": self._discarded
+            }
+
+    def _take_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                ftputil = self._idle.pop()
+            idle_for = time.monotonic() - ftputil.last_used
+            if idle_for <= self.idle_timeout and ftputil.is_alive() and (idle_for <= self.validate_after or ftputil.ping()):
+                with self._lock:
+                    self._reused += 1
+                return ftputil
+            self._close(ftputil)
+
+    def _connect(self) -> FTPUtil:
+        ftputil = self.factory()
+        ftputil.acquire_sftp_channel()
+        ftputil.last_used = time.monotonic()
+        with self._lock:
+            self._created += 1
+        self.logger.info(f"Opened pooled SFTP connection to {ftputil.host}:{ftputil.port}")
+        return ftputil
+
+    def _close(self, ftputil: FTPUtil) -> None:
+        ftputil.release_sftp_channel()
+        with self._lock:
+            self._discarded += 1
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.db.archive import RECON_COLLECTIONS
+from app.db.mongo import recon_db
+
+MATCHED = "matched"
+MISSING = "missing"
+MISMATCHED = "mismatched"
+UNPARSED = "unparsed"
+
+
+def identifier_columns(fields: List[str]) -> Optional[Tuple[Optional[int], int]]:
+    """(ticket, eventid) column positions if ``fields`` is a header row, else None."""
+    names = [f.lower().replace("_", "").replace(" ", "") for f in fields]
+    event = next((i for i, name in enumerate(names) if "eventid" in name), None)
+    if event is None:
+        return None
+    ticket = next((i for i, name in enumerate(names) if "ticket" in name), None)
+    return ticket, event
+
+
+def find_ticket_number(value: Any, depth: int = 3) -> Optional[str]:
+    """First ``ticket_number`` in a decoded payload, searching nested objects."""
+    if not isinstance(value, dict) or depth < 0:
+        return None
+    if value.get("ticket_number") not in (None, ""):
+        return str(value["ticket_number"])
+    for nested in value.values():
+        ticket = find_ticket_number(nested, depth - 1)
+        if ticket:
+            return ticket
+    return None
+
+
+def document_ticket(doc: dict) -> Optional[str]:
+    try:
+        return find_ticket_number(json.loads(doc.get("payloadstr") or "{}"))
+    except (TypeError, ValueError):
+        return None
+
+
+def eventid_variants(eventids: List[str]) -> List:
+    """eventid is stored as a string or an int depending on the producer, so match both."""
+    values: List = list(eventids)
+    values.extend(int(e) for e in eventids if e.isdigit())
+    return values
+
+
+class ReportReconciler:
+    """
+    Matches report records against the recon collections by eventid.
+
+    Records are grouped into batches of ``batch_size`` and each batch is looked up in every
+    collection with one ``$in`` query (run concurrently); the lookup of one batch overlaps
+    with parsing of the next. Identifier columns come from a header row when the report has
+    one, otherwise from ``ticket_field``/``event_field``.
+
+    A record is ``matched`` when its eventid is in mainstaging, not in an error collection,
+    and the ticket numbers agree; ``mismatched`` when it is found but one of those checks
+    fails; ``missing`` when no collection has it; ``unparsed`` when it has no eventid.
+    """
+
+    def __init__(self, db=recon_db, collections=RECON_COLLECTIONS, batch_size: int = 500,
+                 ticket_field: int = 0, event_field: int = 1):
+        self.db = db
+        self.collections = collections
+        self.batch_size = batch_size
+        self.columns: Tuple[Optional[int], int] = (ticket_field, event_field)
+        self.summary = {"records": 0, "header": False, MATCHED: 0, MISSING: 0, MISMATCHED: 0, UNPARSED: 0}
+
+    async def lookup(self, eventids: List[str]) -> Dict[str, Dict[str, dict]]:
+        """{eventid: {collection: document}} for every eventid found."""
+        query = {"eventid": {"$in": eventid_variants(eventids)}}
+        projection = {"eventid": 1, "payloadstr": 1}
+        results = await asyncio.gather(*(
+            self.db[name].find(query, projection).to_list(None) for name in self.collections
+        ))
+        found: Dict[str, Dict[str, dict]] = {}
+        for name, docs in zip(self.collections, results):
+            for doc in docs:
+                found.setdefault(str(doc["eventid"]), {}).setdefault(name, doc)
+        return found
+
+    def identifiers(self, record: dict) -> Tuple[Optional[str], Optional[str]]:
+        fields = record["fields"]
+        ticket_col, event_col = self.columns
+
+        def field(col):
+            return fields[col] or None if col is not None and col < len(fields) else None
+
+        return field(ticket_col), field(event_col)
+
+    def classify(self, record: dict, ticket: Optional[str], eventid: Optional[str],
+                 found: Dict[str, dict]) -> dict:
+        result = {
+            "record": record["record"],
+            "line": record["line"],
+            "ticket_number": ticket,
+            "eventid": eventid,
+            "collections": list(found),
+            "reasons": []
+        }
+        if eventid is None:
+            result["status"] = UNPARSED
+            result["reasons"].append("No eventid in record")
+        elif not found:
+            result["status"] = MISSING
+        else:
+            if "mainstaging" not in found:
+                result["reasons"].append("Not in mainstaging")
+            errors = [name for name in found if name != "mainstaging"]
+            if errors:
+                result["reasons"].append(f"In {', '.join(errors)}")
+            for name, doc in found.items():
+                stored = document_ticket(doc)
+                if ticket and stored and stored != ticket:
+                    result["reasons"].append(f"ticket_number in {name} is {stored}")
+            result["status"] = MISMATCHED if result["reasons"] else MATCHED
+        self.summary[result["status"]] += 1
+        return result
+
+    async def _resolve(self, batch: List[Tuple[dict, Optional[str], Optional[str]]]) -> List[dict]:
+        eventids = list(dict.fromkeys(eventid for _, _, eventid in batch if eventid))
+        found = await self.lookup(eventids) if eventids else {}
+        return [self.classify(record, ticket, eventid, found.get(eventid, {}) if eventid else {})
+                for record, ticket, eventid in batch]
+
+    async def reconcile(self, records: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """Yield one result per report record, in file order."""
+        batch: List[Tuple[dict, Optional[str], Optional[str]]] = []
+        pending: Optional[asyncio.Task] = None
+        try:
+            async for record in records:
+                if record["record"] == 0:
+                    header = identifier_columns(record["fields"])
+                    if header is not None:
+                        self.columns = header
+                        self.summary["header"] = True
+                        continue
+
+                self.summary["records"] += 1
+                batch.append((record, *self.identifiers(record)))
+                if len(batch) >= self.batch_size:
+                    if pending is not None:
+                        for result in await pending:
+                            yield result
+                    pending, batch = asyncio.create_task(self._resolve(batch)), []
+
+            if pending is not None:
+                for result in await pending:
+                    yield result
+                pending = None
+            for result in await self._resolve(batch):
+                yield result
+        finally:
+            if pending is not None:
+                pending.cancel()
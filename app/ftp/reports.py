@@ -0,0 +1,175 @@
+import time
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Hashable, Iterable, List, Optional, Tuple
+
+DELIMITERS = ["|", "\t", ","]
+
+
+def report_type(name: str) -> str:
+    """'incoming' or 'outgoing' for PRIME_RSI daily reports, from the filename."""
+    lowered = name.lower()
+    if "incoming" in lowered:
+        return "incoming"
+    if "outgoing" in lowered:
+        return "outgoing"
+    return "unknown"
+
+
+def detect_delimiter(line: str) -> Optional[str]:
+    for delimiter in DELIMITERS:
+        if delimiter in line:
+            return delimiter
+    return None
+
+
+def parse_record(line: str, delimiter: Optional[str]) -> List[str]:
+    if delimiter is None:
+        return [line.strip()]
+    return [field.strip() for field in line.split(delimiter)]
+
+
+class RecordParser:
+    """
+    Turns raw report lines into records, one line at a time.
+
+    A record is a non-blank line split on the first delimiter ('|', tab or ',') found in the
+    file. The parser keeps the running summary (record and blank line counts, field widths).
+    """
+
+    def __init__(self):
+        self.line_no = 0
+        self.summary = {"total_records": 0, "blank_lines": 0, "delimiter": None, "min_fields": None, "max_fields": None}
+
+    def feed(self, raw: bytes) -> Optional[Dict]:
+        self.line_no += 1
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        summary = self.summary
+        if not line.strip():
+            summary["blank_lines"] += 1
+            return None
+
+        if summary["delimiter"] is None and summary["total_records"] == 0:
+            summary["delimiter"] = detect_delimiter(line)
+        fields = parse_record(line, summary["delimiter"])
+
+        index = summary["total_records"]
+        summary["total_records"] += 1
+        summary["min_fields"] = min(summary["min_fields"] or len(fields), len(fields))
+        summary["max_fields"] = max(summary["max_fields"] or 0, len(fields))
+        return {"record": index, "line": self.line_no, "fields": fields, "raw": line}
+
+
+class ReportPage:
+    """The records a preview asked for: ``offset``/``limit``, or the last ``tail`` records."""
+
+    def __init__(self, offset: int = 0, limit: Optional[int] = None, tail: Optional[int] = None):
+        self.offset = offset
+        self.end = offset + limit if limit is not None else None
+        self.tail = tail
+        self._records: Any = deque(maxlen=tail) if tail else []
+
+    def add(self, record: Dict) -> bool:
+        """Keep ``record`` if it is on the page; False once the page is already complete."""
+        index = record["record"]
+        if self.tail or (index >= self.offset and (self.end is None or index < self.end)):
+            self._records.append(record)
+        elif self.end is not None and index >= self.end:
+            return False
+        return True
+
+    @property
+    def records(self) -> List[Dict]:
+        return list(self._records)
+
+
+def scan_report(lines: Iterable[bytes], offset: int = 0, limit: Optional[int] = None,
+                tail: Optional[int] = None, stop_early: bool = False) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Parse report lines into records in a single pass.
+
+    Returns the selected records (``offset``/``limit``, or the last ``tail`` records) and
+    the parser summary. With ``stop_early`` the scan ends once the page is complete, in
+    which case the summary only covers the lines read.
+    """
+    parser = RecordParser()
+    page = ReportPage(offset, limit, tail)
+    for raw in lines:
+        record = parser.feed(raw)
+        if record is not None and not page.add(record) and stop_early:
+            break
+    return page.records, parser.summary
+
+
+async def read_report(session, path: str, size: Optional[int], offset: int = 0, limit: Optional[int] = None,
+                      tail: Optional[int] = None, stop_early: bool = False, chunk_size: int = 256 * 1024,
+                      prefetch_concurrency: Optional[int] = None) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Like ``scan_report``, for a remote report read in ``chunk_size`` chunks. Each chunk is
+    its own SFTP operation, so a large file is bounded per chunk rather than as a whole.
+    """
+    parser = RecordParser()
+    page = ReportPage(offset, limit, tail)
+    # Only read ahead when the whole file is needed anyway
+    records = iter_report_records(session, path, chunk_size, parser, None if stop_early else size, prefetch_concurrency)
+    async with aclosing(records):
+        async for record in records:
+            if not page.add(record) and stop_early:
+                break
+    return page.records, parser.summary
+
+
+async def iter_report_records(session, path: str, chunk_size: int, parser: RecordParser,
+                              prefetch_size: Optional[int] = None,
+                              prefetch_concurrency: Optional[int] = None) -> AsyncIterator[Dict]:
+    """
+    Yield the records of a remote report as chunks arrive, holding at most one chunk
+    plus a partial line in memory. ``session`` is an AsyncSFTPSession; with
+    ``prefetch_size`` the first ``prefetch_size`` bytes are requested ahead of the reads.
+    """
+    remote_file = await session.open(path, 'rb')
+    try:
+        if prefetch_size:
+            await session.run(remote_file.prefetch, prefetch_size, prefetch_concurrency)
+        pending = b""
+        while True:
+            chunk = await session.run(remote_file.read, chunk_size)
+            if not chunk:
+                break
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for raw in lines:
+                record = parser.feed(raw)
+                if record is not None:
+                    yield record
+        if pending:
+            record = parser.feed(pending)
+            if record is not None:
+                yield record
+    finally:
+        await session.run(remote_file.close)
+
+
+class LRUCache:
+    """Small in-process LRU map, used for parsed report summaries, pages and results."""
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        if key not in self._entries:
+            return None
+        value, stored_at = self._entries[key]
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
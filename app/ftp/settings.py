@@ -0,0 +1,104 @@
+import base64
+import functools
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import paramiko
+
+from app.ftp.ftputil import parse_private_key
+
+logger = logging.getLogger(__name__)
+
+
+class SFTPConfigError(ValueError):
+    """The PRIME_SFTP_* configuration is missing or cannot be used."""
+
+
+def _env(name: str) -> Optional[str]:
+    value = os.getenv(name)
+    return value.strip('"').strip("'") if value else None
+
+
+def _key_from_env(name: str, local: bool) -> Optional[str]:
+    """Key material from the environment: escaped newlines restored, base64-decoded when running LOCAL."""
+    value = os.getenv(name)
+    if not value:
+        return None
+    value = value.replace('\\n', '\n')
+    if local:
+        try:
+            value = base64.b64decode(value).decode("utf-8")
+        except Exception as e:
+            raise SFTPConfigError(f"Failed to decode {name}: {e}")
+    return value
+
+
+@dataclass(frozen=True)
+class SFTPSettings:
+    """
+    Validated PRIME SFTP connection settings, with the private key already parsed.
+
+    Built once per process by ``get_sftp_settings`` and shared by every pooled
+    connection, so no connection re-reads the environment or re-parses the key.
+    """
+    host: str
+    port: int
+    user: str
+    password: Optional[str]
+    private_key: Optional[paramiko.PKey]
+    pub_key_str: Optional[str]
+    known_hosts: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "SFTPSettings":
+        """
+        Raises:
+            SFTPConfigError: If a required setting is missing or a key cannot be decoded or parsed.
+        """
+        host = _env('PRIME_SFTP_SERVER')
+        user = _env('PRIME_SFTP_USER')
+        if not host or not user:
+            raise SFTPConfigError("PRIME_SFTP_SERVER and PRIME_SFTP_USER must be set")
+
+        try:
+            port = int(_env('PRIME_SFTP_SERVER_PORT') or 22)
+        except ValueError:
+            raise SFTPConfigError(f"PRIME_SFTP_SERVER_PORT is not a number: {os.getenv('PRIME_SFTP_SERVER_PORT')!r}")
+
+        local = os.getenv("ENV", "PROD").upper() == "LOCAL"
+        priv_key_str = _key_from_env('PRIME_SFTP_PRIV_KEY_FILE', local)
+        pub_key_str = _key_from_env('PRIME_SFTP_PUB_KEY_FILE', local)
+        password = os.getenv('PRIME_SFTP_PASS')
+        if not priv_key_str and not password:
+            raise SFTPConfigError("Either PRIME_SFTP_PASS or PRIME_SFTP_PRIV_KEY_FILE must be set")
+
+        private_key = None
+        if priv_key_str:
+            try:
+                private_key = parse_private_key(priv_key_str, os.getenv('PRIME_SFTP_PRIV_KEY_FILE_PASSPHRASE'))
+            except ValueError as e:
+                raise SFTPConfigError(f"PRIME_SFTP_PRIV_KEY_FILE: {e}")
+
+        return cls(
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            private_key=private_key,
+            pub_key_str=pub_key_str
+        )
+
+
+def sftp_configured() -> bool:
+    return bool(os.getenv('PRIME_SFTP_SERVER'))
+
+
+@functools.lru_cache(maxsize=1)
+def get_sftp_settings() -> SFTPSettings:
+    """The process-wide SFTP settings, loaded and validated on first use."""
+    settings = SFTPSettings.from_env()
+    logger.info(f"FTP server: {settings.host}:{settings.port}")
+    logger.info(f"FTP user: {settings.user}")
+    return settings
@@ -2,10 +2,22 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, RedirectResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import math
 import os
 import logging
 
-from app.routes import config, health, recon, ftp, errors, producer
+from app.auth.auth import authenticator
+from app.config import Config
+from app.db.archive import run_archival
+from app.db.counters import reconcile_all_counters
+from app.db.leases import archiver_lease, counter_reconciler_lease
+from app.db.mongo import warm_up_mongo, close_mongo_client
+from app.ftp.breaker import CircuitOpenError
+from app.ftp.settings import get_sftp_settings, sftp_configured
+from app.routes import config, health, recon, ftp, errors, producer, archive
+from app.services.http_client import start_http_client, close_http_client
+from app.util.background import start_periodic_task, cancel_tasks
 
 # Logging setup
 LOGGER_FORMAT = "[RIDE_CONSOLE_API] %(asctime)s %(levelname)s [%(name)s] %(message)s"
@@ -14,7 +26,56 @@ logging.basicConfig(
     format=os.getenv("LOGGER_FORMAT", LOGGER_FORMAT)
 )
 
-app = FastAPI(title="RIDE Console API", version="0.0.1")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # A broken SFTP configuration should stop startup, not fail the first FTP request
+    if sftp_configured():
+        get_sftp_settings()
+    else:
+        logging.getLogger(__name__).warning("PRIME_SFTP_SERVER is not set; FTP endpoints are unavailable")
+
+    # Open Mongo connections before taking traffic, so the first requests skip the handshakes
+    await warm_up_mongo()
+
+    # One pooled HTTP client per worker, so producer calls reuse warm connections
+    start_http_client()
+
+    # Load the identity provider's signing keys now, so the first requests do not wait on them
+    try:
+        await authenticator.jwks.refresh()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not preload signing keys; retrying on first use: {e}")
+
+    # Background jobs owned by this worker; cancelled on shutdown
+    tasks = [
+        # One worker across the deployment recounts and archives; the others skip while it holds the lease
+        start_periodic_task("counter-reconciler", Config.COUNTER_RECONCILE_INTERVAL,
+                            counter_reconciler_lease.exclusive(reconcile_all_counters, Config.COUNTER_RECONCILE_INTERVAL * 2)),
+        start_periodic_task("archiver", Config.ARCHIVE_INTERVAL,
+                            archiver_lease.exclusive(run_archival, Config.ARCHIVE_INTERVAL * 2), initial_delay=60),
+        start_periodic_task("sftp-idle-eviction", Config.SFTP_POOL_IDLE_TIMEOUT, ftp.evict_idle_sftp_connections),
+        start_periodic_task("ftp-listing-refresh", Config.SFTP_LISTING_TTL / 2, ftp.refresh_listings),
+        start_periodic_task("sftp-breaker-probe", max(1, Config.SFTP_BREAKER_RESET_TIMEOUT / 3), ftp.probe_sftp_server),
+        start_periodic_task("ftp-checksum-index", Config.CHECKSUM_INDEX_INTERVAL, ftp.index_checksums, initial_delay=30),
+        start_periodic_task("jwks-refresh", Config.AUTH_JWKS_REFRESH_INTERVAL, authenticator.jwks.refresh,
+                            initial_delay=Config.AUTH_JWKS_REFRESH_INTERVAL),
+        start_periodic_task("producer-outbox", Config.OUTBOX_POLL_INTERVAL, producer.dispatch_outbox, wake=producer.outbox_wakeup),
+    ]
+    yield
+    await cancel_tasks(tasks)
+    for lease in (counter_reconciler_lease, archiver_lease):
+        try:
+            await lease.release()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not release the '{lease.name}' lease: {e}")
+    ftp.sftp_runner.shutdown()
+    ftp.sftp_pool.close()
+    await close_http_client()
+    close_mongo_client()
+
+
+app = FastAPI(title="RIDE Console API", version="0.0.1", lifespan=lifespan)
 
 # API routers
 app.include_router(config.router, prefix="/api")
@@ -23,6 +84,7 @@ app.include_router(recon.router, prefix="/api/recon")
 app.include_router(ftp.router, prefix="/api/ftp")
 app.include_router(errors.router, prefix="/api/errors")
 app.include_router(producer.router, prefix="/api/producer")
+app.include_router(archive.router, prefix="/api/archive")
 
 # Mount static content
 app.mount("/assets", StaticFiles(directory="app/static_content/assets", check_dir=False), name="assets")
@@ -48,6 +110,16 @@ async def spa_router(request: Request, full_path: str):
     return JSONResponse(status_code=404, content={"error": "index.html not found"})
 
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # The SFTP server is down: fail fast instead of tying the worker up in connect attempts
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after) or 1)}
+    )
+
+
 @app.exception_handler(404)
 async def custom_404_handler(request: Request, __):
     # Return JSON for missing API routes
@@ -26,6 +26,7 @@ class Error(BaseModel):
     class_: str = Field(alias="_class", serialization_alias="_class")
     fixed: Optional[bool] = Field(default=False, description="Mark if the error is fixed")
     under_analysis: Optional[bool] = Field(default=False, description="Mark if the error is under analysis")
+    fixed_at: Optional[datetime] = Field(default=None, description="When the error was marked fixed")
     comments: Optional[List[ErrorComment]] = None
 
 model_config = {
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class FtpFile(BaseModel):
+    name: str
+    size: Optional[int] = None
+    mtime: Optional[int] = None
+    mode: Optional[int] = None
+
+    @classmethod
+    def from_attr(cls, attr) -> "FtpFile":
+        """Build from a paramiko SFTPAttributes returned by listdir_attr"""
+        return cls(name=attr.filename, size=attr.st_size, mtime=attr.st_mtime, mode=attr.st_mode)
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Query, HTTPException, Depends, Path
+from typing import List, Optional
+from app.models.error import Error
+from app.models.event import Event
+from app.db.mongo import recon_db, ride_services_db
+from app.db.archive import archive_collection_name, get_last_run, RECON_COLLECTIONS
+from app.util.common import clean_mongo_doc
+from app.auth.auth import authenticate_user
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get(
+    "/errors",
+    response_model=List[Error],
+    tags=["archive"],
+    summary="Query archived (fixed) error records, newest first"
+)
+async def get_archived_errors(
+    ticketNo: Optional[str] = Query(default=None),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    user: dict = Depends(authenticate_user)
+):
+    query = {"ticketNo": ticketNo} if ticketNo else {}
+    cursor = ride_services_db[archive_collection_name("errors")].find(query).sort("_id", -1).skip(skip).limit(limit)
+    docs = await cursor.to_list()
+    return [Error(**clean_mongo_doc(doc)) for doc in docs]
+
+
+@router.get(
+    "/recon/{collection_name}",
+    response_model=List[Event],
+    tags=["archive"],
+    summary="Query archived recon rows, newest first"
+)
+async def get_archived_recon(
+    collection_name: str = Path(..., description="One of mainstaging, errortable, errorstaging"),
+    eventid: Optional[str] = Query(default=None),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
+    user: dict = Depends(authenticate_user)
+):
+    if collection_name not in RECON_COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown recon collection '{collection_name}'")
+
+    query = {"eventid": eventid} if eventid else {}
+    cursor = recon_db[archive_collection_name(collection_name)].find(query).sort("_id", -1).skip(skip).limit(limit)
+    docs = await cursor.to_list()
+    return [Event(**clean_mongo_doc(doc)) for doc in docs]
+
+
+@router.get(
+    "/status",
+    tags=["archive"],
+    summary="Outcome of the last archival run, by whichever worker held the archiver lease"
+)
+async def get_archive_status(user: dict = Depends(authenticate_user)):
+    return await get_last_run() or {"message": "No archival run yet"}
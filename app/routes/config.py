@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from app.config import Config
 from typing import List;
 from app.models.event import Event
-from app.auth.auth  import authenticate_user
+from app.auth.auth  import authenticate_user, authenticator
 from fastapi_oidc import IDToken
 from fastapi_oidc import get_auth
 from fastapi import Query, HTTPException
@@ -30,4 +30,9 @@ async def config():
     return Config.FRONTEND_CONFIG
 
 
+@router.get("/auth/metrics", summary="Token validation timings, cached tokens and signing key state for this worker")
+async def auth_metrics(user: dict = Depends(authenticate_user)):
+    return authenticator.snapshot()
+
+
 
@@ -3,15 +3,25 @@ from bson import ObjectId
 from typing import List, Optional
 from app.models.error import Error
 from app.db.mongo import ride_services_db
+from app.db.counters import error_counters, NEW_QUERY
 from app.util.common import clean_mongo_doc
 from pydantic import BaseModel
 from datetime import datetime
+from pymongo import ReturnDocument
 import logging
 from app.auth.auth import authenticate_user
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Update pipelines; fixed_at keeps the time an error was first marked fixed, which archival ages from
+SET_FIXED = [{"$set": {
+    "fixed": True,
+    "under_analysis": False,
+    "fixed_at": {"$cond": [{"$eq": ["$fixed", True]}, "$fixed_at", "$$NOW"]}
+}}]
+SET_UNDER_ANALYSIS = [{"$set": {"under_analysis": True, "fixed": False}}, {"$unset": "fixed_at"}]
+
 class ObjectIdRequest(BaseModel):
     object_id: str
 
@@ -60,14 +70,17 @@ async def set_fixed_true(request: ObjectIdRequest, user: dict = Depends(authenti
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
-    result = await ride_services_db["errors"].update_one(
+    before = await ride_services_db["errors"].find_one_and_update(
         {"_id": obj_id},
-        {"$set": {"fixed": True, "under_analysis": False}}
+        SET_FIXED,
+        return_document=ReturnDocument.BEFORE
     )
 
-    if result.matched_count == 0:
+    if before is None:
         raise HTTPException(status_code=404, detail="Error not found")
 
+    await error_counters.apply(before, {**before, "fixed": True, "under_analysis": False})
+
     return {"message": "Set fixed = true, under_analysis = false", "object_id": request.object_id}
 
 #  Update individual record: set under_analysis = True, fixed = False
@@ -78,14 +91,17 @@ async def set_under_analysis_true(request: ObjectIdRequest, user: dict = Depends
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
-    result = await ride_services_db["errors"].update_one(
+    before = await ride_services_db["errors"].find_one_and_update(
         {"_id": obj_id},
-        {"$set": {"under_analysis": True, "fixed": False}}
+        SET_UNDER_ANALYSIS,
+        return_document=ReturnDocument.BEFORE
     )
 
-    if result.matched_count == 0:
+    if before is None:
         raise HTTPException(status_code=404, detail="Error not found")
 
+    await error_counters.apply(before, {**before, "under_analysis": True, "fixed": False})
+
     return {"message": "Set under_analysis = true, fixed = false", "object_id": request.object_id}
 
 #  Set ALL under_analysis = True, fixed = False
@@ -93,8 +109,10 @@ async def set_under_analysis_true(request: ObjectIdRequest, user: dict = Depends
 async def set_all_under_analysis_true(user: dict = Depends(authenticate_user)):
     result = await ride_services_db["errors"].update_many(
         {},
-        {"$set": {"under_analysis": True, "fixed": False}}
+        SET_UNDER_ANALYSIS
     )
+    # Recounted rather than set from matched_count, which misses errors inserted meanwhile
+    await error_counters.reconcile()
     return {
         "message": "Set under_analysis = true, fixed = false for all",
         "matched_count": result.matched_count,
@@ -106,8 +124,10 @@ async def set_all_under_analysis_true(user: dict = Depends(authenticate_user)):
 async def set_all_fixed_true(user: dict = Depends(authenticate_user)):
     result = await ride_services_db["errors"].update_many(
         {},
-        {"$set": {"fixed": True, "under_analysis": False}}
+        SET_FIXED
     )
+    # Recounted rather than set from matched_count, which misses errors inserted meanwhile
+    await error_counters.reconcile()
     return {
         "message": "Set fixed = true, under_analysis = false for all",
         "matched_count": result.matched_count,
@@ -126,32 +146,17 @@ async def get_under_analysis_errors(user: dict = Depends(authenticate_user)):
 
 @router.get("/new", response_model=List[Error], tags=["error"])
 async def get_new_errors(user: dict = Depends(authenticate_user)):
-    query = {
-        "$and": [
-            {"$or": [{"fixed": False}, {"fixed": {"$exists": False}}]},
-            {"$or": [{"under_analysis": False}, {"under_analysis": {"$exists": False}}]}
-        ]
-    }
-    docs = await ride_services_db["errors"].find(query).to_list()
+    docs = await ride_services_db["errors"].find(NEW_QUERY).to_list()
     return parse_errors(docs)
 
 @router.get("/fixed/count", tags=["error"])
 async def count_fixed_errors(user: dict = Depends(authenticate_user)):
-    count = await ride_services_db["errors"].count_documents({"fixed": True})
-    return {"count": count}
+    return {"count": await error_counters.get("fixed")}
 
 @router.get("/under-analysis/count", tags=["error"])
 async def count_under_analysis_errors(user: dict = Depends(authenticate_user)):
-    count = await ride_services_db["errors"].count_documents({"under_analysis": True})
-    return {"count": count}
+    return {"count": await error_counters.get("under_analysis")}
 
 @router.get("/new/count", tags=["error"])
 async def count_new_errors(user: dict = Depends(authenticate_user)):
-    query = {
-        "$and": [
-            {"$or": [{"fixed": False}, {"fixed": {"$exists": False}}]},
-            {"$or": [{"under_analysis": False}, {"under_analysis": {"$exists": False}}]}
-        ]
-    }
-    count = await ride_services_db["errors"].count_documents(query)
-    return {"count": count}
+    return {"count": await error_counters.get("new")}
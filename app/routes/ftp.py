@@ -1,17 +1,35 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, Query, HTTPException, Depends, Header, Response
+from typing import List, Optional, Tuple, AsyncIterator, Union, Literal
+from datetime import date
 from app.db.mongo import recon_db
+from app.db.checksums import ftp_checksums
 from app.ftp.ftputil import FTPUtil
+from app.ftp.settings import get_sftp_settings
+from app.ftp.pool import SFTPPool
+from app.ftp.async_sftp import AsyncSFTP
+from app.ftp.breaker import CircuitOpenError, sftp_breaker
+from app.ftp.bundle import stream_zip
+from app.ftp.listing import ListingCache, query_files, report_date
+from app.ftp.reports import LRUCache, RecordParser, iter_report_records, read_report, report_type
+from app.ftp.reconcile import ReportReconciler, MATCHED
+from app.models.ftp_file import FtpFile
+from app.config import Config
+from app.util.common import ndjson
 import os
 import logging
-import base64
 import contextvars
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager
 import errno
+import fnmatch
+import re
+import time
+import asyncio
+import hashlib
+import uuid
 from fastapi.responses import StreamingResponse
-from io import BytesIO
 from app.auth.auth import authenticate_user
 from fastapi import File, UploadFile
+from pydantic import BaseModel, Field
 
 # Holds the current connection (per async context)
 current_ftp_connection = contextvars.ContextVar("current_ftp_connection", default=None)
@@ -32,35 +50,34 @@ MOCK_DATA = [
 
 
 
+def write_chunk(remote_file, hasher, chunk: bytes) -> None:
+    """Hash and write one upload chunk (blocking; run via the SFTP thread pool)"""
+    hasher.update(chunk)
+    remote_file.write(chunk)
 
-
-
-def decode (key: str) -> str:
-    decoded_bytes = base64.b64decode(key )
-    decoded_key  = decoded_bytes.decode("utf-8")  # convert bytes to string
-    return decoded_key
-
-def ensure_folder_exists(sftp, folder_path: str) -> None:
-    """Ensure the specified folder exists in SFTP"""
+def replace_remote_file(sftp, tmp_path: str, remote_path: str) -> None:
+    """Atomically move a completed upload to its final name, replacing any existing file"""
     try:
-        logger.debug(f"Checking if folder exists: {folder_path}")
-        sftp.stat(folder_path)
-        logger.info(f"Folder exists: {folder_path}")
+        sftp.posix_rename(tmp_path, remote_path)
     except IOError:
-        logger.info(f"Creating folder: {folder_path}")
+        # Server without the posix-rename extension: plain rename refuses to overwrite
         try:
-            sftp.mkdir(folder_path)
-        except IOError as e:
-            # If parent directory doesn't exist, try to create it
-            parent_dir = os.path.dirname(folder_path)
-            if parent_dir:
-                logger.info(f"Parent folder doesn't exist, creating: {parent_dir}")
-                try:
-                    sftp.stat(parent_dir)
-                except IOError:
-                    sftp.mkdir(parent_dir)
-                # Try creating the original folder again
-                sftp.mkdir(folder_path)
+            sftp.remove(remote_path)
+        except FileNotFoundError:
+            pass
+        sftp.rename(tmp_path, remote_path)
+
+async def hash_remote_file(session, sftp, remote_path: str, size: int) -> str:
+    """SHA-256 of a remote file read through ``sftp``, one SFTP operation per chunk"""
+    hasher = hashlib.sha256()
+    remote_file = await session.run(sftp.open, remote_path, 'rb')
+    try:
+        await session.run(remote_file.prefetch, size, Config.SFTP_PREFETCH_CONCURRENCY or None)
+        while chunk := await session.run(remote_file.read, Config.SFTP_DOWNLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    finally:
+        await session.run(remote_file.close)
+    return hasher.hexdigest()
 
 def get_full_path(*parts: str) -> str:
     """
@@ -69,115 +86,262 @@ def get_full_path(*parts: str) -> str:
     # Join all parts with '/', remove duplicate slashes, and strip leading/trailing slashes
     return '/'.join(p.strip('/') for p in parts if p).strip('/')
 
-async def connect_to_ftp():
-    host = os.getenv('PRIME_SFTP_SERVER')
-    env = os.getenv("ENV", "PROD").upper()
-    port = int(os.getenv('PRIME_SFTP_SERVER_PORT', '22').strip('"').strip("'"))
-    user = os.getenv('PRIME_SFTP_USER')
-    user_password = os.getenv('PRIME_SFTP_PASS')
-    priv_key_str = os.getenv('PRIME_SFTP_PRIV_KEY_FILE').replace('\\n', '\n')
-
+def create_ftputil() -> FTPUtil:
+    """Builds an unconnected FTPUtil from the process-wide SFTP settings; used as the pool factory."""
+    settings = get_sftp_settings()
+    return FTPUtil(
+        host=settings.host,
+        port=settings.port,
+        user=settings.user,
+        user_password=settings.password,
+        priv_key_str=None,
+        pub_key_str=settings.pub_key_str,
+        private_key=settings.private_key,
+        known_hosts=settings.known_hosts,
+        keepalive_interval=Config.SFTP_KEEPALIVE_INTERVAL,
+        window_size=Config.SFTP_WINDOW_SIZE or None,
+        max_packet_size=Config.SFTP_MAX_PACKET_SIZE or None,
+        compress=Config.SFTP_COMPRESS,
+        connect_timeout=Config.SFTP_CONNECT_TIMEOUT,
+        banner_timeout=Config.SFTP_BANNER_TIMEOUT,
+        auth_timeout=Config.SFTP_AUTH_TIMEOUT,
+        operation_timeout=Config.SFTP_OPERATION_TIMEOUT
+    )
 
-    priv_key_file_passphrase = os.getenv('PRIME_SFTP_PRIV_KEY_FILE_PASSPHRASE', None)
-    pub_key_str = os.getenv('PRIME_SFTP_PUB_KEY_FILE').replace('\\n', '\n')
+# Process-wide pool of SFTP connections shared by every route
+sftp_pool = SFTPPool(
+    create_ftputil,
+    max_size=Config.SFTP_POOL_SIZE,
+    idle_timeout=Config.SFTP_POOL_IDLE_TIMEOUT,
+    validate_after=Config.SFTP_POOL_VALIDATE_AFTER,
+    acquire_timeout=Config.SFTP_POOL_ACQUIRE_TIMEOUT
+)
 
-    if env == "LOCAL":
-        try:
+# Blocking paramiko calls run on a dedicated thread pool, never on the event loop
+sftp_runner = AsyncSFTP(
+    sftp_pool,
+    max_workers=Config.SFTP_MAX_WORKERS,
+    operation_timeout=Config.SFTP_OPERATION_TIMEOUT,
+    breaker=sftp_breaker
+)
 
-            priv_key_str  = decode(priv_key_str)
-            pub_key_str  = decode(pub_key_str)
+async def evict_idle_sftp_connections():
+    await sftp_runner.call(sftp_pool.evict_idle)
 
+async def probe_sftp_server():
+    await sftp_runner.probe()
 
-        except Exception as e:
-            raise ValueError(f"Failed to decode  key: {e}")
+@asynccontextmanager
+async def ftp_connection():
+    existing_session = current_ftp_connection.get()
 
-    # Base path and folder configuration
-    ftp_instance_folder = os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev')
-    primerecon_folder = os.getenv('PRIMERECON_FTP_FOLDER', 'primerecon')
-    primerecon_archive_folder = os.getenv('PRIMERECON_ARCHIVE_FOLDER', 'primerecon_archive')
-    full_primerecon_path = '/' + get_full_path(ftp_instance_folder, primerecon_folder)
-    full_archive_path = '/' +get_full_path(ftp_instance_folder, primerecon_archive_folder)
-     # Log environment variables
-    #logger.info(f"Recon type: {recon_type.upper()}")
-    logger.info(f"FTP server: {host}:{port}")
-    logger.info(f"FTP user: {user}")
-    logger.info(f"Full primerecon path: {full_primerecon_path}")
-    logger.info(f"Full archive path: {full_archive_path}")
+    if existing_session:
+        yield existing_session
+        return
 
+    async with sftp_runner.session() as session:
+        token = current_ftp_connection.set(session)
+        try:
+            yield session
+        finally:
+            current_ftp_connection.reset(token)
 
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single 'bytes=start-end' Range header into inclusive offsets.
+    Returns None for headers we do not handle (multiple ranges, other units) so the full file is sent.
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
 
-    ftputil = None
+    start_str, _, end_str = spec.strip().partition('-')
     try:
-        # Initialize FTP connection
-        ftputil = FTPUtil(
-            host=host,
-            port=port,
-            user=user,
-            user_password=user_password,
-            priv_key_str=priv_key_str,
-            pub_key_str=pub_key_str,
-            passphrase=priv_key_file_passphrase,
-            known_hosts=None
-        )
-        sftp = ftputil.acquire_sftp_channel()
-        logger.info(f"Connected to SFTP server: {host}:{port} as {user}")
-        return ftputil
-    except Exception as e:
-        logger.error(f"Critical error in file processing: {str(e)}")
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(size - int(end_str), 0)
+            end = size - 1
+    except ValueError:
         return None
-    finally:
-        if ftputil:
-            ftputil.release_sftp_channel()
 
-@asynccontextmanager
-async def ftp_connection():
-    existing_conn = current_ftp_connection.get()
-
-    if existing_conn:
-        yield existing_conn
-        return
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
 
-    ftputil = None
+async def stream_remote_file(remote_path: str, start: int, end: int) -> AsyncIterator[bytes]:
+    """
+    Yield bytes start..end (inclusive) of a remote file as they arrive.
+    Holds one pooled connection for the life of the response and prefetches ahead of the reader.
+    """
+    async with sftp_runner.session() as session:
+        remote_file = await session.open(remote_path, 'rb')
+        try:
+            await session.run(remote_file.seek, start)
+            await session.run(remote_file.prefetch, end + 1, Config.SFTP_PREFETCH_CONCURRENCY or None)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await session.run(remote_file.read, min(Config.SFTP_DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            await session.run(remote_file.close)
+
+async def record_checksum(remote_path: str, folder: str, name: str, size: int, mtime: Optional[int], sha256: str) -> None:
+    """Store a checksum computed in passing; the index is best effort, so failures are only logged"""
     try:
-        ftputil = await connect_to_ftp()
-        if not ftputil:
-            raise RuntimeError("Failed to establish SFTP connection")
+        await ftp_checksums.record(remote_path, folder, name, size, mtime, sha256)
+    except Exception as e:
+        logger.warning(f"Could not record checksum for '{remote_path}': {e}")
+
+async def hash_while_streaming(chunks: AsyncIterator[bytes], remote_path: str, folder: str, name: str,
+                               size: int, mtime: Optional[int]) -> AsyncIterator[bytes]:
+    """Pass a full download through while hashing it, and index the checksum once it completes"""
+    hasher = hashlib.sha256()
+    received = 0
+    async for chunk in chunks:
+        hasher.update(chunk)
+        received += len(chunk)
+        yield chunk
+    if received == size:
+        await record_checksum(remote_path, folder, name, size, mtime, hasher.hexdigest())
+
+async def download_remote_file(folder: str, filename: str, range_header: Optional[str], if_range: Optional[str]) -> StreamingResponse:
+    """Stream a remote file, honouring Range/If-Range so interrupted downloads can resume."""
+    remote_path = '/' + get_full_path(folder, filename)
 
-        current_ftp_connection.set(ftputil)
-        yield ftputil
-    finally:
-        if ftputil:
-            ftputil.release_sftp_channel()
-            current_ftp_connection.set(None)
+    async with ftp_connection() as session:
+        try:
+            attrs = await session.stat(remote_path)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise HTTPException(status_code=404, detail=f"File '{filename}' not found")
+            logger.error(f"Download error: {e}")
+            raise HTTPException(status_code=500, detail="Failed to download file")
 
-async def list_recon_files() -> List[str]:
-    folder = '/' + get_full_path(
+    size = attrs.st_size
+    etag = f'"{size:x}-{int(attrs.st_mtime or 0):x}"'
+    headers = {
+        "Content-Disposition": f"attachment; filename={os.path.basename(filename)}",
+        "Accept-Ranges": "bytes",
+        "ETag": etag
+    }
+
+    byte_range = None
+    if range_header and (not if_range or if_range == etag):
+        byte_range = parse_range(range_header, size)
+
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        start, end = 0, size - 1
+    headers["Content-Length"] = str(end - start + 1)
+
+    body = stream_remote_file(remote_path, start, end)
+    if not byte_range:
+        body = hash_while_streaming(body, remote_path, folder, filename, size, attrs.st_mtime)
+
+    return StreamingResponse(
+        body,
+        status_code=206 if byte_range else 200,
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+def recon_folder() -> str:
+    return '/' + get_full_path(
         os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev'),
         os.getenv('PRIMERECON_FTP_FOLDER', 'primerecon')
     )
 
+def archive_folder() -> str:
+    return '/' + get_full_path(
+        os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev'),
+        os.getenv('PRIMERECON_ARCHIVE_FOLDER', 'primerecon_archive')
+    )
 
-    async with ftp_connection() as ftputil:
+def is_partial_upload(name: str) -> bool:
+    return name.startswith('.') and name.endswith('.part')
 
-        sftp = ftputil.acquire_sftp_channel()
-        ensure_folder_exists(sftp, folder)
-        return sftp.listdir(folder)
+async def load_folder_listing(folder: str) -> List[FtpFile]:
+    async with ftp_connection() as session:
+        await session.ensure_folder(folder)
+        try:
+            attrs = await session.listdir_attr(folder)
+        except FileNotFoundError:
+            # Removed on the server after it was verified; the session forgot it, so recreate once
+            await session.ensure_folder(folder)
+            attrs = await session.listdir_attr(folder)
+    return [FtpFile.from_attr(attr) for attr in attrs if not is_partial_upload(attr.filename)]
+
+# Folder listings with metadata, served from memory and refreshed in the background
+listing_cache = ListingCache(
+    load_folder_listing,
+    ttl=Config.SFTP_LISTING_TTL,
+    keep_warm=Config.SFTP_LISTING_KEEP_WARM
+)
 
+async def refresh_listings():
+    await listing_cache.refresh()
+
+class ListingParams:
+    """Filter, sort and paging query parameters for folder listings"""
+    def __init__(
+        self,
+        pattern: Optional[str] = Query(default=None, description="Glob matched against the filename, e.g. '*incoming*'"),
+        regex: Optional[str] = Query(default=None, description="Regular expression searched in the filename"),
+        date_from: Optional[date] = Query(default=None, description="Earliest report date from the _YYYYMMDD in the filename (inclusive)"),
+        date_to: Optional[date] = Query(default=None, description="Latest report date from the _YYYYMMDD in the filename (inclusive)"),
+        sort: Optional[Literal["name", "date", "size", "mtime"]] = Query(default=None, description="Sort key; unsorted when omitted"),
+        order: Literal["asc", "desc"] = Query(default="asc"),
+        offset: int = Query(default=0, ge=0),
+        limit: Optional[int] = Query(default=None, ge=1, le=1000, description="Page size; all matches when omitted")
+    ):
+        self.pattern = pattern
+        self.regex = regex
+        self.date_from = date_from
+        self.date_to = date_to
+        self.sort = sort
+        self.order = order
+        self.offset = offset
+        self.limit = limit
+
+async def query_folder(folder: str, params: ListingParams, details: bool, response: Response):
+    """Run a listing query against the cached folder metadata; the match count goes in X-Total-Count"""
+    try:
+        total, page = query_files(
+            await listing_cache.get(folder),
+            pattern=params.pattern,
+            regex=params.regex,
+            date_from=params.date_from,
+            date_to=params.date_to,
+            sort=params.sort,
+            descending=params.order == "desc",
+            offset=params.offset,
+            limit=params.limit
+        )
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regex: {e}")
 
-async def list_archive_files() -> List[str]:
-    folder = '/' + get_full_path(
-        os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev'),
-        os.getenv('PRIMERECON_ARCHIVE_FOLDER', 'primerecon_archive')
-    )
+    response.headers["X-Total-Count"] = str(total)
+    return page if details else [f.name for f in page]
 
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
-        ensure_folder_exists(sftp, folder)
-        return sftp.listdir(folder)
+async def list_recon_files() -> List[str]:
+    return [f.name for f in await listing_cache.get(recon_folder())]
+
+
+async def list_archive_files() -> List[str]:
+    return [f.name for f in await listing_cache.get(archive_folder())]
 
 @router.get(
     "/recon_ftp",
-    response_model=List[str],
+    response_model=Union[List[str], List[FtpFile]],
     tags=["ftp"],
     responses={
         200: {
@@ -188,13 +352,18 @@ async def list_archive_files() -> List[str]:
         }
     }
 )
-async def get_recon_ftp(user: dict = Depends(authenticate_user)):
-    return await list_recon_files()
+async def get_recon_ftp(
+    response: Response,
+    details: bool = Query(default=False, description="Return size, mtime and mode with each name"),
+    params: ListingParams = Depends(),
+    user: dict = Depends(authenticate_user)
+):
+    return await query_folder(recon_folder(), params, details, response)
 
 
 @router.get(
     "/recon_ftp_archives",
-    response_model=List[str],
+    response_model=Union[List[str], List[FtpFile]],
     tags=["ftp"],
     responses={
         200: {
@@ -205,8 +374,13 @@ async def get_recon_ftp(user: dict = Depends(authenticate_user)):
         }
     }
 )
-async def get_recon_ftp_archives(user: dict = Depends(authenticate_user)):
-    return await list_archive_files()
+async def get_recon_ftp_archives(
+    response: Response,
+    details: bool = Query(default=False, description="Return size, mtime and mode with each name"),
+    params: ListingParams = Depends(),
+    user: dict = Depends(authenticate_user)
+):
+    return await query_folder(archive_folder(), params, details, response)
 
 @router.get(
     "/recon_ftp_both",
@@ -214,13 +388,29 @@ async def get_recon_ftp_archives(user: dict = Depends(authenticate_user)):
     tags=["ftp"],
     responses={200: {"description": "Recon + archive file list"}}
 )
-async def get_recon_ftp_both():
-    # These will share the FTP connection under the hood
-    recon_files = await list_recon_files()
-    archive_files = await list_archive_files()
+async def get_recon_ftp_both(
+    refresh: bool = Query(default=False, description="Reload both listings from the server instead of the cache"),
+    user: dict = Depends(authenticate_user)
+):
+    folders = {"recon": recon_folder(), "archive": archive_folder()}
+
+    async def timed_listing(folder: str):
+        if refresh:
+            listing_cache.invalidate(folder)
+        started = time.perf_counter()
+        files = await listing_cache.get(folder)
+        return files, round((time.perf_counter() - started) * 1000, 1)
+
+    # Each listing borrows its own pooled connection, so both folders load in parallel
+    started = time.perf_counter()
+    results = dict(zip(folders, await asyncio.gather(*(timed_listing(f) for f in folders.values()))))
+    total_ms = round((time.perf_counter() - started) * 1000, 1)
+
     return {
-        "recon": recon_files,
-        "archive": archive_files
+        **{name: [f.name for f in files] for name, (files, _) in results.items()},
+        "counts": {name: len(files) for name, (files, _) in results.items()},
+        "details": {name: files for name, (files, _) in results.items()},
+        "timings_ms": {**{name: ms for name, (_, ms) in results.items()}, "total": total_ms}
     }
 
 
@@ -246,13 +436,13 @@ async def delete_recon_file(filename: str = Query(..., description="File path re
     # Construct the full remote path
     remote_path = '/' + get_full_path(folder, filename)
 
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
+    async with ftp_connection() as session:
 
 
         try:
-            sftp.stat(remote_path)
-            sftp.remove(remote_path)
+            await session.stat(remote_path)
+            await session.remove(remote_path)
+            listing_cache.invalidate(folder)
             return {"message": f"File '{filename}' deleted successfully"}
         except OSError as e:
             if e.errno == errno.ENOENT:  # File not found
@@ -280,13 +470,13 @@ async def delete_file_from_archives(filename: str = Query(..., description="File
 
     remote_path = '/' + get_full_path(folder, filename)
 
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
+    async with ftp_connection() as session:
 
 
         try:
-            sftp.stat(remote_path)
-            sftp.remove(remote_path)
+            await session.stat(remote_path)
+            await session.remove(remote_path)
+            listing_cache.invalidate(folder)
             return {"message": f"File '{filename}' deleted successfully"}
         except OSError as e:
             if e.errno == errno.ENOENT:  # File not found
@@ -296,70 +486,51 @@ async def delete_file_from_archives(filename: str = Query(..., description="File
                 raise HTTPException(status_code=500, detail="Unexpected SFTP error")
 
 
-from fastapi.responses import StreamingResponse
-from io import BytesIO
-
 @router.get(
     "/recon_ftp/download",
     tags=["ftp"],
     responses={
         200: {"description": "File downloaded successfully"},
+        206: {"description": "Requested byte range of the file"},
         404: {"description": "File not found"},
+        416: {"description": "Requested range not satisfiable"},
         500: {"description": "SFTP error occurred"}
     }
 )
-async def download_recon_file(filename: str = Query(..., description="File path relative to the recon FTP folder"), user: dict = Depends(authenticate_user)):
+async def download_recon_file(
+    filename: str = Query(..., description="File path relative to the recon FTP folder"),
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    if_range: Optional[str] = Header(default=None),
+    user: dict = Depends(authenticate_user)
+):
     folder = '/' + get_full_path(
         os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev'),
         os.getenv('PRIMERECON_FTP_FOLDER', 'primerecon')
     )
-    remote_path = '/' + get_full_path(folder, filename)
-
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
-        try:
-            file_obj = BytesIO()
-            sftp.getfo(remote_path, file_obj)
-            file_obj.seek(0)
-            return StreamingResponse(file_obj, media_type="application/octet-stream", headers={
-                "Content-Disposition": f"attachment; filename={os.path.basename(filename)}"
-            })
-        except OSError as e:
-            if "No such file" in str(e):
-                raise HTTPException(status_code=404, detail=f"File '{filename}' not found")
-            logger.error(f"Download error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to download file")
+    return await download_remote_file(folder, filename, range_header, if_range)
 
 @router.get(
     "/recon_ftp_archives/download",
     tags=["ftp"],
     responses={
         200: {"description": "File downloaded successfully"},
+        206: {"description": "Requested byte range of the file"},
         404: {"description": "File not found"},
+        416: {"description": "Requested range not satisfiable"},
         500: {"description": "SFTP error occurred"}
     }
 )
-async def download_archive_file(filename: str = Query(..., description="File path relative to the archive FTP folder"), user: dict = Depends(authenticate_user)):
+async def download_archive_file(
+    filename: str = Query(..., description="File path relative to the archive FTP folder"),
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    if_range: Optional[str] = Header(default=None),
+    user: dict = Depends(authenticate_user)
+):
     folder ='/' +  get_full_path(
         os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev'),
         os.getenv('PRIMERECON_ARCHIVE_FOLDER', 'primerecon_archive')
     )
-    remote_path = '/' + get_full_path(folder, filename)
-
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
-        try:
-            file_obj = BytesIO()
-            sftp.getfo(remote_path, file_obj)
-            file_obj.seek(0)
-            return StreamingResponse(file_obj, media_type="application/octet-stream", headers={
-                "Content-Disposition": f"attachment; filename={os.path.basename(filename)}"
-            })
-        except OSError as e:
-            if "No such file" in str(e):
-                raise HTTPException(status_code=404, detail=f"File '{filename}' not found")
-            logger.error(f"Download error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to download file")
+    return await download_remote_file(folder, filename, range_header, if_range)
 
 @router.put(
     "/recon_ftp/rename",
@@ -382,25 +553,25 @@ async def rename_recon_file(
         os.getenv('PRIMERECON_FTP_FOLDER', 'primerecon')
     )
 
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
+    async with ftp_connection() as session:
         old_path = '/' + get_full_path(folder, old_filename)
         new_path = '/' + get_full_path(folder, new_filename)
 
         try:
-            sftp.stat(old_path)
+            await session.stat(old_path)
         except FileNotFoundError:
             raise HTTPException(status_code=404, detail=f"File '{old_filename}' not found")
 
         # Prevent overwriting if new file exists
         try:
-            sftp.stat(new_path)
+            await session.stat(new_path)
             raise HTTPException(status_code=400, detail=f"File '{new_filename}' already exists")
         except FileNotFoundError:
             pass  # OK, target name doesn't exist
 
         try:
-            sftp.rename(old_path, new_path)
+            await session.rename(old_path, new_path)
+            listing_cache.invalidate(folder)
             return {"message": f"Renamed '{old_filename}' to '{new_filename}'"}
         except Exception as e:
             logger.error(f"Error renaming file: {e}")
@@ -427,24 +598,24 @@ async def rename_archive_file(
         os.getenv('PRIMERECON_ARCHIVE_FOLDER', 'primerecon_archive')
     )
 
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
+    async with ftp_connection() as session:
         old_path = '/' + get_full_path(folder, old_filename)
         new_path = '/' + get_full_path(folder, new_filename)
 
         try:
-            sftp.stat(old_path)
+            await session.stat(old_path)
         except FileNotFoundError:
             raise HTTPException(status_code=404, detail=f"File '{old_filename}' not found")
 
         try:
-            sftp.stat(new_path)
+            await session.stat(new_path)
             raise HTTPException(status_code=400, detail=f"File '{new_filename}' already exists")
         except FileNotFoundError:
             pass  # OK, target name doesn't exist
 
         try:
-            sftp.rename(old_path, new_path)
+            await session.rename(old_path, new_path)
+            listing_cache.invalidate(folder)
             return {"message": f"Renamed '{old_filename}' to '{new_filename}'"}
         except Exception as e:
             logger.error(f"Error renaming archive file: {e}")
@@ -460,6 +631,8 @@ async def count_recon_ftp_files(user: dict = Depends(authenticate_user)):
     try:
         files = await list_recon_files()
         return {"count": len(files)}
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Error counting recon files: {e}")
         raise HTTPException(status_code=500, detail="Failed to count recon files")
@@ -474,6 +647,8 @@ async def count_recon_ftp_archive_files(user: dict = Depends(authenticate_user))
     try:
         files = await list_archive_files()
         return {"count": len(files)}
+    except CircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Error counting archive files: {e}")
         raise HTTPException(status_code=500, detail="Failed to count archive files")
@@ -490,42 +665,519 @@ from fastapi import File, UploadFile, Query
         201: {"description": "File uploaded successfully"},
         400: {"description": "Invalid upload or folder"},
         404: {"description": "Target folder not found"},
+        409: {"description": "Identical content already exists and on_duplicate is 'reject'"},
+        413: {"description": "File exceeds the upload size limit"},
         500: {"description": "Failed to upload file"}
     }
 )
 async def upload_file_to_ftp(
     file: UploadFile = File(...),
     folder: str = Query(..., description="Folder name under FTP root (e.g. 'primerecon', 'primerecon_archive')"),
-    #user: dict = Depends(authenticate_user)
+    on_duplicate: Literal["allow", "flag", "reject"] = Query(default="flag", description="What to do when identical content is already indexed under another name"),
+    user: dict = Depends(authenticate_user)
 ):
     # Clean folder path
     folder = folder.strip("/")
 
-    # Base path: e.g., dev/primerecon
+    # Base path: e.g., dev/primerecon; only the recon and archive folders take uploads
     ftp_root = os.getenv('FTP_INSTANCE_FOLDER_NAME', 'dev')
     full_path = '/' + get_full_path(ftp_root, folder)
+    if full_path not in (recon_folder(), archive_folder()):
+        raise HTTPException(status_code=400, detail="Files can only be uploaded to the recon or archive folder")
+    if not file.filename or file.filename in (".", "..") or os.path.basename(file.filename) != file.filename:
+        raise HTTPException(status_code=400, detail="Invalid filename")
     remote_path = '/' + get_full_path(full_path, file.filename)
 
-    async with ftp_connection() as ftputil:
-        sftp = ftputil.acquire_sftp_channel()
+    if file.size is not None and file.size > Config.SFTP_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {Config.SFTP_UPLOAD_MAX_BYTES} byte upload limit")
+
+    async with ftp_connection() as session:
 
         try:
             # Ensure target folder exists
-            ensure_folder_exists(sftp, f'{full_path}')
+            await session.ensure_folder(full_path)
         except Exception as e:
             logger.error(f"Folder validation failed for '{full_path}': {e}")
             raise HTTPException(status_code=404, detail=f"Folder '{folder}' not found or could not be created")
 
+        # Stream to a temporary name so a partial upload never appears under the final one
+        tmp_path = '/' + get_full_path(full_path, f".{os.path.basename(remote_path)}.{uuid.uuid4().hex}.part")
+        hasher = hashlib.sha256()
+        size = 0
         try:
-            file_content = await file.read()
-
-            with sftp.open(remote_path, 'w') as remote_file:
-                remote_file.write(file_content)
-
-            return {"message": f"File '{file.filename}' uploaded successfully to '{folder}'"}
+            remote_file = await session.open(tmp_path, 'wb')
+            try:
+                await session.run(remote_file.set_pipelined, True)
+                while chunk := await file.read(Config.SFTP_UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > Config.SFTP_UPLOAD_MAX_BYTES:
+                        raise HTTPException(status_code=413, detail=f"File exceeds the {Config.SFTP_UPLOAD_MAX_BYTES} byte upload limit")
+                    await session.run(write_chunk, remote_file, hasher, chunk)
+            finally:
+                await session.run(remote_file.close)
+
+            sha256 = hasher.hexdigest()
+            duplicates = [] if on_duplicate == "allow" else await find_duplicates(sha256, exclude=remote_path)
+            if duplicates and on_duplicate == "reject":
+                names = ", ".join(d["path"] for d in duplicates)
+                raise HTTPException(status_code=409, detail=f"Identical content already exists: {names}")
+
+            await session.run(replace_remote_file, session.sftp, tmp_path, remote_path)
+            listing_cache.invalidate(full_path)
+            attrs = await session.stat(remote_path)
         except Exception as e:
+            try:
+                await session.remove(tmp_path)
+            except Exception:
+                logger.warning(f"Could not remove partial upload '{tmp_path}'")
+            if isinstance(e, HTTPException):
+                raise
             logger.error(f"Upload failed for file '{file.filename}' to '{folder}': {e}")
             raise HTTPException(status_code=500, detail="Failed to upload file")
 
+        await record_checksum(remote_path, full_path, os.path.basename(remote_path), size, attrs.st_mtime, sha256)
+
+        response = {
+            "message": f"File '{file.filename}' uploaded successfully to '{folder}'",
+            "bytes": size,
+            "sha256": sha256
+        }
+        if on_duplicate == "flag":
+            response["duplicates"] = duplicates
+        return response
+
+
+
+# Batch operations: one pooled session, per-file results, bounded parallelism
+
+FOLDERS = {"recon": recon_folder, "archive": archive_folder}
+
+class BatchSelection(BaseModel):
+    folder: Literal["recon", "archive"]
+    files: Optional[List[str]] = Field(default=None, description="Filenames in the folder")
+    pattern: Optional[str] = Field(default=None, description="Glob selecting files instead of listing them")
+
+class BatchMoveRequest(BatchSelection):
+    overwrite: bool = Field(default=False, description="Replace files that already exist in the target folder")
 
+class BatchRenameRequest(BatchSelection):
+    template: str = Field(..., description="New name template, e.g. '{stem}_processed{ext}'. Fields: name, stem, ext, date, index")
 
+async def resolve_batch_files(request: BatchSelection) -> List[str]:
+    if bool(request.files) == bool(request.pattern):
+        raise HTTPException(status_code=400, detail="Provide either 'files' or 'pattern'")
+
+    if request.pattern:
+        listing = await listing_cache.get(FOLDERS[request.folder]())
+        files = [f.name for f in listing if fnmatch.fnmatchcase(f.name, request.pattern)]
+    else:
+        files = list(dict.fromkeys(request.files))
+
+    if len(files) > Config.SFTP_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {Config.SFTP_BATCH_MAX_FILES} files")
+    return files
+
+def rename_no_overwrite(sftp, old_path: str, new_path: str) -> None:
+    """Rename unless the target exists (blocking; run via the SFTP thread pool)"""
+    try:
+        sftp.stat(new_path)
+    except FileNotFoundError:
+        sftp.rename(old_path, new_path)
+        return
+    raise FileExistsError(errno.EEXIST, "Target already exists", new_path)
+
+def batch_result(file: str, outcome, target: Optional[str] = None) -> dict:
+    if not isinstance(outcome, Exception):
+        result = {"file": file, "status": "ok"}
+        if target:
+            result["target"] = target
+        return result
+
+    if isinstance(outcome, FileNotFoundError):
+        detail = "File not found"
+    elif isinstance(outcome, FileExistsError):
+        detail = "Target already exists"
+    elif isinstance(outcome, ValueError):
+        detail = str(outcome)
+    else:
+        logger.error(f"Batch operation failed for '{file}': {outcome}")
+        detail = "SFTP error"
+    return {"file": file, "status": "error", "detail": detail}
+
+def batch_response(results: List[dict]) -> dict:
+    failed = sum(1 for r in results if r["status"] == "error")
+    return {"succeeded": len(results) - failed, "failed": failed, "results": results}
+
+async def run_batch(operation, jobs: List[Tuple[str, Optional[str]]]) -> List:
+    """Run ``operation(sftp, (file, target))`` for every job over one pooled session"""
+    if not jobs:
+        return []
+    async with ftp_connection() as session:
+        return await session.map(operation, jobs, Config.SFTP_BATCH_CONCURRENCY)
+
+@router.post(
+    "/batch/move",
+    tags=["ftp"],
+    summary="Move files between the recon and archive folders with server-side renames"
+)
+async def batch_move_files(request: BatchMoveRequest, user: dict = Depends(authenticate_user)):
+    source = FOLDERS[request.folder]()
+    target = archive_folder() if request.folder == "recon" else recon_folder()
+    files = await resolve_batch_files(request)
+
+    def move(sftp, job):
+        name, _ = job
+        old_path = '/' + get_full_path(source, name)
+        new_path = '/' + get_full_path(target, os.path.basename(name))
+        if request.overwrite:
+            sftp.posix_rename(old_path, new_path)
+        else:
+            rename_no_overwrite(sftp, old_path, new_path)
+
+    outcomes = await run_batch(move, [(name, None) for name in files])
+    listing_cache.invalidate(source)
+    listing_cache.invalidate(target)
+    return batch_response([batch_result(name, outcome) for name, outcome in zip(files, outcomes)])
+
+@router.post(
+    "/batch/delete",
+    tags=["ftp"],
+    summary="Delete several files from the recon or archive folder"
+)
+async def batch_delete_files(request: BatchSelection, user: dict = Depends(authenticate_user)):
+    folder = FOLDERS[request.folder]()
+    files = await resolve_batch_files(request)
+
+    def delete(sftp, job):
+        name, _ = job
+        sftp.remove('/' + get_full_path(folder, name))
+
+    outcomes = await run_batch(delete, [(name, None) for name in files])
+    listing_cache.invalidate(folder)
+    return batch_response([batch_result(name, outcome) for name, outcome in zip(files, outcomes)])
+
+@router.post(
+    "/batch/rename",
+    tags=["ftp"],
+    summary="Rename several files in a folder from a name template"
+)
+async def batch_rename_files(request: BatchRenameRequest, user: dict = Depends(authenticate_user)):
+    folder = FOLDERS[request.folder]()
+    files = await resolve_batch_files(request)
+
+    targets = {}
+    for index, name in enumerate(files, start=1):
+        stem, ext = os.path.splitext(name)
+        file_date = report_date(name)
+        try:
+            new_name = request.template.format(
+                name=name, stem=stem, ext=ext, index=index,
+                date=file_date.strftime("%Y%m%d") if file_date else ""
+            )
+        except (KeyError, IndexError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid template: {e}")
+        targets[name] = new_name
+
+    # Reject unusable or colliding names before touching the server
+    seen = set()
+    jobs, results = [], {}
+    for name, new_name in targets.items():
+        if not new_name or '/' in new_name:
+            results[name] = batch_result(name, ValueError(f"Invalid target name '{new_name}'"))
+        elif new_name in seen:
+            results[name] = batch_result(name, FileExistsError())
+        else:
+            seen.add(new_name)
+            jobs.append((name, new_name))
+
+    def rename(sftp, job):
+        name, new_name = job
+        rename_no_overwrite(sftp, '/' + get_full_path(folder, name), '/' + get_full_path(folder, new_name))
+
+    outcomes = await run_batch(rename, jobs)
+    for (name, new_name), outcome in zip(jobs, outcomes):
+        results[name] = batch_result(name, outcome, target=new_name)
+    listing_cache.invalidate(folder)
+    return batch_response([results[name] for name in files])
+
+
+@router.get(
+    "/bundle",
+    tags=["ftp"],
+    summary="Download several files as one ZIP archive, streamed as it is built",
+    responses={
+        200: {"description": "ZIP archive", "content": {"application/zip": {}}},
+        400: {"description": "No selection, or too many files"},
+        404: {"description": "Requested files not found"}
+    }
+)
+async def download_bundle(
+    folder: Literal["recon", "archive"] = Query(...),
+    files: Optional[List[str]] = Query(default=None, description="Filenames to include"),
+    date_from: Optional[date] = Query(default=None, description="Earliest report date from the _YYYYMMDD in the filename (inclusive)"),
+    date_to: Optional[date] = Query(default=None, description="Latest report date from the _YYYYMMDD in the filename (inclusive)"),
+    user: dict = Depends(authenticate_user)
+):
+    if not files and not (date_from or date_to):
+        raise HTTPException(status_code=400, detail="Provide 'files' or a date range")
+    # The archive is streamed, so fail before the response starts rather than mid-body
+    sftp_breaker.check()
+
+    remote_folder = FOLDERS[folder]()
+    listing = await listing_cache.get(remote_folder)
+
+    if files:
+        by_name = {f.name: f for f in listing}
+        missing = [name for name in files if name not in by_name]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Files not found: {', '.join(missing)}")
+        selected = [by_name[name] for name in dict.fromkeys(files)]
+    else:
+        _, selected = query_files(listing, date_from=date_from, date_to=date_to, sort="date")
+        if not selected:
+            raise HTTPException(status_code=404, detail="No files in the requested date range")
+
+    if len(selected) > Config.SFTP_BUNDLE_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Bundle exceeds {Config.SFTP_BUNDLE_MAX_FILES} files")
+
+    suffix = "_".join(d.strftime("%Y%m%d") for d in (date_from, date_to) if d)
+    bundle_name = f"{folder}_{suffix or 'files'}.zip"
+    return StreamingResponse(
+        stream_zip(sftp_runner, remote_folder, selected, Config.SFTP_DOWNLOAD_CHUNK_SIZE, Config.SFTP_PREFETCH_CONCURRENCY or None),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename={bundle_name}"}
+    )
+
+
+# Report previews: parsed server-side, cached per file version so unchanged files are read once
+
+report_summaries = LRUCache(Config.REPORT_PREVIEW_CACHE_SIZE)
+report_pages = LRUCache(Config.REPORT_PREVIEW_CACHE_SIZE)
+
+async def preview_report(remote_path: str, file: FtpFile, mode: str, page: int, page_size: int) -> Tuple[List[dict], dict]:
+    """
+    Return the requested records and the file summary. The first view of a file version
+    scans it once for the summary; later views stop reading as soon as the page is complete.
+    """
+    version = (remote_path, file.size, file.mtime)
+    key = version + (mode, page, page_size)
+    summary = report_summaries.get(version)
+    records = report_pages.get(key)
+    if records is not None and summary is not None:
+        return records, summary
+
+    offset, tail = (page - 1) * page_size, None
+    if mode == "head":
+        offset = 0
+    elif mode == "tail":
+        if summary is None:
+            offset, tail = 0, page_size
+        else:
+            offset = max(0, summary["total_records"] - page_size)
+
+    async with ftp_connection() as session:
+        records, scanned = await read_report(
+            session, remote_path, file.size, offset, page_size, tail, summary is not None,
+            Config.SFTP_DOWNLOAD_CHUNK_SIZE, Config.SFTP_PREFETCH_CONCURRENCY or None
+        )
+
+    if summary is None:
+        summary = scanned
+        report_summaries.set(version, summary)
+    report_pages.set(key, records)
+    return records, summary
+
+@router.get(
+    "/{folder}/preview",
+    tags=["ftp"],
+    summary="Preview the records of a PRIME_RSI report file without downloading it",
+    responses={
+        404: {"description": "File not found"}
+    }
+)
+async def preview_report_file(
+    folder: Literal["recon", "archive"],
+    filename: str = Query(..., description="Report file in the folder"),
+    mode: Literal["head", "tail", "page"] = Query(default="head", description="First records, last records, or the given page"),
+    page: int = Query(default=1, ge=1, description="1-based page number when mode is 'page'"),
+    page_size: int = Query(default=50, ge=1, le=1000),
+    user: dict = Depends(authenticate_user)
+):
+    remote_folder = FOLDERS[folder]()
+    file = next((f for f in await listing_cache.get(remote_folder) if f.name == filename), None)
+    if file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        records, summary = await preview_report('/' + get_full_path(remote_folder, filename), file, mode, page, page_size)
+    except FileNotFoundError:
+        listing_cache.invalidate(remote_folder)
+        raise HTTPException(status_code=404, detail="File not found")
+
+    return {
+        "filename": file.name,
+        "report_type": report_type(file.name),
+        "report_date": report_date(file.name),
+        "size": file.size,
+        "mtime": file.mtime,
+        "mode": mode,
+        "page": page if mode == "page" else None,
+        "page_size": page_size,
+        "total_records": summary["total_records"],
+        "summary": summary,
+        "records": records
+    }
+
+
+# Reconciliation of report records against the recon collections, streamed as NDJSON
+
+recon_results = LRUCache(Config.RECON_RESULT_CACHE_SIZE, ttl=Config.RECON_RESULT_TTL)
+
+async def stream_reconciliation(remote_path: str, file: FtpFile, problems_only: bool) -> AsyncIterator[bytes]:
+    """
+    Reconcile a report as it is read and yield one NDJSON line per record, then a summary line.
+    Complete runs are cached per file version, up to RECON_RESULT_CACHE_MAX_RECORDS records.
+    """
+    reconciler = ReportReconciler(
+        batch_size=Config.RECON_MATCH_BATCH_SIZE,
+        ticket_field=Config.RECON_REPORT_TICKET_FIELD,
+        event_field=Config.RECON_REPORT_EVENT_FIELD
+    )
+    results: Optional[List[dict]] = []
+    try:
+        async with sftp_runner.session() as session:
+            # Closed explicitly, so a client disconnect closes the remote file before the session is released
+            records = iter_report_records(session, remote_path, Config.SFTP_DOWNLOAD_CHUNK_SIZE, RecordParser())
+            async with aclosing(records), aclosing(reconciler.reconcile(records)) as reconciled:
+                async for result in reconciled:
+                    if results is not None:
+                        results.append(result)
+                        if len(results) > Config.RECON_RESULT_CACHE_MAX_RECORDS:
+                            results = None
+                    if not problems_only or result["status"] != MATCHED:
+                        yield ndjson({"type": "record", **result})
+    except FileNotFoundError:
+        listing_cache.invalidate(os.path.dirname(remote_path))
+        yield ndjson({"type": "error", "detail": "File not found"})
+        return
+
+    summary = {"filename": file.name, "size": file.size, "mtime": file.mtime, **reconciler.summary}
+    if results is not None:
+        recon_results.set((remote_path, file.size, file.mtime), (results, summary))
+    yield ndjson({"type": "summary", **summary})
+
+async def replay_reconciliation(results: List[dict], summary: dict, problems_only: bool) -> AsyncIterator[bytes]:
+    for result in results:
+        if not problems_only or result["status"] != MATCHED:
+            yield ndjson({"type": "record", **result})
+    yield ndjson({"type": "summary", **summary})
+
+@router.get(
+    "/{folder}/reconcile",
+    tags=["ftp"],
+    summary="Reconcile a PRIME_RSI report against mainstaging, errortable and errorstaging",
+    description=(
+        "Streams newline-delimited JSON: one line per report record with status matched, "
+        "missing, mismatched or unparsed, followed by a summary line."
+    ),
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        404: {"description": "File not found"}
+    }
+)
+async def reconcile_report_file(
+    folder: Literal["recon", "archive"],
+    filename: str = Query(..., description="Report file in the folder"),
+    problems_only: bool = Query(default=False, description="Omit matched records from the output"),
+    refresh: bool = Query(default=False, description="Ignore cached results for this file version"),
+    user: dict = Depends(authenticate_user)
+):
+    remote_folder = FOLDERS[folder]()
+    file = next((f for f in await listing_cache.get(remote_folder) if f.name == filename), None)
+    if file is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    remote_path = '/' + get_full_path(remote_folder, filename)
+    cached = None if refresh else recon_results.get((remote_path, file.size, file.mtime))
+    if cached is not None:
+        body = replay_reconciliation(*cached, problems_only)
+    else:
+        sftp_breaker.check()
+        body = stream_reconciliation(remote_path, file, problems_only)
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"X-Cache": "hit" if cached is not None else "miss"}
+    )
+
+
+# Checksums: computed in passing on upload/download and by a background indexer
+
+def indexed_version_matches(entry: Optional[dict], file: FtpFile) -> bool:
+    return entry is not None and entry["size"] == file.size and entry["mtime"] == file.mtime
+
+async def find_duplicates(sha256: str, exclude: Optional[str] = None) -> List[dict]:
+    """Indexed files with this checksum that still exist unchanged; no remote file is re-read"""
+    try:
+        entries = [e for e in await ftp_checksums.find(sha256) if e["_id"] != exclude]
+    except Exception as e:
+        logger.warning(f"Checksum lookup failed: {e}")
+        return []
+
+    duplicates = []
+    for entry in entries:
+        listing = {f.name: f for f in await listing_cache.get(entry["folder"])}
+        if indexed_version_matches(entry, listing.get(entry["name"])):
+            duplicates.append({"path": entry["_id"], "folder": entry["folder"], "name": entry["name"]})
+    return duplicates
+
+async def index_checksums():
+    """Hash files whose current size and mtime are not indexed yet, and drop entries for removed files"""
+    await ftp_checksums.ensure_indexes()
+    budget = Config.CHECKSUM_INDEX_MAX_FILES
+    for folder in (recon_folder(), archive_folder()):
+        # Listed directly so the indexer does not keep the listing cache warm on its own
+        files = {'/' + get_full_path(folder, f.name): f for f in await load_folder_listing(folder)}
+        await ftp_checksums.prune(folder, list(files))
+        known = await ftp_checksums.known(list(files))
+        stale = [(path, f) for path, f in files.items() if not indexed_version_matches(known.get(path), f)][:budget]
+        if not stale:
+            continue
+
+        # A slow or failing hash is retried next run; it must not trip the breaker for requests
+        async with sftp_runner.session(record_failures=False) as session:
+            async def hash_job(sftp, job):
+                return await hash_remote_file(session, sftp, job[0], job[1].size)
+
+            digests = await session.map(hash_job, stale, Config.SFTP_BATCH_CONCURRENCY)
+        for (path, f), digest in zip(stale, digests):
+            if isinstance(digest, Exception):
+                logger.warning(f"Could not hash '{path}': {digest}")
+                continue
+            await ftp_checksums.record(path, folder, f.name, f.size, f.mtime, digest)
+        logger.info(f"Indexed checksums for {len(stale)} file(s) in '{folder}'")
+
+        budget -= len(stale)
+        if budget <= 0:
+            break
+
+@router.get(
+    "/duplicates",
+    tags=["ftp"],
+    summary="Groups of files with identical content across the recon and archive folders"
+)
+async def get_duplicate_files(user: dict = Depends(authenticate_user)):
+    folders = {resolve(): key for key, resolve in FOLDERS.items()}
+    listings = {folder: {f.name: f for f in await listing_cache.get(folder)} for folder in folders}
+
+    groups = []
+    for group in await ftp_checksums.duplicates(list(folders)):
+        # Skip entries the indexer has not caught up with yet
+        files = [
+            {"folder": folders[f["folder"]], "name": f["name"], "mtime": f["mtime"]}
+            for f in group["files"]
+            if indexed_version_matches(f, listings[f["folder"]].get(f["name"]))
+        ]
+        if len(files) > 1:
+            groups.append({"sha256": group["_id"], "size": group["size"], "files": files})
+    return {"groups": groups, "duplicate_files": sum(len(g["files"]) - 1 for g in groups)}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter
-from app.database import db
+from app.db import mongo
+from app.ftp.breaker import sftp_breaker
 
 router = APIRouter()
 
@@ -9,17 +10,16 @@ async def health():
 
 @router.get("/ready")
 async def ready():
-    # Check if the database connection is available
+    # Check that recon-db and ride-services-db are reachable
     from fastapi import status
     from fastapi.responses import JSONResponse
     import logging
-    try:
-        await db.command("ping")
-    except Exception as e:
-        logging.exception(f"Database connection error: {e}")
+    errors = {name: error for name, error in (await mongo.ping_databases()).items() if error}
+    if errors:
+        logging.error(f"Database connection error: {errors}")
         return JSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            content={"status": "unavailable", "error": "An internal error has occurred."}
+            content={"status": "unavailable", "error": "An internal error has occurred.", "databases": sorted(errors)}
         )
-    # If the database is reachable, return ready status
-    return {"status": "ready"}
+    # If the databases are reachable, return ready status; an SFTP outage is reported, not fatal
+    return {"status": "ready", "sftp": sftp_breaker.snapshot()}
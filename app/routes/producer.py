@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import Any
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, List, Optional
+import asyncio
 import os
+import uuid
 import httpx
 import logging
 from app.auth.auth import authenticate_user
+from app.config import Config
+from app.db.outbox import DEAD, STATUSES, backoff_delay, producer_outbox
+from app.services.http_client import get_http_client
+from app.services.limiter import producer_limits
+from app.util.common import ndjson
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -20,26 +28,234 @@ class ProducerPayload(BaseModel):
     apipath: str
     payload: Any
 
-@router.post("/send",tags=["producer"], summary="Send data to external Producer API")
-async def send_to_producer(data: ProducerPayload):
+class ProducerBatch(BaseModel):
+    items: List[ProducerPayload] = Field(..., min_length=1)
+    stop_on_failure: bool = Field(default=False, description="Stop sending after the first failed item; unsent items are reported as skipped")
+    concurrency: Optional[int] = Field(default=None, ge=1, description="Sends in flight, capped at PRODUCER_BATCH_CONCURRENCY")
+
+def check_producer_config() -> None:
     if not PRODUCER_API_URL or not PRODUCER_API_KEY:
         raise HTTPException(status_code=500, detail="Producer API configuration missing")
 
+async def post_to_producer(data: ProducerPayload, idempotency_key: Optional[str] = None) -> Any:
+    """POST one payload over the shared client; raises httpx errors, including for non-2xx responses"""
     url = f"{PRODUCER_API_URL}{data.apipath}"
 
     headers = {
         "ride-api-key": PRODUCER_API_KEY,
         "Content-Type": "application/json",
     }
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
 
+    response = await producer_limits.get(data.apipath).run(
+        lambda: get_http_client().post(url, json=data.payload, headers=headers)
+    )
+    response.raise_for_status()
+    return response_body(response)
+
+def response_body(response: httpx.Response) -> Any:
+    """The body of an accepted send: JSON when it parses, else the raw text (None when empty)"""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=data.payload, headers=headers)
-            response.raise_for_status()
-        return {"status": "success", "detail": response.json()}
+        return response.json()
+    except ValueError:
+        return response.text or None
+
+@router.post("/send",tags=["producer"], summary="Send data to external Producer API")
+async def send_to_producer(data: ProducerPayload):
+    check_producer_config()
+    try:
+        return {"status": "success", "detail": await post_to_producer(data)}
     except httpx.HTTPStatusError as exc:
         logger.error(f"Producer API returned HTTP {exc.response.status_code}: {exc.response.text}")
         raise HTTPException(status_code=exc.response.status_code, detail=exc.response.text)
     except Exception as exc:
         logger.error(f"Error sending to Producer API: {exc}")
         raise HTTPException(status_code=500, detail="Failed to send to Producer API")
+
+
+@router.get("/limits", tags=["producer"], summary="Rate and adaptive concurrency limiter state per apipath, for the worker that serves the request")
+async def get_producer_limits(user: dict = Depends(authenticate_user)):
+    return producer_limits.snapshot()
+
+
+# Batch sends: bounded concurrency, one NDJSON line per item as it completes
+
+async def send_item(index: int, data: ProducerPayload) -> dict:
+    result = {"index": index, "apipath": data.apipath}
+    try:
+        result.update(status="success", detail=await post_to_producer(data))
+    except httpx.HTTPStatusError as exc:
+        logger.error(f"Producer API returned HTTP {exc.response.status_code} for batch item {index}: {exc.response.text}")
+        result.update(status="error", status_code=exc.response.status_code, detail=exc.response.text)
+    except Exception as exc:
+        logger.error(f"Error sending batch item {index} to Producer API: {exc}")
+        result.update(status="error", detail="Failed to send to Producer API")
+    return result
+
+async def stream_batch(batch: ProducerBatch, concurrency: int) -> AsyncIterator[bytes]:
+    """
+    Send every item with up to ``concurrency`` in flight and yield each result as it lands,
+    then a summary line. With stop_on_failure, sends already in flight still finish (they may
+    have reached the producer) but no new ones start.
+    """
+    pending = iter(enumerate(batch.items))
+    results: asyncio.Queue = asyncio.Queue()
+    stopped = False
+
+    async def worker():
+        nonlocal stopped
+        # Check before taking the next item, so an item is either sent or reported as skipped
+        while not stopped:
+            index, item = next(pending, (None, None))
+            if item is None:
+                return
+            result = await send_item(index, item)
+            if result["status"] == "error" and batch.stop_on_failure:
+                stopped = True
+            await results.put(result)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(batch.items)))]
+    done = asyncio.gather(*workers)
+    counts = {"success": 0, "error": 0, "skipped": 0}
+    try:
+        while not (done.done() and results.empty()):
+            getter = asyncio.ensure_future(results.get())
+            await asyncio.wait([getter, done], return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                continue
+            result = getter.result()
+            counts[result["status"]] += 1
+            yield ndjson({"type": "result", **result})
+
+        # Workers stop pulling once stopped, so whatever is left was never sent
+        for index, item in pending:
+            counts["skipped"] += 1
+            yield ndjson({"type": "result", "index": index, "apipath": item.apipath, "status": "skipped"})
+        yield ndjson({"type": "summary", "total": len(batch.items), **counts, "stopped": stopped})
+    finally:
+        # Client went away mid-stream: stop sending
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(done, return_exceptions=True)
+
+@router.post(
+    "/send-batch",
+    tags=["producer"],
+    summary="Send many payloads to the Producer API concurrently, streaming per-item results as NDJSON"
+)
+async def send_batch_to_producer(batch: ProducerBatch, user: dict = Depends(authenticate_user)):
+    check_producer_config()
+    if len(batch.items) > Config.PRODUCER_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {Config.PRODUCER_BATCH_MAX_ITEMS} items")
+
+    concurrency = min(batch.concurrency or Config.PRODUCER_BATCH_CONCURRENCY, Config.PRODUCER_BATCH_CONCURRENCY)
+    return StreamingResponse(stream_batch(batch, concurrency), media_type="application/x-ndjson")
+
+
+# Outbox: sends persisted in Mongo and delivered by a background dispatcher with retries
+
+outbox_wakeup = asyncio.Event()
+outbox_indexes_ready = False
+
+def outbox_entry(doc: dict) -> dict:
+    entry = {key: value for key, value in doc.items() if key not in ("_id", "payload")}
+    return {"id": doc["_id"], **entry}
+
+def is_retryable(exc: Exception) -> bool:
+    """Transport errors, throttling and server errors may pass later; anything else never will"""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+def describe_failure(exc: Exception) -> str:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"HTTP {exc.response.status_code}: {exc.response.text[:500]}"
+    return f"{type(exc).__name__}: {exc}"
+
+async def deliver_outbox_entry(entry: dict) -> bool:
+    key, claim_id = entry["_id"], entry["claim_id"]
+    try:
+        response = await post_to_producer(ProducerPayload(apipath=entry["apipath"], payload=entry["payload"]), key)
+    except Exception as exc:
+        retry = is_retryable(exc) and entry["attempts"] < Config.OUTBOX_MAX_ATTEMPTS
+        retry_in = backoff_delay(entry["attempts"], Config.OUTBOX_BACKOFF_BASE, Config.OUTBOX_BACKOFF_MAX) if retry else None
+        if not await producer_outbox.mark_failed(key, claim_id, describe_failure(exc), retry_in):
+            logger.warning(f"Outbox entry '{key}' was re-claimed after its lease ran out; dropping this attempt's failure")
+        elif retry_in is None:
+            logger.error(f"Outbox entry '{key}' dead-lettered after {entry['attempts']} attempt(s): {describe_failure(exc)}")
+        return False
+    if not await producer_outbox.mark_delivered(key, claim_id, response):
+        logger.warning(f"Outbox entry '{key}' was re-claimed after its lease ran out; its redelivery reuses the idempotency key")
+    return True
+
+async def dispatch_outbox():
+    """
+    Deliver every due outbox entry until none are left, with OUTBOX_CONCURRENCY workers that
+    each claim one entry when they are ready to send it, so no lease runs down in a queue
+    """
+    global outbox_indexes_ready
+    if not PRODUCER_API_URL or not PRODUCER_API_KEY:
+        return
+    if not outbox_indexes_ready:
+        await producer_outbox.ensure_indexes(Config.OUTBOX_DELIVERED_RETENTION_DAYS * 86400)
+        outbox_indexes_ready = True
+
+    async def worker():
+        attempted = delivered = 0
+        while entry := await producer_outbox.claim(Config.OUTBOX_LEASE):
+            attempted += 1
+            delivered += await deliver_outbox_entry(entry)
+        return attempted, delivered
+
+    outcomes = await asyncio.gather(*(worker() for _ in range(Config.OUTBOX_CONCURRENCY)))
+    attempted, delivered = (sum(counts) for counts in zip(*outcomes))
+    if attempted:
+        logger.info(f"Outbox: delivered {delivered} of {attempted} claimed entries")
+
+@router.post("/outbox", tags=["producer"], status_code=202,
+             summary="Queue a send in the outbox; delivery is retried in the background")
+async def enqueue_send(
+    data: ProducerPayload,
+    idempotency_key: Optional[str] = Header(
+        default=None, alias="Idempotency-Key", max_length=128, pattern=r"^[A-Za-z0-9._:-]+$",
+        description="Repeated keys are queued once; a random key is used when omitted"
+    ),
+    user: dict = Depends(authenticate_user)
+):
+    check_producer_config()
+    doc = await producer_outbox.enqueue(idempotency_key or uuid.uuid4().hex, data.apipath, data.payload)
+    if not doc["duplicate"]:
+        outbox_wakeup.set()
+    return outbox_entry(doc)
+
+@router.get("/outbox/depth", tags=["producer"], summary="Outbox entries per status and the age of the oldest undelivered one")
+async def get_outbox_depth(user: dict = Depends(authenticate_user)):
+    return await producer_outbox.depth()
+
+@router.get("/outbox", tags=["producer"], summary="Recently updated outbox entries with a given status")
+async def list_outbox_entries(
+    status: str = Query(default=DEAD, description=", ".join(STATUSES)),
+    limit: int = Query(default=100, ge=1, le=1000),
+    user: dict = Depends(authenticate_user)
+):
+    if status not in STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status '{status}'")
+    return [outbox_entry(doc) for doc in await producer_outbox.list(status, limit)]
+
+@router.get("/outbox/{key}", tags=["producer"], summary="Delivery state of one outbox entry")
+async def get_outbox_entry(key: str, user: dict = Depends(authenticate_user)):
+    doc = await producer_outbox.get(key)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Outbox entry not found")
+    return outbox_entry(doc)
+
+@router.post("/outbox/{key}/retry", tags=["producer"], summary="Queue a dead-lettered outbox entry for delivery again")
+async def retry_outbox_entry(key: str, user: dict = Depends(authenticate_user)):
+    doc = await producer_outbox.requeue(key)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="No dead-lettered outbox entry with this id")
+    outbox_wakeup.set()
+    return outbox_entry(doc)
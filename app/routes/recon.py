@@ -2,10 +2,12 @@ from fastapi import APIRouter,  HTTPException, Body, Path, Depends
 from typing import List
 from app.models.event import Event
 from app.db.mongo import recon_db
+from app.db.counters import recon_counters
 from app.auth.auth import authenticate_user
 from app.util.common import clean_mongo_doc
 from bson import ObjectId
 from bson.errors import InvalidId
+from pymongo import ReturnDocument
 import logging
 
 from pydantic import BaseModel
@@ -17,8 +19,8 @@ class ResetRequest(BaseModel):
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-async def get_collection_count(collection_name: str, query: dict = {}):
-    count = await recon_db[collection_name].count_documents(query)
+async def get_collection_count(collection_name: str, counter: str = "total"):
+    count = await recon_counters[collection_name].get(counter)
     return {"count": count}
 
 
@@ -32,15 +34,19 @@ async def delete_event_by_id(collection_name: str, object_id: str):
     except InvalidId:
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
-    result = await recon_db[collection_name].delete_one({"_id": obj_id})
+    deleted = await recon_db[collection_name].find_one_and_delete({"_id": obj_id})
 
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Object not found")
 
+    await recon_counters[collection_name].apply(deleted, None)
+
     return {"message": "Document deleted successfully", "object_id": object_id}
 
 async def delete_all_events(collection_name: str):
     result = await recon_db[collection_name].delete_many({})
+    # Recounted rather than zeroed, since the pipeline may insert while we delete
+    await recon_counters[collection_name].reconcile()
     return {
         "message": f"All documents deleted from '{collection_name}'",
         "deleted_count": result.deleted_count
@@ -51,6 +57,9 @@ async def reset_all_field(collection_name: str, field_name: str):
     result = await recon_db[collection_name].update_many(
         {}, {"$set": {field_name: 0}}
     )
+    if collection_name == "mainstaging" and field_name == "recon_count":
+        # Recounted: documents written during the update may already be above the threshold again
+        await recon_counters[collection_name].reconcile()
     return {
         "message": f"All {field_name} values reset to 0 in '{collection_name}'",
         "matched_count": result.matched_count,
@@ -151,14 +160,17 @@ async def reset_recon_count(request: ResetRequest, user: dict = Depends(authenti
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
     try:
-        result = await recon_db["mainstaging"].update_one(
+        before = await recon_db["mainstaging"].find_one_and_update(
             {"_id": object_id},
-            {"$set": {"recon_count": 0}}
+            {"$set": {"recon_count": 0}},
+            return_document=ReturnDocument.BEFORE
         )
 
-        if result.matched_count == 0:
+        if before is None:
             raise HTTPException(status_code=404, detail="Object not found")
 
+        await recon_counters["mainstaging"].apply(before, {**before, "recon_count": 0})
+
         return {"message": "Recon count reset successfully", "object_id": request.object_id}
 
     except HTTPException:
@@ -254,14 +266,17 @@ async def reset_retry_count(request: ResetRequest, user: dict = Depends(authenti
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
     try:
-        result = await recon_db["errortable"].update_one(
+        before = await recon_db["errortable"].find_one_and_update(
             {"_id": object_id},
-            {"$set": {"retry_count": 0}}
+            {"$set": {"retry_count": 0}},
+            return_document=ReturnDocument.BEFORE
         )
 
-        if result.matched_count == 0:
+        if before is None:
             raise HTTPException(status_code=404, detail="Object not found")
 
+        await recon_counters["errortable"].apply(before, {**before, "retry_count": 0})
+
         return {"message": "Retry count reset successfully", "object_id": request.object_id}
 
     except HTTPException:
@@ -305,14 +320,17 @@ async def reset_retry_count_staging(request: ResetRequest, user: dict = Depends(
         raise HTTPException(status_code=400, detail="Invalid ObjectId format")
 
     try:
-        result = await recon_db["errorstaging"].update_one(
+        before = await recon_db["errorstaging"].find_one_and_update(
             {"_id": object_id},
-            {"$set": {"retry_count": 0}}
+            {"$set": {"retry_count": 0}},
+            return_document=ReturnDocument.BEFORE
         )
 
-        if result.matched_count == 0:
+        if before is None:
             raise HTTPException(status_code=404, detail="Object not found")
 
+        await recon_counters["errorstaging"].apply(before, {**before, "retry_count": 0})
+
         return {"message": "Retry count reset successfully", "object_id": request.object_id}
 
     except HTTPException:
@@ -375,7 +393,7 @@ async def delete_staging_count(object_id: str = Path(..., description="MongoDB O
     summary="Delete all staging count events"
 )
 async def delete_all_staging_count(user: dict = Depends(authenticate_user)):
-    return await delete_all_documents("mainstaging")
+    return await delete_all_events("mainstaging")
 
 
 @router.get(
@@ -384,8 +402,7 @@ async def delete_all_staging_count(user: dict = Depends(authenticate_user)):
     summary="Get count of retry exceptions"
 )
 async def get_retry_exceptions_count(user: dict = Depends(authenticate_user)):
-    query = {"recon_count": {"$gt": 10}}
-    return await get_collection_count("mainstaging", query)
+    return await get_collection_count("mainstaging", "retry_exceptions")
 
 
 @router.get(
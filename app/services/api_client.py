@@ -1,6 +1,5 @@
-import httpx
+from app.services.http_client import get_http_client
 
 async def fetch_data(url: str):
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        return response.json()
+    response = await get_http_client().get(url)
+    return response.json()
@@ -0,0 +1,60 @@
+import importlib.util
+import logging
+from typing import Optional
+
+import httpx
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Keep-alive pooled client for outbound API calls, configured from Config."""
+    http2 = Config.HTTP_CLIENT_HTTP2 and http2_available()
+    if Config.HTTP_CLIENT_HTTP2 and not http2:
+        logger.info("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(
+            Config.HTTP_CLIENT_READ_TIMEOUT,
+            connect=Config.HTTP_CLIENT_CONNECT_TIMEOUT,
+            pool=Config.HTTP_CLIENT_POOL_TIMEOUT
+        ),
+        limits=httpx.Limits(
+            max_connections=Config.HTTP_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=Config.HTTP_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=Config.HTTP_CLIENT_KEEPALIVE_EXPIRY
+        )
+    )
+
+
+def start_http_client() -> httpx.AsyncClient:
+    """Creates this worker's shared client; called from the app lifespan."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    The shared client, so warm connections are reused across requests.
+
+    Created on first use when the lifespan has not run (e.g. under a TestClient without it).
+    """
+    return start_http_client()
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Request rate limit: ``rate`` tokens per second, up to ``burst`` saved up.
+
+    Each caller reserves a token up front and sleeps until it is due, so waiters are
+    served in arrival order without polling. A rate of 0 means unlimited.
+    Used from the event loop only, so no locking is needed.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        # Refill resumes from here; in the future while paused
+        self.updated_at = time.monotonic()
+        # Total seconds pauses have pushed back reservations already handed out
+        self._paused_for = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if now > self.updated_at:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+    async def acquire(self) -> None:
+        if not self.rate:
+            return
+        self._refill()
+        self.tokens -= 1
+        due = self.updated_at + max(0.0, -self.tokens) / self.rate
+        paused_for = self._paused_for
+        # A pause that starts while we sleep pushes our turn back by as much as it extends
+        while (delay := due + self._paused_for - paused_for - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hand out no tokens for ``seconds``, e.g. to honour a 429 Retry-After. Reservations
+        already made keep their order and are pushed back by the pause; any saved-up burst is
+        dropped so the end of the pause is not met with one.
+        """
+        if not self.rate:
+            return
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+        # After a refill, updated_at is now or the end of the pause already in progress
+        until = time.monotonic() + seconds
+        if until > self.updated_at:
+            self._paused_for += until - self.updated_at
+            self.updated_at = until
+
+    def available(self) -> float:
+        if not self.rate:
+            return float("inf")
+        self._refill()
+        return self.tokens
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit.
+
+    Every healthy response raises the limit by 1/limit (about +1 per round of requests),
+    and an overload signal - 429, 5xx, a transport error, or latency well above the best
+    recently seen - cuts it by ``decrease_factor``. Only requests started after the last
+    cut can cut again, so one burst of failures halves the limit once, not once per request.
+    """
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int, latency_tolerance: float,
+                 latency_floor: float, decrease_factor: float = 0.5):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.latency_floor = latency_floor
+        self.decrease_factor = decrease_factor
+
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.smoothed: Optional[float] = None
+        self.last_decrease = 0.0
+        self.decreases = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to ``release``."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    def latency_too_high(self, latency: float) -> bool:
+        return self.baseline is not None and latency > max(self.baseline * self.latency_tolerance, self.latency_floor)
+
+    async def release(self, started: float, overloaded: bool) -> None:
+        latency = time.monotonic() - started
+        overloaded = overloaded or self.latency_too_high(latency)
+        if overloaded:
+            if started >= self.last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self.last_decrease = time.monotonic()
+                self.decreases += 1
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            # The baseline drops to any faster response and creeps up slowly, so it tracks
+            # the best recent latency rather than the all-time minimum
+            self.baseline = latency if self.baseline is None else min(latency, self.baseline + (latency - self.baseline) * 0.01)
+        self.smoothed = latency if self.smoothed is None else self.smoothed * 0.9 + latency * 0.1
+
+        async with self._changed:
+            self.in_flight -= 1
+            self._changed.notify_all()
+
+
+class ProducerLimiter:
+    """Rate limit and adaptive concurrency limit for calls to one producer apipath."""
+
+    def __init__(self, rate: float, burst: float, initial_concurrency: int, min_concurrency: int, max_concurrency: int,
+                 latency_tolerance: float, latency_floor: float):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(
+            initial_concurrency, min_concurrency, max_concurrency, latency_tolerance, latency_floor
+        )
+        self.waiting = 0
+        self.requests = 0
+        self.throttled = 0
+        self.failures = 0
+
+    async def run(self, call: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Make ``call`` once a token and a concurrency slot are free, and learn from its outcome."""
+        self.waiting += 1
+        try:
+            await self.bucket.acquire()
+            started = await self.concurrency.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.requests += 1
+        overloaded = False
+        try:
+            response = await call()
+            if response.status_code == 429:
+                self.throttled += 1
+                overloaded = True
+                self.bucket.pause(retry_after(response))
+            elif response.status_code >= 500:
+                self.failures += 1
+                overloaded = True
+            return response
+        except httpx.TransportError:
+            self.failures += 1
+            overloaded = True
+            raise
+        finally:
+            await self.concurrency.release(started, overloaded)
+
+    def snapshot(self) -> Dict[str, Any]:
+        concurrency = self.concurrency
+        return {
+            "rate": self.bucket.rate or None,
+            "burst": self.bucket.burst,
+            "tokens": round(self.bucket.available(), 2) if self.bucket.rate else None,
+            "concurrency_limit": int(concurrency.limit),
+            "in_flight": concurrency.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "failures": self.failures,
+            "decreases": concurrency.decreases,
+            "latency_ms": round(concurrency.smoothed * 1000, 1) if concurrency.smoothed is not None else None,
+            "baseline_latency_ms": round(concurrency.baseline * 1000, 1) if concurrency.baseline is not None else None
+        }
+
+
+def retry_after(response: httpx.Response, default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(response.headers.get("Retry-After", default)))
+    except ValueError:
+        # HTTP-date form; not worth parsing for a pause this short
+        return default
+
+
+class LimiterRegistry:
+    """
+    One ProducerLimiter per apipath, created on first use; limits are per worker process.
+
+    ``overrides`` maps an apipath to settings that replace the defaults for it, e.g.
+    ``{"/dfEvent": {"rate": 20, "max_concurrency": 8}}``. At most ``max_entries`` idle
+    limiters are kept; the least recently used idle one is dropped to make room. Override keys
+    must be keys of ``defaults``, otherwise ValueError is raised here rather than on first use.
+    """
+
+    def __init__(self, defaults: Dict[str, Any], overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                 max_entries: int = 256):
+        self.defaults = defaults
+        self.overrides = overrides or {}
+        # Checked here so a typo in PRODUCER_LIMITS fails at startup, not on the first call to that apipath
+        for apipath, settings in self.overrides.items():
+            if not isinstance(settings, dict):
+                raise ValueError(f"Limits for '{apipath}' must be an object, got {settings!r}")
+            unknown = set(settings) - set(defaults)
+            if unknown:
+                raise ValueError(
+                    f"Unknown limit setting(s) for '{apipath}': {', '.join(sorted(unknown))}; "
+                    f"expected any of {', '.join(defaults)}"
+                )
+        self.max_entries = max_entries
+        self._limiters: "OrderedDict[str, ProducerLimiter]" = OrderedDict()
+
+    def get(self, apipath: str) -> ProducerLimiter:
+        limiter = self._limiters.get(apipath)
+        if limiter is not None:
+            self._limiters.move_to_end(apipath)
+            return limiter
+
+        if len(self._limiters) >= self.max_entries:
+            idle = next((path for path, l in self._limiters.items() if l.concurrency.in_flight == 0 and not l.waiting), None)
+            if idle is not None:
+                del self._limiters[idle]
+        limiter = ProducerLimiter(**{**self.defaults, **self.overrides.get(apipath, {})})
+        self._limiters[apipath] = limiter
+        return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {apipath: limiter.snapshot() for apipath, limiter in self._limiters.items()}
+
+
+# Shared by every producer call in this worker (single send, batch and outbox delivery)
+producer_limits = LimiterRegistry(
+    defaults={
+        "rate": Config.PRODUCER_RATE_LIMIT,
+        "burst": Config.PRODUCER_RATE_BURST,
+        "initial_concurrency": Config.PRODUCER_CONCURRENCY_INITIAL,
+        "min_concurrency": Config.PRODUCER_CONCURRENCY_MIN,
+        "max_concurrency": Config.PRODUCER_CONCURRENCY_MAX,
+        "latency_tolerance": Config.PRODUCER_LATENCY_TOLERANCE,
+        "latency_floor": Config.PRODUCER_LATENCY_FLOOR
+    },
+    overrides=Config.PRODUCER_LIMITS
+)
@@ -0,0 +1,100 @@
+"""
+Per-request auth overhead against the in-process stand-in issuer.
+
+    python -m app.tests.benchmark_auth
+    python -m app.tests.benchmark_auth --requests 2000 --users 50
+
+Compares fastapi_oidc's get_auth (verifies every request) with OIDCAuthenticator, cold
+(each token seen for the first time) and warm (validated-token cache hits). Each is timed
+as a bare dependency call and as a full request to a one-route app with no other work, so
+the difference between the rows is the auth overhead a console page pays per API call.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi_oidc import get_auth
+from starlette.concurrency import run_in_threadpool
+
+from app.auth.tokens import OIDCAuthenticator
+from app.tests.oidc_issuer import LocalIssuer
+
+
+def one_route_app(dependency) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def protected(user=Depends(dependency)):
+        return {}
+
+    return app
+
+
+async def time_calls(call, tokens) -> list:
+    timings = []
+    for token in tokens:
+        start = time.perf_counter()
+        await call(token)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+async def time_requests(app: FastAPI, tokens) -> list:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def call(token):
+            response = await client.get("/", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200, response.text
+
+        return await time_calls(call, tokens)
+
+
+async def run(issuer: LocalIssuer, requests: int, users: int) -> dict:
+    per_user = [issuer.issue({"sub": f"user-{i}"}) for i in range(users)]
+    tokens = [per_user[i % users] for i in range(requests)]
+    unique = [issuer.issue({"sub": f"cold-{i}"}) for i in range(requests)]
+    results = {}
+
+    legacy = get_auth(client_id=issuer.client_id, issuer=issuer.url,
+                      base_authorization_server_uri=issuer.url, signature_cache_ttl=3600)
+    legacy("Bearer " + tokens[0])  # fetch discovery and keys outside the timings
+    results["fastapi_oidc call"] = await time_calls(lambda t: run_in_threadpool(legacy, "Bearer " + t), tokens)
+    results["fastapi_oidc request"] = await time_requests(one_route_app(legacy), tokens)
+
+    async with httpx.AsyncClient() as http:
+        authenticator = OIDCAuthenticator(client_id=issuer.client_id, issuer=issuer.url,
+                                          base_authorization_server_uri=issuer.url, client=http)
+        await authenticator.jwks.refresh()
+        results["cached cold call"] = await time_calls(authenticator.authenticate, unique)
+        results["cached warm call"] = await time_calls(authenticator.authenticate, tokens)
+        results["cached warm request"] = await time_requests(one_route_app(authenticator.dependency()), tokens)
+
+    results["no auth request"] = await time_requests(one_route_app(lambda: None), tokens)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per measurement")
+    parser.add_argument("--users", type=int, default=20, help="Distinct tokens among the requests")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    issuer = LocalIssuer().start()
+    try:
+        results = asyncio.run(run(issuer, args.requests, args.users))
+    finally:
+        issuer.stop()
+
+    print(f"{'measurement':<24} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, timings in results.items():
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{name:<24} {statistics.median(timings):>8.3f} {p95:>8.3f} {statistics.fmean(timings):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+SFTP throughput benchmark against the in-process stand-in server.
+
+    python -m app.tests.benchmark_sftp
+    python -m app.tests.benchmark_sftp --sizes 1 16 64 --window-size 0 8388608 --prefetch 0 16 64
+
+Uploads use pipelined writes and downloads use prefetched reads, the same way the FTP
+routes transfer files. Defaults come from Config; every combination of the given window
+sizes, packet sizes and prefetch limits is measured (0 means paramiko's default).
+"""
+import argparse
+import itertools
+import logging
+import os
+import tempfile
+import time
+
+from app.config import Config
+from app.ftp.ftputil import FTPUtil
+from app.tests.sftp_server import LocalSFTPServer
+
+MB = 1024 * 1024
+
+
+def upload(sftp, remote_path: str, data: bytes, chunk_size: int) -> None:
+    with sftp.open(remote_path, 'wb') as remote_file:
+        remote_file.set_pipelined(True)
+        for offset in range(0, len(data), chunk_size):
+            remote_file.write(data[offset:offset + chunk_size])
+
+
+def download(sftp, remote_path: str, size: int, chunk_size: int, prefetch_concurrency: int) -> None:
+    with sftp.open(remote_path, 'rb') as remote_file:
+        remote_file.prefetch(size, prefetch_concurrency or None)
+        while remote_file.read(chunk_size):
+            pass
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def benchmark(server: LocalSFTPServer, size_mb: int, window_size: int, max_packet_size: int,
+              prefetch_concurrency: int, chunk_size: int, repeat: int) -> dict:
+    ftputil = FTPUtil(
+        host="127.0.0.1", port=server.port, user=server.user, user_password=server.password,
+        priv_key_str=None, pub_key_str=None,
+        window_size=window_size or None, max_packet_size=max_packet_size or None
+    )
+    sftp = ftputil.acquire_sftp_channel()
+    data = os.urandom(size_mb * MB)
+    remote_path = f"/bench_{size_mb}mb.bin"
+    try:
+        up = min(timed(upload, sftp, remote_path, data, chunk_size) for _ in range(repeat))
+        down = min(timed(download, sftp, remote_path, len(data), chunk_size, prefetch_concurrency) for _ in range(repeat))
+    finally:
+        sftp.remove(remote_path)
+        ftputil.release_sftp_channel()
+    return {"upload": size_mb / up, "download": size_mb / down}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 64], help="File sizes in MB")
+    parser.add_argument("--window-size", type=int, nargs="+", default=[Config.SFTP_WINDOW_SIZE])
+    parser.add_argument("--max-packet-size", type=int, nargs="+", default=[Config.SFTP_MAX_PACKET_SIZE])
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[Config.SFTP_PREFETCH_CONCURRENCY],
+                        help="Max concurrent prefetch requests per download")
+    parser.add_argument("--chunk-size", type=int, default=Config.SFTP_UPLOAD_CHUNK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is reported")
+    args = parser.parse_args()
+    # The stand-in logs every client disconnect as a socket error
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as root:
+        server = LocalSFTPServer(root).start()
+        try:
+            print(f"{'size MB':>8} {'window':>10} {'packet':>8} {'prefetch':>8} {'up MB/s':>9} {'down MB/s':>10}")
+            for size_mb, window_size, max_packet_size, prefetch in itertools.product(
+                args.sizes, args.window_size, args.max_packet_size, args.prefetch
+            ):
+                result = benchmark(server, size_mb, window_size, max_packet_size, prefetch, args.chunk_size, args.repeat)
+                print(f"{size_mb:>8} {window_size or 'default':>10} {max_packet_size or 'default':>8} "
+                      f"{prefetch or 'all':>8} {result['upload']:>9.1f} {result['download']:>10.1f}")
+        finally:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+from app.auth.auth import authenticate_user
+from app.db.checksums import ChecksumIndex
+from app.ftp.breaker import sftp_breaker
+from app.ftp.reports import LRUCache
+from app.ftp.settings import get_sftp_settings
+from app.main import app
+from app.routes import ftp
+from app.tests.sftp_server import LocalSFTPServer
+
+
+class MemoryChecksums(ChecksumIndex):
+    """In-memory stand-in for the ftp_checksums collection."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    async def record(self, path, folder, name, size, mtime, sha256):
+        self.docs[path] = {"_id": path, "folder": folder, "name": name, "size": size, "mtime": mtime, "sha256": sha256}
+
+    async def known(self, paths):
+        return {path: self.docs[path] for path in paths if path in self.docs}
+
+    async def find(self, sha256):
+        return [doc for doc in self.docs.values() if doc["sha256"] == sha256]
+
+    async def prune(self, folder, paths):
+        removed = [p for p, doc in self.docs.items() if doc["folder"] == folder and p not in paths]
+        for path in removed:
+            del self.docs[path]
+        return len(removed)
+
+
+def reset_ftp_state():
+    ftp.sftp_pool.close()
+    ftp.sftp_pool.folders.forget("/")
+    ftp.listing_cache.invalidate()
+    sftp_breaker.record_success()
+
+
+@pytest.fixture
+def sftp_server(tmp_path, monkeypatch):
+    """
+    In-process SFTP server on a temp directory, wired into the FTP routes.
+
+    The recon and archive folders are <tmp>/dev/primerecon and <tmp>/dev/primerecon_archive.
+    Auth is bypassed and checksums are kept in memory, so no OIDC provider or Mongo is needed.
+    """
+    server = LocalSFTPServer(str(tmp_path)).start()
+    for name, value in {
+        "PRIME_SFTP_SERVER": "127.0.0.1",
+        "PRIME_SFTP_SERVER_PORT": str(server.port),
+        "PRIME_SFTP_USER": server.user,
+        "PRIME_SFTP_PASS": server.password,
+        "PRIME_SFTP_PRIV_KEY_FILE": "",
+        "PRIME_SFTP_PUB_KEY_FILE": "",
+        "ENV": "PROD",
+        "FTP_INSTANCE_FOLDER_NAME": "dev",
+        "PRIMERECON_FTP_FOLDER": "primerecon",
+        "PRIMERECON_ARCHIVE_FOLDER": "primerecon_archive",
+    }.items():
+        monkeypatch.setenv(name, value)
+    get_sftp_settings.cache_clear()
+    monkeypatch.setattr(ftp, "ftp_checksums", MemoryChecksums())
+    monkeypatch.setattr(ftp, "report_summaries", LRUCache())
+    monkeypatch.setattr(ftp, "report_pages", LRUCache())
+    monkeypatch.setattr(ftp, "recon_results", LRUCache())
+    monkeypatch.setitem(app.dependency_overrides, authenticate_user, lambda: {})
+    reset_ftp_state()
+
+    for folder in ("primerecon", "primerecon_archive"):
+        os.makedirs(tmp_path / "dev" / folder)
+    server.recon = tmp_path / "dev" / "primerecon"
+    server.archive = tmp_path / "dev" / "primerecon_archive"
+
+    yield server
+
+    reset_ftp_state()
+    server.stop()
+    get_sftp_settings.cache_clear()
@@ -0,0 +1,87 @@
+"""
+In-process OIDC issuer serving discovery and a JWKS, for tests and benchmarks.
+
+    issuer = LocalIssuer().start()
+    token = issuer.issue({"sub": "user"})
+    ...  # validate against issuer.url with audience issuer.client_id
+    issuer.stop()
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+class LocalIssuer:
+    def __init__(self, client_id: str = "client-test"):
+        self.client_id = client_id
+        self.signing_keys = {}
+        self.kid = None
+        self.requests = {"discovery": 0, "jwks": 0}
+        self.rotate()
+
+    def rotate(self, keep_old: bool = True) -> str:
+        """Sign with a new key; the old one stays in the JWKS unless ``keep_old`` is False."""
+        pem = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        if not keep_old:
+            self.signing_keys.clear()
+        self.kid = uuid.uuid4().hex
+        # Constructed once: loading a PEM private key costs tens of milliseconds
+        self.signing_keys[self.kid] = jwk.construct(pem, "RS256")
+        return self.kid
+
+    def jwks(self) -> dict:
+        keys = []
+        for kid, key in self.signing_keys.items():
+            public = key.public_key().to_dict()
+            keys.append({**public, "kid": kid, "use": "sig", "alg": "RS256"})
+        return {"keys": keys}
+
+    def issue(self, claims: dict = None, expires_in: int = 300, kid: str = None) -> str:
+        """A signed ID token; a ``kid`` the issuer does not know is signed with the current key."""
+        now = int(time.time())
+        claims = {"iss": self.url, "aud": self.client_id, "sub": "test-user", "iat": now, "exp": now + expires_in, **(claims or {})}
+        kid = kid or self.kid
+        key = self.signing_keys.get(kid, self.signing_keys[self.kid])
+        return jwt.encode(claims, key, algorithm="RS256", headers={"kid": kid})
+
+    def start(self):
+        issuer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/.well-known/openid-configuration":
+                    issuer.requests["discovery"] += 1
+                    body = {"issuer": issuer.url, "jwks_uri": f"{issuer.url}/jwks",
+                            "id_token_signing_alg_values_supported": ["RS256"]}
+                elif self.path == "/jwks":
+                    issuer.requests["jwks"] += 1
+                    body = issuer.jwks()
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,178 @@
+"""
+In-process SFTP server backed by a local directory, for tests and benchmarks.
+
+    server = LocalSFTPServer(root).start()
+    ...  # connect to 127.0.0.1:server.port as test/test
+    server.stop()
+"""
+import os
+import socket
+import threading
+
+import paramiko
+from paramiko import SFTPServer, SFTPAttributes, SFTPHandle, SFTP_OK, AUTH_SUCCESSFUL, AUTH_FAILED, OPEN_SUCCEEDED
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, user, password):
+        self.user = user
+        self.password = password
+
+    def check_auth_password(self, username, password):
+        if username == self.user and password == self.password:
+            return AUTH_SUCCESSFUL
+        return AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return OPEN_SUCCEEDED
+
+
+class _Handle(SFTPHandle):
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+
+class _DirSFTP(paramiko.SFTPServerInterface):
+    root = None
+
+    def _local(self, path):
+        path = self.canonicalize(path)
+        return os.path.join(self.root, path.lstrip("/"))
+
+    def canonicalize(self, path):
+        return os.path.normpath("/" + path).replace("//", "/")
+
+    def list_folder(self, path):
+        local = self._local(path)
+        try:
+            out = []
+            for name in os.listdir(local):
+                attr = SFTPAttributes.from_stat(os.stat(os.path.join(local, name)))
+                attr.filename = name
+                out.append(attr)
+            return out
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        local = self._local(path)
+        try:
+            fd = os.open(local, flags | getattr(os, "O_BINARY", 0), 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_CREAT and attr is not None:
+            attr._flags &= ~attr.FLAG_PERMISSIONS
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        try:
+            f = os.fdopen(fd, mode)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        handle = _Handle(flags)
+        handle.filename = local
+        handle.readfile = f
+        handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(self._local(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rename(self, oldpath, newpath):
+        if os.path.exists(self._local(newpath)):
+            return SFTPServer.convert_errno(17)
+        try:
+            os.rename(self._local(oldpath), self._local(newpath))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        try:
+            os.replace(self._local(oldpath), self._local(newpath))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def mkdir(self, path, attr):
+        try:
+            os.mkdir(self._local(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def rmdir(self, path):
+        try:
+            os.rmdir(self._local(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def chattr(self, path, attr):
+        return SFTP_OK
+
+
+class LocalSFTPServer:
+    """Serves ``root`` over SFTP on a free localhost port with password auth; counts SSH handshakes."""
+
+    def __init__(self, root, user="test", password="test"):
+        self.root = root
+        self.user = user
+        self.password = password
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.handshakes = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen(64)
+        self.port = self._sock.getsockname()[1]
+        self._transports = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.handshakes += 1
+            t = paramiko.Transport(conn)
+            t.add_server_key(self.host_key)
+            root = self.root
+            t.set_subsystem_handler("sftp", SFTPServer, type("RootedSFTP", (_DirSFTP,), {"root": root}))
+            t.start_server(server=_Server(self.user, self.password))
+            self._transports.append(t)
+
+    def stop(self):
+        self._stopped.set()
+        self._sock.close()
+        for t in self._transports:
+            t.close()
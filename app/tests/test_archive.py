@@ -0,0 +1,174 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from app.config import Config
+from app.db import archive
+
+
+def matches(doc, query):
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif isinstance(condition, dict):
+            if doc.get(key) not in condition["$in"]:
+                return False
+        elif doc.get(key) != condition:
+            return False
+    return True
+
+
+class RecordingCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class RecordingCollection:
+    """
+    Stand-in that evaluates the equality and ``$in`` filters archival uses and records each
+    call; ``before_merge`` and ``after_merge`` let a test change documents mid-batch.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.docs = {}
+        self.calls = []
+        self.before_merge = self.after_merge = lambda: None
+
+    def find(self, query, projection=None):
+        self.calls.append(("find", query))
+        return RecordingCursor([dict(doc) for doc in self.docs.values() if matches(doc, query)])
+
+    def aggregate(self, pipeline):
+        self.calls.append(("aggregate", pipeline))
+        match, stamp, merge = pipeline
+        self.before_merge()
+        target = self.db[merge["$merge"]["into"]]
+        for doc in self.docs.values():
+            if matches(doc, match["$match"]):
+                target.docs[doc["_id"]] = {**doc, "archive_batch": stamp["$set"]["archive_batch"]}
+        self.after_merge()
+        return SimpleNamespace(to_list=lambda length: asyncio.sleep(0, []))
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = {**doc, "_id": query["_id"]}
+
+    async def delete_many(self, query):
+        self.calls.append(("delete_many", query))
+        deleted = [key for key, doc in self.docs.items() if matches(doc, query)]
+        for key in deleted:
+            del self.docs[key]
+        return SimpleNamespace(deleted_count=len(deleted))
+
+
+class RecordingDB(dict):
+    def __missing__(self, key):
+        self[key] = RecordingCollection(self)
+        return self[key]
+
+
+def fixed_errors(db, count):
+    ids = [ObjectId() for _ in range(count)]
+    db["errors"].docs = {_id: {"_id": _id, "fixed": True} for _id in ids}
+    return ids
+
+
+def test_fixed_before_ages_from_fixed_at_with_legacy_fallback():
+    query = archive.fixed_before(30)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+
+    fixed, (recorded, legacy) = query["$and"][0], query["$and"][1]["$or"]
+    assert fixed == {"fixed": True}
+    assert abs(recorded["fixed_at"]["$lt"] - cutoff) < timedelta(seconds=5)
+    assert legacy["fixed_at"] == {"$exists": False}
+    assert abs(legacy["_id"]["$lt"].generation_time - cutoff) < timedelta(seconds=5)
+
+
+def test_archive_documents_merges_each_batch_before_deleting_it():
+    db = RecordingDB()
+    ids = fixed_errors(db, 5)
+    query = {"fixed": True}
+
+    moved = asyncio.run(archive.archive_documents(db, "errors", query, batch_size=2))
+
+    assert moved == 5
+    assert db["errors"].docs == {}
+    assert sorted(db["errors_archive"].docs) == ids
+    steps = [call for call in db["errors"].calls if call[0] != "find"]
+    assert [name for name, _ in steps] == ["aggregate", "delete_many"] * 3
+    for (_, pipeline), (_, deleted) in zip(steps[::2], steps[1::2]):
+        match, _, merge = pipeline
+        assert match["$match"]["$and"][1] == query
+        assert deleted["$and"][1] == query
+        assert merge["$merge"]["into"] == "errors_archive"
+    assert [step[1]["$and"][0]["_id"]["$in"] for step in steps[1::2]] == [ids[:2], ids[2:4], ids[4:]]
+
+
+def test_archive_documents_deletes_only_documents_it_archived():
+    db = RecordingDB()
+    ids = fixed_errors(db, 3)
+    errors = db["errors"]
+
+    # Reopened between the lookup and the copy, then fixed again before the delete
+    errors.before_merge = lambda: errors.docs[ids[0]].update(fixed=False)
+    errors.after_merge = lambda: errors.docs[ids[0]].update(fixed=True)
+    moved = asyncio.run(archive.archive_documents(db, "errors", {"fixed": True}, batch_size=10))
+
+    assert moved == 2
+    assert list(errors.docs) == [ids[0]]
+    assert sorted(db["errors_archive"].docs) == ids[1:]
+
+
+def test_archive_documents_skips_copies_replaced_by_a_concurrent_run():
+    db = RecordingDB()
+    ids = fixed_errors(db, 2)
+    archived = db["errors_archive"]
+
+    def other_run_replaces_copy():
+        archived.docs[ids[1]]["archive_batch"] = "other-run"
+
+    db["errors"].after_merge = other_run_replaces_copy
+    moved = asyncio.run(archive.archive_documents(db, "errors", {"fixed": True}, batch_size=10))
+
+    # The other run deletes what it archived; this one only deletes its own copies
+    assert moved == 1
+    assert list(db["errors"].docs) == [ids[1]]
+
+
+def test_run_archival_reconciles_error_counters_only_when_documents_moved(monkeypatch):
+    db = RecordingDB()
+    fixed_errors(db, 1)
+    reconciled = []
+
+    async def reconcile():
+        reconciled.append(True)
+
+    monkeypatch.setattr(archive, "ride_services_db", db)
+    monkeypatch.setattr(archive, "recon_db", db)
+    monkeypatch.setattr(archive.error_counters, "reconcile", reconcile)
+    monkeypatch.setattr(Config, "ARCHIVE_FIXED_ERRORS_AFTER_DAYS", 30)
+    monkeypatch.setattr(Config, "ARCHIVE_RECON_AFTER_DAYS", 0)
+    monkeypatch.setattr(archive, "fixed_before", lambda days: {"fixed": True})
+
+    assert asyncio.run(archive.run_archival()) == {"errors": 1}
+    assert reconciled == [True]
+
+    assert asyncio.run(archive.run_archival()) == {"errors": 0}
+    assert reconciled == [True]
+    assert archive.last_run["moved"] == {"errors": 0}
+    assert db["archive_runs"].docs["last"]["moved"] == {"errors": 0}
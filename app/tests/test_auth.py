@@ -0,0 +1,153 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.auth import auth
+from app.auth.tokens import JWKSCache, OIDCAuthenticator, TokenCache
+from app.tests.oidc_issuer import LocalIssuer
+from app.tests.test_client import client
+
+
+@pytest.fixture
+def issuer():
+    issuer = LocalIssuer().start()
+    yield issuer
+    issuer.stop()
+
+
+def authenticate_all(issuer, tokens, **options):
+    """Preload keys, then validate ``tokens`` in order; returns the authenticator and each outcome."""
+    async def run():
+        async with httpx.AsyncClient() as http:
+            authenticator = OIDCAuthenticator(
+                client_id=issuer.client_id, issuer=issuer.url, base_authorization_server_uri=issuer.url,
+                client=http, **options
+            )
+            await authenticator.jwks.refresh()
+            outcomes = []
+            for token in tokens:
+                token = token() if callable(token) else token
+                try:
+                    outcomes.append((await authenticator.authenticate(token)).sub)
+                except HTTPException as e:
+                    outcomes.append(e.status_code)
+            return authenticator, outcomes
+
+    return asyncio.run(run())
+
+
+def test_valid_token_is_verified_once_then_cached(issuer):
+    token = issuer.issue({"sub": "alice"})
+
+    authenticator, outcomes = authenticate_all(issuer, [token, token, token])
+
+    assert outcomes == ["alice"] * 3
+    assert authenticator.metrics.snapshot()["verified"]["count"] == 1
+    assert authenticator.metrics.snapshot()["cache_hit"]["count"] == 2
+    assert issuer.requests == {"discovery": 1, "jwks": 1}
+
+
+def test_invalid_tokens_are_rejected(issuer):
+    expired = issuer.issue(expires_in=-10)
+    wrong_audience = issuer.issue({"aud": "someone-else"})
+
+    authenticator, outcomes = authenticate_all(issuer, [expired, wrong_audience, "not-a-jwt"])
+
+    assert outcomes == [401, 401, 401]
+    assert authenticator.metrics.snapshot()["rejected"]["count"] == 3
+    assert len(authenticator.tokens) == 0
+
+
+def test_key_rotation_refreshes_jwks_once(issuer):
+    def rotated_token():
+        issuer.rotate()
+        return issuer.issue({"sub": "bob"})
+
+    authenticator, outcomes = authenticate_all(
+        issuer, [rotated_token, lambda: issuer.issue({"sub": "bob"}, kid="unknown")]
+    )
+
+    # The unknown kid does not trigger a second fetch within the refresh interval
+    assert outcomes == ["bob", 401]
+    assert issuer.requests["jwks"] == 2
+
+
+def test_unreachable_issuer_keeps_returning_503_until_keys_load(issuer):
+    token = issuer.issue()
+
+    async def run():
+        async with httpx.AsyncClient() as http:
+            authenticator = OIDCAuthenticator(
+                client_id=issuer.client_id, issuer=issuer.url, base_authorization_server_uri="http://127.0.0.1:1",
+                client=http
+            )
+            statuses = []
+            for _ in range(2):
+                with pytest.raises(HTTPException) as e:
+                    await authenticator.authenticate(token)
+                statuses.append(e.value.status_code)
+            return authenticator, statuses
+
+    authenticator, statuses = asyncio.run(run())
+    # The second request is within the min refresh interval, so it does not retry the issuer
+    assert statuses == [503, 503]
+    assert authenticator.jwks.failures == 1
+    assert authenticator.metrics.snapshot()["unavailable"]["count"] == 2
+
+
+def test_cached_token_dropped_when_its_key_leaves_the_jwks(issuer):
+    token = issuer.issue()
+
+    def after_rotation():
+        issuer.rotate(keep_old=False)
+        return token
+
+    authenticator, outcomes = authenticate_all(issuer, [token, after_rotation], jwks_min_refresh_interval=0)
+    assert outcomes[0] == "test-user"
+    # Still cached until a refresh shows the key is gone
+    assert outcomes[1] == "test-user"
+
+    async def refresh():
+        async with httpx.AsyncClient() as http:
+            authenticator.jwks.client = http
+            await authenticator.jwks.refresh()
+            with pytest.raises(HTTPException) as e:
+                await authenticator.authenticate(token)
+            return e.value.status_code
+
+    assert asyncio.run(refresh()) == 401
+
+
+def test_token_cache_expires_and_evicts():
+    cache = TokenCache(max_entries=2)
+    cache.set("a", "claims-a", expires_at=0, kid=None)
+    cache.set("b", "claims-b", expires_at=2**40, kid="k1")
+    cache.set("c", "claims-c", expires_at=2**40, kid="k1")
+
+    assert cache.get("a", {"k1": None}) is None
+    assert cache.get("b", {"k1": None}) == "claims-b"
+    assert cache.get("b", {}) is None
+
+
+def test_route_reports_auth_timing(issuer, monkeypatch):
+    monkeypatch.setattr(auth.authenticator, "issuer", issuer.url)
+    monkeypatch.setattr(auth.authenticator, "audience", issuer.client_id)
+    monkeypatch.setattr(auth.authenticator, "jwks", JWKSCache(issuer.url))
+    monkeypatch.setattr(auth.authenticator, "tokens", TokenCache())
+
+    async def preload():
+        async with httpx.AsyncClient() as http:
+            auth.authenticator.jwks.client = http
+            await auth.authenticator.jwks.refresh()
+
+    asyncio.run(preload())
+    headers = {"Authorization": f"Bearer {issuer.issue()}"}
+
+    response = client.get("/api/auth/metrics", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("auth;dur=")
+    assert response.json()["cached_tokens"] == 1
+
+    assert client.get("/api/auth/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
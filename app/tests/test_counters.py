@@ -0,0 +1,49 @@
+import asyncio
+
+from app.db.counters import Counters, classify_error, classify_mainstaging
+
+
+class MockCollection:
+    def __init__(self):
+        self.updates = []
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+
+
+class MockDB(dict):
+    def __missing__(self, key):
+        self[key] = MockCollection()
+        return self[key]
+
+
+def test_classify_error():
+    assert classify_error({}) == ["new"]
+    assert classify_error({"fixed": False, "under_analysis": False}) == ["new"]
+    assert classify_error({"fixed": True, "under_analysis": False}) == ["fixed"]
+    assert classify_error({"under_analysis": True}) == ["under_analysis"]
+
+
+def test_classify_mainstaging():
+    assert classify_mainstaging({"recon_count": 3}) == ["total"]
+    assert classify_mainstaging({"recon_count": 11}) == ["total", "retry_exceptions"]
+
+
+def test_apply_transition_increments_counters():
+    db = MockDB()
+    counters = Counters(db, "errors", {}, classify_error)
+
+    asyncio.run(counters.apply({"fixed": False}, {"fixed": True, "under_analysis": False}))
+
+    assert db["counters"].updates == [
+        ({"_id": "errors"}, {"$inc": {"counts.new": -1, "counts.fixed": 1}})
+    ]
+
+
+def test_apply_without_change_skips_write():
+    db = MockDB()
+    counters = Counters(db, "errors", {}, classify_error)
+
+    asyncio.run(counters.apply({"fixed": True}, {"fixed": True, "under_analysis": False}))
+
+    assert db["counters"].updates == []
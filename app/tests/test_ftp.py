@@ -0,0 +1,124 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from app.ftp.listing import ListingCache, query_files, report_date
+from app.ftp.reports import scan_report
+from app.models.ftp_file import FtpFile
+from app.routes import ftp
+from app.routes.ftp import parse_range
+
+
+def test_parse_range():
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+
+
+def test_parse_range_ignores_unsupported_ranges():
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range("bytes=a-b", 1000) is None
+
+
+def test_parse_range_unsatisfiable():
+    with pytest.raises(HTTPException) as exc:
+        parse_range("bytes=1000-", 1000)
+    assert exc.value.status_code == 416
+
+
+def test_listing_cache_serves_from_memory_until_invalidated():
+    loads = []
+
+    async def loader(folder):
+        loads.append(folder)
+        return [FtpFile(name=f"file{len(loads)}.txt")]
+
+    async def scenario():
+        cache = ListingCache(loader, ttl=60)
+        first = await cache.get("/dev/primerecon")
+        second = await cache.get("/dev/primerecon")
+        cache.invalidate("/dev/primerecon")
+        third = await cache.get("/dev/primerecon")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert first is second
+    assert third[0].name == "file2.txt"
+    assert loads == ["/dev/primerecon", "/dev/primerecon"]
+
+
+def test_report_date():
+    assert report_date("PRIME_RSI_prod_daily_incoming_report_20241008.txt") == date(2024, 10, 8)
+    assert report_date("PRIME_RSI_prod_outgoing_daily_report_20240923_with_two_valid_records.txt") == date(2024, 9, 23)
+    assert report_date("notes.txt") is None
+
+
+def test_query_files_filters_sorts_and_pages():
+    files = [
+        FtpFile(name="PRIME_RSI_prod_daily_incoming_report_20241008.txt", size=30),
+        FtpFile(name="PRIME_RSI_prod_outgoing_daily_report_20240923.txt", size=10),
+        FtpFile(name="PRIME_RSI_prod_daily_incoming_report_20241009.txt", size=20),
+        FtpFile(name="notes.txt", size=5),
+    ]
+
+    total, page = query_files(files, pattern="*incoming*", sort="date", descending=True)
+    assert total == 2
+    assert [f.name for f in page] == [
+        "PRIME_RSI_prod_daily_incoming_report_20241009.txt",
+        "PRIME_RSI_prod_daily_incoming_report_20241008.txt",
+    ]
+
+    total, page = query_files(files, date_from=date(2024, 10, 1), date_to=date(2024, 10, 8))
+    assert total == 1
+
+    total, page = query_files(files, sort="size", offset=1, limit=2)
+    assert total == 4
+    assert [f.size for f in page] == [10, 20]
+
+
+def test_scan_report_pages_and_summarises():
+    lines = [f"REC{i}|EV{i}\r\n".encode() for i in range(10)] + [b"\n"]
+
+    records, summary = scan_report(lines, offset=2, limit=3)
+    assert [r["fields"] for r in records] == [["REC2", "EV2"], ["REC3", "EV3"], ["REC4", "EV4"]]
+    assert summary == {"total_records": 10, "blank_lines": 1, "delimiter": "|", "min_fields": 2, "max_fields": 2}
+
+    records, _ = scan_report(lines, tail=2)
+    assert [r["record"] for r in records] == [8, 9]
+
+    records, summary = scan_report(lines, offset=0, limit=2, stop_early=True)
+    assert len(records) == 2
+    assert summary["total_records"] == 3
+
+
+class RecordingChecksums:
+    def __init__(self):
+        self.recorded = []
+
+    async def record(self, *args):
+        self.recorded.append(args)
+
+
+def test_full_download_records_checksum(monkeypatch):
+    checksums = RecordingChecksums()
+    monkeypatch.setattr(ftp, "ftp_checksums", checksums)
+
+    async def chunks(*parts):
+        for part in parts:
+            yield part
+
+    async def download(size):
+        stream = ftp.hash_while_streaming(chunks(b"abc", b"def"), "/dev/primerecon/a.txt", "/dev/primerecon", "a.txt", size, 1)
+        return b"".join([chunk async for chunk in stream])
+
+    assert asyncio.run(download(6)) == b"abcdef"
+    assert asyncio.run(download(10)) == b"abcdef"
+    assert checksums.recorded == [(
+        "/dev/primerecon/a.txt", "/dev/primerecon", "a.txt", 6, 1,
+        "bef57ec7f53a6d40beb640a780a639c83bc29ac8a9816f1fc6c5c6dcd93c4721"
+    )]
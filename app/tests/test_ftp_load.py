@@ -0,0 +1,67 @@
+import asyncio
+import os
+import time
+
+import httpx
+
+from app.config import Config
+from app.ftp.async_sftp import AsyncSFTP
+from app.main import app
+from app.routes import ftp
+
+CONCURRENCY = 40
+
+
+async def timed_requests(requests):
+    """Send (method, url, params) requests concurrently; returns (responses, latencies in ms)."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        async def send(method, url, params):
+            start = time.perf_counter()
+            response = await client.request(method, url, params=params)
+            return response, (time.perf_counter() - start) * 1000
+
+        results = await asyncio.gather(*(send(*request) for request in requests))
+    return [r for r, _ in results], [ms for _, ms in results]
+
+
+def p95(latencies):
+    latencies = sorted(latencies)
+    return latencies[int(len(latencies) * 0.95) - 1]
+
+
+def run(coro, monkeypatch):
+    # A runner of its own, so its asyncio primitives belong to this test's event loop
+    runner = AsyncSFTP(ftp.sftp_pool, max_workers=Config.SFTP_MAX_WORKERS,
+                       operation_timeout=Config.SFTP_OPERATION_TIMEOUT, breaker=ftp.sftp_breaker)
+    monkeypatch.setattr(ftp, "sftp_runner", runner)
+    try:
+        return asyncio.run(coro)
+    finally:
+        runner.shutdown()
+
+
+def test_concurrent_downloads_reuse_pooled_connections(sftp_server, monkeypatch):
+    content = os.urandom(512 * 1024)
+    (sftp_server.recon / "report.txt").write_bytes(content)
+
+    requests = [("GET", "/api/ftp/recon_ftp/download", {"filename": "report.txt"})] * CONCURRENCY
+    responses, latencies = run(timed_requests(requests), monkeypatch)
+
+    assert all(r.status_code == 200 and r.content == content for r in responses)
+    # Every request is served by the pool: at most one SSH handshake per pooled connection
+    assert sftp_server.handshakes <= Config.SFTP_POOL_SIZE
+    assert p95(latencies) < 10_000
+
+
+def test_concurrent_listings_share_one_load(sftp_server, monkeypatch):
+    for i in range(50):
+        (sftp_server.recon / f"PRIME_RSI_prod_daily_incoming_report_202410{i:02d}.txt").write_text("x")
+
+    requests = [("GET", "/api/ftp/recon_ftp", {"details": True})] * CONCURRENCY
+    responses, latencies = run(timed_requests(requests), monkeypatch)
+
+    assert all(r.status_code == 200 and len(r.json()) == 50 for r in responses)
+    # Concurrent cache misses for one folder are coalesced into a single listing
+    assert sftp_server.handshakes == 1
+    assert p95(latencies) < 5_000
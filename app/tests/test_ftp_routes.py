@@ -0,0 +1,416 @@
+import asyncio
+import functools
+import hashlib
+import io
+import json
+import os
+import zipfile
+from contextlib import aclosing
+
+from app.auth.auth import authenticate_user
+from app.config import Config
+from app.ftp.bundle import stream_zip
+from app.ftp.async_sftp import AsyncSFTP
+from app.ftp.reconcile import ReportReconciler
+from app.main import app
+from app.routes import ftp
+from app.tests.test_client import client
+from app.tests.test_reconcile import MockCollection
+
+INCOMING = "PRIME_RSI_prod_daily_incoming_report_20241008.txt"
+OUTGOING = "PRIME_RSI_prod_outgoing_daily_report_20240923.txt"
+
+
+def test_list_recon_files(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("a|1\n")
+    (sftp_server.recon / OUTGOING).write_text("b|2\nc|3\n")
+
+    response = client.get("/api/ftp/recon_ftp")
+    assert response.status_code == 200
+    assert sorted(response.json()) == [INCOMING, OUTGOING]
+
+    response = client.get("/api/ftp/recon_ftp", params={"details": True, "sort": "size", "order": "desc", "limit": 1})
+    assert response.headers["X-Total-Count"] == "2"
+    assert [(f["name"], f["size"]) for f in response.json()] == [(OUTGOING, 8)]
+
+
+def test_list_both_and_count(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("a")
+    (sftp_server.archive / OUTGOING).write_text("b")
+
+    response = client.get("/api/ftp/recon_ftp_both")
+    assert response.status_code == 200
+    assert response.json()["recon"] == [INCOMING]
+    assert response.json()["archive"] == [OUTGOING]
+
+    assert client.get("/api/ftp/recon_ftp/count").json() == {"count": 1}
+    assert client.get("/api/ftp/recon_ftp_archives/count").json() == {"count": 1}
+
+
+def test_list_both_loads_folders_in_parallel(sftp_server, monkeypatch):
+    (sftp_server.recon / INCOMING).write_text("a")
+    (sftp_server.recon / OUTGOING).write_text("b")
+    load = ftp.listing_cache.loader
+    in_flight, peak = 0, 0
+
+    async def tracked_load(folder):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        try:
+            return await load(folder)
+        finally:
+            in_flight -= 1
+
+    monkeypatch.setattr(ftp.listing_cache, "loader", tracked_load)
+
+    body = client.get("/api/ftp/recon_ftp_both").json()
+    assert peak == 2
+    assert body["counts"] == {"recon": 2, "archive": 0}
+    assert {f["name"] for f in body["details"]["recon"]} == {INCOMING, OUTGOING}
+    assert set(body["timings_ms"]) == {"recon", "archive", "total"}
+
+    # Served from the cache until a refresh is asked for
+    (sftp_server.archive / "late.txt").write_text("c")
+    assert client.get("/api/ftp/recon_ftp_both").json()["counts"]["archive"] == 0
+    assert client.get("/api/ftp/recon_ftp_both", params={"refresh": True}).json()["archive"] == ["late.txt"]
+
+def test_download_full_and_range(sftp_server):
+    (sftp_server.recon / INCOMING).write_bytes(b"0123456789")
+
+    response = client.get("/api/ftp/recon_ftp/download", params={"filename": INCOMING})
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+
+    response = client.get("/api/ftp/recon_ftp/download", params={"filename": INCOMING}, headers={"Range": "bytes=2-4"})
+    assert response.status_code == 206
+    assert response.content == b"234"
+    assert response.headers["Content-Range"] == "bytes 2-4/10"
+
+    response = client.get("/api/ftp/recon_ftp/download", params={"filename": INCOMING}, headers={"Range": "bytes=20-"})
+    assert response.status_code == 416
+
+
+def test_download_missing_file(sftp_server):
+    response = client.get("/api/ftp/recon_ftp_archives/download", params={"filename": "missing.txt"})
+    assert response.status_code == 404
+
+
+def test_upload_streams_to_folder(sftp_server):
+    content = b"x|1\n" * 1000
+
+    response = client.post(
+        "/api/ftp/recon_ftp/upload",
+        params={"folder": "primerecon"},
+        files={"file": (INCOMING, content)}
+    )
+
+    assert response.status_code == 201
+    assert response.json()["sha256"] == hashlib.sha256(content).hexdigest()
+    assert (sftp_server.recon / INCOMING).read_bytes() == content
+    assert [p.name for p in sftp_server.recon.iterdir()] == [INCOMING]
+
+
+def test_upload_rejects_duplicate_and_oversize(sftp_server, monkeypatch):
+    client.post("/api/ftp/recon_ftp/upload", params={"folder": "primerecon"}, files={"file": (INCOMING, b"same")})
+
+    response = client.post(
+        "/api/ftp/recon_ftp/upload",
+        params={"folder": "primerecon_archive", "on_duplicate": "reject"},
+        files={"file": ("copy.txt", b"same")}
+    )
+    assert response.status_code == 409
+
+    monkeypatch.setattr(Config, "SFTP_UPLOAD_MAX_BYTES", 3)
+    response = client.post("/api/ftp/recon_ftp/upload", params={"folder": "primerecon"}, files={"file": ("big.txt", b"1234")})
+    assert response.status_code == 413
+    assert sorted(p.name for p in sftp_server.archive.iterdir()) == []
+    assert sorted(p.name for p in sftp_server.recon.iterdir()) == [INCOMING]
+
+
+def test_upload_only_to_recon_or_archive_folder(sftp_server):
+    for folder in ("other", "primerecon/nested", "../primerecon"):
+        response = client.post("/api/ftp/recon_ftp/upload", params={"folder": folder}, files={"file": ("a.txt", b"a")})
+        assert response.status_code == 400
+
+    response = client.post("/api/ftp/recon_ftp/upload", params={"folder": "primerecon"}, files={"file": ("../a.txt", b"a")})
+    assert response.status_code == 400
+    assert not (sftp_server.recon.parent / "other").exists()
+    assert not (sftp_server.recon / "nested").exists()
+
+
+def test_upload_requires_auth(sftp_server, monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, authenticate_user)
+
+    response = client.post("/api/ftp/recon_ftp/upload", params={"folder": "primerecon"}, files={"file": ("a.txt", b"a")})
+    assert response.status_code in (401, 403)
+    assert list(sftp_server.recon.iterdir()) == []
+
+
+def test_rename(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("a")
+    (sftp_server.recon / OUTGOING).write_text("b")
+
+    response = client.put("/api/ftp/recon_ftp/rename", params={"old_filename": INCOMING, "new_filename": OUTGOING})
+    assert response.status_code == 400
+
+    response = client.put("/api/ftp/recon_ftp/rename", params={"old_filename": INCOMING, "new_filename": "renamed.txt"})
+    assert response.status_code == 200
+    assert (sftp_server.recon / "renamed.txt").read_text() == "a"
+    assert "renamed.txt" in client.get("/api/ftp/recon_ftp").json()
+
+    response = client.put("/api/ftp/recon_ftp_archives/rename", params={"old_filename": "missing.txt", "new_filename": "x.txt"})
+    assert response.status_code == 404
+
+
+def test_delete(sftp_server):
+    (sftp_server.archive / OUTGOING).write_text("b")
+
+    response = client.delete("/api/ftp/recon_ftp_archives/delete", params={"filename": OUTGOING})
+    assert response.status_code == 200
+    assert not (sftp_server.archive / OUTGOING).exists()
+
+    response = client.delete("/api/ftp/recon_ftp_archives/delete", params={"filename": OUTGOING})
+    assert response.status_code == 404
+
+
+def test_batch_move_and_bundle(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("a")
+    (sftp_server.recon / OUTGOING).write_text("b")
+
+    response = client.post("/api/ftp/batch/move", json={"folder": "recon", "pattern": "*incoming*"})
+    assert response.json()["succeeded"] == 1
+    assert (sftp_server.archive / INCOMING).exists()
+
+    response = client.get("/api/ftp/bundle", params={"folder": "archive", "files": [INCOMING]})
+    assert response.status_code == 200
+    assert zipfile.ZipFile(io.BytesIO(response.content)).read(INCOMING) == b"a"
+
+
+def test_batch_move_keeps_existing_targets_unless_overwriting(sftp_server):
+    (sftp_server.archive / INCOMING).write_text("archived")
+    (sftp_server.archive / OUTGOING).write_text("b")
+    (sftp_server.recon / INCOMING).write_text("new")
+
+    response = client.post("/api/ftp/batch/move", json={"folder": "archive", "files": [INCOMING, OUTGOING]})
+    assert response.json() == {
+        "succeeded": 1,
+        "failed": 1,
+        "results": [
+            {"file": INCOMING, "status": "error", "detail": "Target already exists"},
+            {"file": OUTGOING, "status": "ok"},
+        ]
+    }
+    assert (sftp_server.recon / INCOMING).read_text() == "new"
+    assert (sftp_server.recon / OUTGOING).exists()
+
+    response = client.post("/api/ftp/batch/move", json={"folder": "archive", "files": [INCOMING], "overwrite": True})
+    assert response.json()["succeeded"] == 1
+    assert (sftp_server.recon / INCOMING).read_text() == "archived"
+    assert list(sftp_server.archive.iterdir()) == []
+
+
+def test_batch_requires_either_files_or_pattern(sftp_server, monkeypatch):
+    assert client.post("/api/ftp/batch/delete", json={"folder": "recon"}).status_code == 400
+    assert client.post("/api/ftp/batch/delete", json={"folder": "recon", "files": ["a"], "pattern": "*"}).status_code == 400
+
+    monkeypatch.setattr(Config, "SFTP_BATCH_MAX_FILES", 1)
+    response = client.post("/api/ftp/batch/delete", json={"folder": "recon", "files": ["a", "b"]})
+    assert response.status_code == 400
+
+def test_batch_delete_reports_missing_files_and_deletes_the_rest(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("a")
+    (sftp_server.recon / OUTGOING).write_text("b")
+
+    response = client.post("/api/ftp/batch/delete", json={"folder": "recon", "files": [INCOMING, "missing.txt", OUTGOING]})
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": 2,
+        "failed": 1,
+        "results": [
+            {"file": INCOMING, "status": "ok"},
+            {"file": "missing.txt", "status": "error", "detail": "File not found"},
+            {"file": OUTGOING, "status": "ok"},
+        ]
+    }
+    assert list(sftp_server.recon.iterdir()) == []
+
+
+def test_batch_rename_skips_collisions_and_missing_files(sftp_server):
+    for name in ("a.txt", "b.txt", "a_done.txt"):
+        (sftp_server.recon / name).write_text(name)
+
+    response = client.post(
+        "/api/ftp/batch/rename",
+        json={"folder": "recon", "files": ["a.txt", "b.txt", "c.txt"], "template": "{stem}_done{ext}"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "succeeded": 1,
+        "failed": 2,
+        "results": [
+            {"file": "a.txt", "status": "error", "detail": "Target already exists"},
+            {"file": "b.txt", "status": "ok", "target": "b_done.txt"},
+            {"file": "c.txt", "status": "error", "detail": "File not found"},
+        ]
+    }
+    assert (sftp_server.recon / "a_done.txt").read_text() == "a_done.txt"
+    assert sorted(p.name for p in sftp_server.recon.iterdir()) == ["a.txt", "a_done.txt", "b_done.txt"]
+
+    # Two files mapped to one name: the first is renamed, the second is rejected before any rename
+    response = client.post(
+        "/api/ftp/batch/rename", json={"folder": "recon", "files": ["a_done.txt", "b_done.txt"], "template": "final.txt"}
+    )
+    assert [r["status"] for r in response.json()["results"]] == ["ok", "error"]
+    assert response.json()["results"][1]["detail"] == "Target already exists"
+    assert sorted(p.name for p in sftp_server.recon.iterdir()) == ["a.txt", "b_done.txt", "final.txt"]
+
+def test_preview(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("".join(f"T{i}|{i}\n" for i in range(10)))
+
+    response = client.get("/api/ftp/recon/preview", params={"filename": INCOMING, "mode": "tail", "page_size": 2})
+    assert response.status_code == 200
+    assert response.json()["total_records"] == 10
+    assert [r["fields"] for r in response.json()["records"]] == [["T8", "8"], ["T9", "9"]]
+
+
+def test_preview_reads_in_chunks(sftp_server, monkeypatch):
+    monkeypatch.setattr(Config, "SFTP_DOWNLOAD_CHUNK_SIZE", 7)
+    (sftp_server.recon / INCOMING).write_text("".join(f"T{i}|{i}\n" for i in range(10)))
+
+    response = client.get("/api/ftp/recon/preview", params={"filename": INCOMING, "mode": "page", "page": 2, "page_size": 3})
+    assert response.status_code == 200
+    assert response.json()["total_records"] == 10
+    assert [r["fields"] for r in response.json()["records"]] == [["T3", "3"], ["T4", "4"], ["T5", "5"]]
+
+    # The summary is cached, so this view stops reading once the page is complete
+    response = client.get("/api/ftp/recon/preview", params={"filename": INCOMING, "mode": "head", "page_size": 2})
+    assert [r["raw"] for r in response.json()["records"]] == ["T0|0", "T1|1"]
+
+
+def reconcile_against(monkeypatch, mainstaging):
+    db = {"mainstaging": MockCollection(mainstaging), "errortable": MockCollection([]), "errorstaging": MockCollection([])}
+    monkeypatch.setattr(ftp, "ReportReconciler", functools.partial(ReportReconciler, db=db))
+
+
+def test_reconcile_streams_results_then_replays_them(sftp_server, monkeypatch):
+    reconcile_against(monkeypatch, [{"eventid": "1"}])
+    (sftp_server.recon / INCOMING).write_text("T1|1\nT2|2\n")
+
+    response = client.get("/api/ftp/recon/reconcile", params={"filename": INCOMING})
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "miss"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["type"], line.get("status")) for line in lines] == [("record", "matched"), ("record", "missing"), ("summary", None)]
+    assert lines[-1]["matched"] == 1 and lines[-1]["missing"] == 1
+
+    response = client.get("/api/ftp/recon/reconcile", params={"filename": INCOMING, "problems_only": True})
+    assert response.headers["X-Cache"] == "hit"
+    assert [json.loads(line).get("eventid") for line in response.text.splitlines()] == ["2", None]
+
+    assert client.get("/api/ftp/recon/reconcile", params={"filename": "missing.txt"}).status_code == 404
+
+
+def test_reconcile_closes_the_remote_file_before_releasing_the_session(sftp_server, monkeypatch):
+    reconcile_against(monkeypatch, [])
+    monkeypatch.setattr(Config, "RECON_MATCH_BATCH_SIZE", 1)
+    monkeypatch.setattr(Config, "SFTP_DOWNLOAD_CHUNK_SIZE", 7)
+    (sftp_server.recon / INCOMING).write_text("".join(f"T{i}|{i}\n" for i in range(50)))
+    events = []
+
+    async def tracked_records(*args):
+        try:
+            async with aclosing(iter_report_records(*args)) as records:
+                async for record in records:
+                    yield record
+        finally:
+            events.append("file closed")
+
+    def tracked_release(ftputil, broken=False):
+        events.append("released")
+        return release(ftputil, broken)
+
+    iter_report_records, release = ftp.iter_report_records, ftp.sftp_pool.release
+    monkeypatch.setattr(ftp, "iter_report_records", tracked_records)
+    monkeypatch.setattr(ftp.sftp_pool, "release", tracked_release)
+
+    async def disconnect_after_first_line():
+        file = next(f for f in await ftp.load_folder_listing(ftp.recon_folder()) if f.name == INCOMING)
+        body = ftp.stream_reconciliation(f"{ftp.recon_folder()}/{INCOMING}", file, False)
+        await body.__anext__()
+        await body.aclose()
+
+    run_background(disconnect_after_first_line(), monkeypatch)
+    assert events[-2:] == ["file closed", "released"]
+
+
+def run_background(coro, monkeypatch):
+    # A runner of its own, so its asyncio primitives belong to this test's event loop
+    runner = AsyncSFTP(ftp.sftp_pool, breaker=ftp.sftp_breaker)
+    monkeypatch.setattr(ftp, "sftp_runner", runner)
+    try:
+        return asyncio.run(coro)
+    finally:
+        runner.shutdown()
+
+
+def test_bundle_by_date_range(sftp_server):
+    (sftp_server.recon / INCOMING).write_text("a")
+    (sftp_server.recon / OUTGOING).write_text("b")
+    (sftp_server.recon / "PRIME_RSI_prod_daily_incoming_report_20241101.txt").write_text("c")
+
+    response = client.get("/api/ftp/bundle", params={"folder": "recon", "date_from": "2024-09-01", "date_to": "2024-10-31"})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == "attachment; filename=recon_20240901_20241031.zip"
+    bundle = zipfile.ZipFile(io.BytesIO(response.content))
+    assert bundle.namelist() == [OUTGOING, INCOMING]
+    assert bundle.read(OUTGOING) == b"b"
+
+    assert client.get("/api/ftp/bundle", params={"folder": "recon"}).status_code == 400
+    response = client.get("/api/ftp/bundle", params={"folder": "recon", "files": [INCOMING, "missing.txt"]})
+    assert response.status_code == 404
+
+
+def test_bundle_streams_members_in_chunks(sftp_server, monkeypatch):
+    content = os.urandom(64 * 1024)
+    (sftp_server.recon / INCOMING).write_bytes(content)
+
+    async def collect():
+        listing = await ftp.listing_cache.get(ftp.recon_folder())
+        return [chunk async for chunk in stream_zip(ftp.sftp_runner, ftp.recon_folder(), listing, 8 * 1024)]
+
+    chunks = run_background(collect(), monkeypatch)
+    # Emitted as each chunk is deflated, never the whole member at once
+    assert len(chunks) > 4
+    assert max(len(chunk) for chunk in chunks) < len(content)
+    assert zipfile.ZipFile(io.BytesIO(b"".join(chunks))).read(INCOMING) == content
+
+def test_checksum_index_hashes_in_chunks(sftp_server, monkeypatch):
+    monkeypatch.setattr(Config, "SFTP_DOWNLOAD_CHUNK_SIZE", 5)
+    (sftp_server.recon / INCOMING).write_bytes(b"x" * 23)
+    (sftp_server.archive / OUTGOING).write_bytes(b"y" * 3)
+
+    run_background(ftp.index_checksums(), monkeypatch)
+
+    assert {doc["name"]: doc["sha256"] for doc in ftp.ftp_checksums.docs.values()} == {
+        INCOMING: hashlib.sha256(b"x" * 23).hexdigest(),
+        OUTGOING: hashlib.sha256(b"y" * 3).hexdigest()
+    }
+
+
+def test_checksum_index_failures_do_not_trip_the_breaker(sftp_server, monkeypatch):
+    (sftp_server.recon / INCOMING).write_bytes(b"x")
+
+    def drop_connection():
+        raise EOFError("connection lost")
+
+    async def failing_hash(session, sftp, remote_path, size):
+        return await session.run(drop_connection)
+
+    monkeypatch.setattr(ftp, "hash_remote_file", failing_hash)
+    monkeypatch.setattr(ftp.sftp_breaker, "failure_threshold", 1)
+    run_background(ftp.index_checksums(), monkeypatch)
+
+    assert ftp.ftp_checksums.docs == {}
+    assert ftp.sftp_breaker.state == "closed" and ftp.sftp_breaker.failures == 0
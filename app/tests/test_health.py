@@ -14,10 +14,11 @@ def test_ready_success(monkeypatch):
         async def command(self, cmd):
             return await mock_command(cmd)
     
-    monkeypatch.setattr("app.routes.health.db", MockDB())
+    monkeypatch.setattr("app.db.mongo.DATABASES", {"recon-db": MockDB(), "ride-services-db": MockDB()})
     response = client.get("/api/ready")
     assert response.status_code == 200
-    assert response.json() == {"status": "ready"}
+    assert response.json()["status"] == "ready"
+    assert response.json()["sftp"]["state"] == "closed"
 
 
 def test_ready_failure(monkeypatch):
@@ -27,10 +28,36 @@ def test_ready_failure(monkeypatch):
     class MockDB:
         async def command(self, cmd):
             return await mock_command(cmd)
+
+    class HealthyDB:
+        async def command(self, cmd):
+            return {"ok": 1}
     
-    monkeypatch.setattr("app.routes.health.db", MockDB())
+    monkeypatch.setattr("app.db.mongo.DATABASES", {"recon-db": HealthyDB(), "ride-services-db": MockDB()})
     response = client.get("/api/ready")
     assert response.status_code == 503
     data = response.json()
     assert data["status"] == "unavailable"
     assert "error" in data
+    assert data["databases"] == ["ride-services-db"]
+
+
+def test_mongo_client_uses_config(monkeypatch):
+    from app.config import Config
+    from app.db import mongo
+
+    monkeypatch.setattr(Config, "MONGO_MAX_POOL_SIZE", 7)
+    monkeypatch.setattr(Config, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 1500)
+    monkeypatch.setattr(Config, "MONGO_COMPRESSORS", ["unknown", "zlib"])
+
+    mongo_client = mongo.create_mongo_client("mongodb://127.0.0.1:1")
+    assert mongo_client.options.pool_options.max_pool_size == 7
+    assert mongo_client.options.server_selection_timeout == 1.5
+    assert mongo_client.options.pool_options.metadata["application"] == {"name": Config.MONGO_APP_NAME}
+    assert mongo.available_compressors(["unknown", "zlib"]) == ["zlib"]
+    mongo_client.close()
+
+    # Never falls back to a compressor that was not asked for: with none available, none is used
+    monkeypatch.setattr(Config, "MONGO_COMPRESSORS", ["unknown"])
+    assert mongo.available_compressors(Config.MONGO_COMPRESSORS) == []
+    mongo.create_mongo_client("mongodb://127.0.0.1:1").close()
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db.leases import TaskLease
+
+
+class LeaseCollection:
+    """Applies TaskLease's upsert the way Mongo does: update the match, else insert on a free _id."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def matches(self, doc, query):
+        now_or_owner = query["$or"]
+        return doc["owner"] == now_or_owner[0]["owner"] or doc["expires_at"] <= now_or_owner[1]["expires_at"]["$lte"]
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and not self.matches(doc, query):
+            raise DuplicateKeyError("E11000 duplicate key error")
+        self.docs[query["_id"]] = {**(doc or {"_id": query["_id"]}), **update["$set"]}
+
+    async def delete_one(self, query):
+        if self.docs.get(query["_id"], {}).get("owner") == query["owner"]:
+            del self.docs[query["_id"]]
+
+
+def test_one_worker_holds_the_lease_until_it_expires():
+    db = {"task_leases": LeaseCollection()}
+    first, second = TaskLease(db, "job", owner="a"), TaskLease(db, "job", owner="b")
+
+    async def scenario():
+        outcomes = [await first.acquire(60), await second.acquire(60), await first.acquire(60)]
+        db["task_leases"].docs["job"]["expires_at"] = datetime.now(timezone.utc)
+        outcomes.append(await second.acquire(60))
+        outcomes.append(await first.acquire(60))
+        return outcomes
+
+    assert asyncio.run(scenario()) == [True, False, True, True, False]
+    assert db["task_leases"].docs["job"]["owner"] == "b"
+
+
+def test_exclusive_runs_only_on_the_holder_and_release_hands_over():
+    db = {"task_leases": LeaseCollection()}
+    first, second = TaskLease(db, "job", owner="a"), TaskLease(db, "job", owner="b")
+    runs = []
+
+    def job(name):
+        async def run():
+            runs.append(name)
+        return run
+
+    async def scenario():
+        for _ in range(2):
+            await first.exclusive(job("a"), 60)()
+            await second.exclusive(job("b"), 60)()
+        await first.release()
+        await second.exclusive(job("b"), 60)()
+
+    asyncio.run(scenario())
+    assert runs == ["a", "a", "b"]
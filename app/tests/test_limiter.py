@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.limiter import AdaptiveConcurrency, LimiterRegistry, ProducerLimiter, TokenBucket
+
+DEFAULTS = {
+    "rate": 0, "burst": 1, "initial_concurrency": 4, "min_concurrency": 1, "max_concurrency": 16,
+    "latency_tolerance": 2.0, "latency_floor": 0.25
+}
+
+
+def responder(status: int, delay: float = 0, headers=None):
+    async def call():
+        await asyncio.sleep(delay)
+        return httpx.Response(status, headers=headers)
+    return call
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rate=100, burst=1)
+
+    async def burst():
+        start = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(burst()) >= 0.09
+
+
+def test_token_bucket_pause_pushes_back_reservations():
+    bucket = TokenBucket(rate=20, burst=1)
+
+    async def scenario():
+        start = time.monotonic()
+        await bucket.acquire()
+        finished = []
+
+        async def acquire(name):
+            await bucket.acquire()
+            finished.append((name, time.monotonic() - start))
+
+        # Reserved for 0.05s, 0.10s and 0.15s, then a 0.25s pause pushes all three back
+        waiting = [asyncio.create_task(acquire(f"reserved-{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        bucket.pause(0.25)
+        await asyncio.gather(*waiting, acquire("after-pause"))
+        return finished
+
+    finished = asyncio.run(scenario())
+    assert [name for name, _ in finished] == ["reserved-0", "reserved-1", "reserved-2", "after-pause"]
+    assert all(elapsed >= 0.25 for _, elapsed in finished)
+    # The new caller queues behind the three reservations instead of sharing their slots
+    assert finished[-1][1] >= 0.4
+
+
+def test_concurrency_limit_caps_in_flight_calls():
+    limiter = ProducerLimiter(**{**DEFAULTS, "initial_concurrency": 2, "max_concurrency": 2})
+    in_flight = peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200)
+
+    async def run_all():
+        await asyncio.gather(*(limiter.run(call) for _ in range(8)))
+
+    asyncio.run(run_all())
+    assert peak == 2
+    assert limiter.snapshot()["requests"] == 8
+
+
+def test_aimd_grows_on_success_and_halves_once_per_overload():
+    limiter = ProducerLimiter(**{**DEFAULTS, "initial_concurrency": 8})
+
+    async def scenario():
+        for _ in range(8):
+            await limiter.run(responder(200))
+        grown = limiter.concurrency.limit
+        # Eight overlapping 503s are one overload episode
+        await asyncio.gather(*(limiter.run(responder(503, 0.01)) for _ in range(8)))
+        return grown
+
+    grown = asyncio.run(scenario())
+    assert grown > 8
+    assert limiter.concurrency.limit == grown / 2
+    assert limiter.concurrency.decreases == 1
+    assert limiter.snapshot()["failures"] == 8
+
+
+def test_slow_responses_reduce_concurrency():
+    concurrency = AdaptiveConcurrency(10, 1, 20, latency_tolerance=2.0, latency_floor=0.0)
+
+    async def scenario():
+        for latency in (0.001, 0.001, 0.05):
+            started = await concurrency.acquire()
+            await asyncio.sleep(latency)
+            await concurrency.release(started, overloaded=False)
+
+    asyncio.run(scenario())
+    assert concurrency.decreases == 1
+    assert concurrency.limit < 10
+
+
+def test_throttled_response_pauses_rate_limit():
+    limiter = ProducerLimiter(**{**DEFAULTS, "rate": 100, "burst": 10})
+
+    async def scenario():
+        await limiter.run(responder(429, headers={"Retry-After": "0.2"}))
+        start = time.monotonic()
+        await limiter.run(responder(200))
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) >= 0.15
+    assert limiter.snapshot()["throttled"] == 1
+
+
+def test_registry_applies_per_apipath_overrides():
+    registry = LimiterRegistry(DEFAULTS, overrides={"/slow": {"rate": 5, "max_concurrency": 2}}, max_entries=2)
+
+    assert registry.get("/slow").bucket.rate == 5
+    assert registry.get("/slow").concurrency.max_limit == 2
+    assert registry.get("/fast").bucket.rate == 0
+    assert registry.get("/slow") is registry.get("/slow")
+
+    registry.get("/other")
+    assert set(registry.snapshot()) == {"/slow", "/other"}
+
+
+def test_registry_rejects_unknown_override_settings():
+    with pytest.raises(ValueError, match="max_concurency"):
+        LimiterRegistry(DEFAULTS, overrides={"/slow": {"rate": 5, "max_concurency": 2}})
+    with pytest.raises(ValueError, match="/slow"):
+        LimiterRegistry(DEFAULTS, overrides={"/slow": 5})
@@ -0,0 +1,348 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.auth.auth import authenticate_user
+from app.config import Config
+from app.db.outbox import DEAD, DELIVERED, IN_FLIGHT, PENDING, ProducerOutbox, backoff_delay
+from app.main import app
+from app.routes import producer
+from app.services import http_client
+from app.services.limiter import LimiterRegistry
+from app.tests.test_client import client
+
+
+@pytest.fixture
+def producer_api(monkeypatch):
+    """Points the producer route at a mock API; returns the list of requests it received."""
+    received = []
+
+    def handler(request):
+        received.append(request)
+        if request.url.path == "/fail":
+            return httpx.Response(502, text="bad gateway")
+        if request.url.path == "/unavailable":
+            return httpx.Response(503, text="unavailable")
+        if request.url.path == "/invalid":
+            return httpx.Response(400, text="invalid payload")
+        if request.url.path == "/accepted":
+            return httpx.Response(202, text="queued")
+        if request.url.path == "/no-content":
+            return httpx.Response(204)
+        return httpx.Response(200, json={"ok": True})
+
+    monkeypatch.setattr(producer, "PRODUCER_API_URL", "http://producer.test")
+    monkeypatch.setattr(producer, "PRODUCER_API_KEY", "key")
+    monkeypatch.setattr(http_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(producer, "producer_limits", LimiterRegistry(producer.producer_limits.defaults))
+    return received
+
+
+def test_send_uses_shared_client(producer_api):
+    shared = http_client.get_http_client()
+
+    for _ in range(2):
+        response = client.post("/api/producer/send", json={"apipath": "/events", "payload": {"a": 1}})
+        assert response.status_code == 200
+        assert response.json() == {"status": "success", "detail": {"ok": True}}
+
+    assert http_client.get_http_client() is shared
+    assert [str(r.url) for r in producer_api] == ["http://producer.test/events"] * 2
+    assert producer_api[0].headers["ride-api-key"] == "key"
+
+
+def test_send_passes_through_upstream_errors(producer_api):
+    response = client.post("/api/producer/send", json={"apipath": "/fail", "payload": {}})
+    assert response.status_code == 502
+    assert response.json()["detail"] == "bad gateway"
+
+
+def test_create_http_client_applies_config(monkeypatch):
+    monkeypatch.setattr(http_client.Config, "HTTP_CLIENT_CONNECT_TIMEOUT", 2.0)
+    monkeypatch.setattr(http_client.Config, "HTTP_CLIENT_READ_TIMEOUT", 7.0)
+
+    created = http_client.create_http_client()
+    assert created.timeout.connect == 2.0
+    assert created.timeout.read == 7.0
+
+
+def batch_lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_send_batch_streams_every_result(producer_api, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, authenticate_user, lambda: {})
+    items = [{"apipath": "/fail" if i == 3 else f"/events/{i}", "payload": {"i": i}} for i in range(10)]
+
+    response = client.post("/api/producer/send-batch", json={"items": items, "concurrency": 4})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    *results, summary = batch_lines(response)
+    assert sorted(r["index"] for r in results) == list(range(10))
+    assert [r for r in results if r["status"] == "error"] == [
+        {"type": "result", "index": 3, "apipath": "/fail", "status": "error", "status_code": 502, "detail": "bad gateway"}
+    ]
+    assert summary == {"type": "summary", "total": 10, "success": 9, "error": 1, "skipped": 0, "stopped": False}
+    assert len(producer_api) == 10
+
+
+def test_send_batch_stops_on_first_failure(producer_api, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, authenticate_user, lambda: {})
+    items = [{"apipath": "/fail" if i == 1 else "/events", "payload": {}} for i in range(10)]
+
+    response = client.post("/api/producer/send-batch", json={"items": items, "concurrency": 1, "stop_on_failure": True})
+
+    *results, summary = batch_lines(response)
+    assert [(r["index"], r["status"]) for r in results] == [(0, "success"), (1, "error")] + [(i, "skipped") for i in range(2, 10)]
+    assert summary["stopped"] is True
+    assert summary["skipped"] == 8
+    assert len(producer_api) == 2
+
+
+def test_send_batch_limits_concurrency(monkeypatch):
+    in_flight = peak = 0
+
+    async def slow_send(data):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {}
+
+    monkeypatch.setattr(producer, "post_to_producer", slow_send)
+    monkeypatch.setattr(Config, "PRODUCER_BATCH_CONCURRENCY", 3)
+    batch = producer.ProducerBatch(items=[{"apipath": "/e", "payload": {}}] * 20, concurrency=50)
+
+    async def consume():
+        return [line async for line in producer.stream_batch(batch, 3)]
+
+    lines = asyncio.run(consume())
+    assert len(lines) == 21
+    assert peak == 3
+
+
+def test_send_batch_rejects_oversized_batch(producer_api, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, authenticate_user, lambda: {})
+    monkeypatch.setattr(Config, "PRODUCER_BATCH_MAX_ITEMS", 2)
+
+    response = client.post("/api/producer/send-batch", json={"items": [{"apipath": "/e", "payload": {}}] * 3})
+    assert response.status_code == 400
+
+
+class MemoryOutbox(ProducerOutbox):
+    """In-memory stand-in for the producer_outbox collection."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def ensure_indexes(self, delivered_retention=None):
+        pass
+
+    async def enqueue(self, key, apipath, payload):
+        if key in self.docs:
+            return {**self.docs[key], "duplicate": True}
+        self.docs[key] = {"_id": key, "apipath": apipath, "payload": payload, "status": PENDING, "attempts": 0,
+                          "next_attempt_at": 0, "last_error": None}
+        return {**self.docs[key], "duplicate": False}
+
+    async def claim(self, lease):
+        doc = next((doc for doc in self.docs.values() if doc["status"] == PENDING and doc["next_attempt_at"] <= 0), None)
+        if doc is None:
+            return None
+        doc.update(status=IN_FLIGHT, attempts=doc["attempts"] + 1, claim_id=f"{doc['_id']}-{doc['attempts'] + 1}")
+        return dict(doc)
+
+    async def mark_delivered(self, key, claim_id, response=None):
+        if self.docs[key].get("claim_id") != claim_id:
+            return False
+        self.docs[key].update(status=DELIVERED, response=response, claim_id=None)
+        return True
+
+    async def mark_failed(self, key, claim_id, error, retry_in):
+        if self.docs[key].get("claim_id") != claim_id:
+            return False
+        # Retries are scheduled in the future, so the next claim in the same pass skips them
+        self.docs[key].update(last_error=error, status=DEAD if retry_in is None else PENDING, next_attempt_at=1, claim_id=None)
+        return True
+
+    async def get(self, key):
+        return self.docs.get(key)
+
+
+@pytest.fixture
+def outbox(producer_api, monkeypatch):
+    memory = MemoryOutbox()
+    monkeypatch.setattr(producer, "producer_outbox", memory)
+    return memory
+
+
+def test_outbox_send_queues_once_per_idempotency_key(outbox, monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, authenticate_user, lambda: {})
+    for _ in range(2):
+        response = client.post(
+            "/api/producer/outbox",
+            json={"apipath": "/events", "payload": {"a": 1}},
+            headers={"Idempotency-Key": "evt-1"}
+        )
+        assert response.status_code == 202
+        assert response.json()["id"] == "evt-1"
+
+    assert response.json()["duplicate"] is True
+    assert list(outbox.docs) == ["evt-1"]
+    assert outbox.docs["evt-1"]["status"] == PENDING
+
+
+def test_outbox_send_requires_auth_and_a_bounded_key(outbox, monkeypatch):
+    item = {"apipath": "/events", "payload": {}}
+    assert client.post("/api/producer/outbox", json=item).status_code in (401, 403)
+
+    monkeypatch.setitem(app.dependency_overrides, authenticate_user, lambda: {})
+    for key in ("x" * 129, "../evt 1"):
+        assert client.post("/api/producer/outbox", json=item, headers={"Idempotency-Key": key}).status_code == 422
+    assert outbox.docs == {}
+
+
+def test_dispatch_outbox_delivers_retries_and_dead_letters(outbox, producer_api, monkeypatch):
+    monkeypatch.setattr(Config, "OUTBOX_MAX_ATTEMPTS", 2)
+    asyncio.run(outbox.enqueue("ok", "/events", {}))
+    asyncio.run(outbox.enqueue("down", "/unavailable", {}))
+    asyncio.run(outbox.enqueue("rejected", "/invalid", {}))
+
+    asyncio.run(producer.dispatch_outbox())
+
+    assert outbox.docs["ok"]["status"] == DELIVERED
+    assert outbox.docs["ok"]["response"] == {"ok": True}
+    # 503 is retried later, 400 will never succeed
+    assert outbox.docs["down"]["status"] == PENDING
+    assert outbox.docs["down"]["last_error"].startswith("HTTP 503")
+    assert outbox.docs["rejected"]["status"] == DEAD
+    assert producer_api[0].headers["Idempotency-Key"] == "ok"
+
+    outbox.docs["down"]["next_attempt_at"] = 0
+    asyncio.run(producer.dispatch_outbox())
+    assert outbox.docs["down"]["status"] == DEAD
+    assert outbox.docs["down"]["attempts"] == 2
+
+
+def test_dispatch_outbox_claims_one_entry_per_free_worker(outbox, producer_api, monkeypatch):
+    monkeypatch.setattr(Config, "OUTBOX_CONCURRENCY", 2)
+    for i in range(5):
+        asyncio.run(outbox.enqueue(f"evt-{i}", "/events", {}))
+    claimed = peak = 0
+
+    async def slow_post(data, idempotency_key=None):
+        nonlocal peak
+        peak = max(peak, claimed)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    claim = outbox.claim
+
+    async def counting_claim(lease):
+        nonlocal claimed
+        entry = await claim(lease)
+        claimed += entry is not None
+        return entry
+
+    async def counting_mark(key, claim_id, response=None):
+        nonlocal claimed
+        claimed -= 1
+        return await MemoryOutbox.mark_delivered(outbox, key, claim_id, response)
+
+    monkeypatch.setattr(producer, "post_to_producer", slow_post)
+    monkeypatch.setattr(outbox, "claim", counting_claim)
+    monkeypatch.setattr(outbox, "mark_delivered", counting_mark)
+    asyncio.run(producer.dispatch_outbox())
+
+    assert all(doc["status"] == DELIVERED for doc in outbox.docs.values())
+    # No entry waits on a lease while others are sent
+    assert peak == 2
+
+
+def test_outbox_outcome_needs_the_current_claim(outbox):
+    asyncio.run(outbox.enqueue("evt-1", "/events", {}))
+    stale = asyncio.run(outbox.claim(lease=120))
+    # The lease ran out and another worker took the entry over
+    outbox.docs["evt-1"].update(status=PENDING)
+    current = asyncio.run(outbox.claim(lease=120))
+
+    assert asyncio.run(outbox.mark_delivered("evt-1", stale["claim_id"])) is False
+    assert outbox.docs["evt-1"]["status"] == IN_FLIGHT
+    assert asyncio.run(outbox.mark_delivered("evt-1", current["claim_id"])) is True
+
+
+class RecordingCollection:
+    """Records the query documents ProducerOutbox sends to Mongo."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def find_one_and_update(self, query, update, **options):
+        self.calls.append(("find_one_and_update", query, update, options))
+        return {"_id": "evt-1", **update["$set"]}
+
+    async def update_one(self, query, update):
+        self.calls.append(("update_one", query, update))
+        return SimpleNamespace(matched_count=1)
+
+
+def test_outbox_claim_and_outcomes_are_conditional_on_the_claim_id():
+    collection = RecordingCollection()
+    outbox = ProducerOutbox({"producer_outbox": collection})
+
+    entry = asyncio.run(outbox.claim(lease=120))
+    asyncio.run(outbox.mark_delivered("evt-1", entry["claim_id"], {"ok": True}))
+    asyncio.run(outbox.mark_failed("evt-1", entry["claim_id"], "HTTP 503", retry_in=5))
+
+    _, due, update, options = collection.calls[0]
+    now = update["$set"]["updated_at"]
+    assert due == {"$or": [
+        {"status": PENDING, "next_attempt_at": {"$lte": now}},
+        {"status": IN_FLIGHT, "lease_until": {"$lt": now}}
+    ]}
+    assert update["$set"]["status"] == IN_FLIGHT
+    assert (update["$set"]["lease_until"] - now).total_seconds() == 120
+    assert update["$inc"] == {"attempts": 1}
+    assert options["sort"] == [("next_attempt_at", 1)]
+
+    for _, query, outcome in collection.calls[1:]:
+        assert query == {"_id": "evt-1", "claim_id": entry["claim_id"]}
+        assert outcome["$unset"] == {"lease_until": "", "claim_id": ""}
+    assert [outcome["$set"]["status"] for _, _, outcome in collection.calls[1:]] == [DELIVERED, PENDING]
+
+    # Every claim gets a token of its own
+    assert asyncio.run(outbox.claim(lease=120))["claim_id"] != entry["claim_id"]
+
+
+def test_outbox_entry_with_non_json_reply_is_delivered_once(outbox, producer_api):
+    asyncio.run(outbox.enqueue("text", "/accepted", {}))
+    asyncio.run(outbox.enqueue("empty", "/no-content", {}))
+
+    asyncio.run(producer.dispatch_outbox())
+
+    assert outbox.docs["text"]["status"] == DELIVERED
+    assert outbox.docs["text"]["response"] == "queued"
+    assert outbox.docs["empty"]["status"] == DELIVERED
+    assert outbox.docs["empty"]["response"] is None
+    assert len(producer_api) == 2
+
+
+def test_only_transport_throttling_and_server_errors_are_retryable():
+    def status_error(status):
+        response = httpx.Response(status, request=httpx.Request("POST", "http://producer.test"))
+        return httpx.HTTPStatusError("error", request=response.request, response=response)
+
+    assert producer.is_retryable(httpx.ConnectError("refused"))
+    assert producer.is_retryable(status_error(429)) and producer.is_retryable(status_error(503))
+    assert not producer.is_retryable(status_error(400))
+    assert not producer.is_retryable(ValueError("bad body"))
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(1, 5, 900) <= 5 for _ in range(20))
+    assert all(0 <= backoff_delay(20, 5, 900) <= 900 for _ in range(20))
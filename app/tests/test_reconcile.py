@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from app.ftp.reconcile import ReportReconciler
+
+
+class MockCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class MockCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        wanted = set(query["eventid"]["$in"])
+        return MockCursor([d for d in self.docs if d["eventid"] in wanted])
+
+
+async def records(rows):
+    for index, fields in enumerate(rows):
+        yield {"record": index, "line": index + 1, "fields": fields, "raw": "|".join(fields)}
+
+
+def run(reconciler, rows):
+    async def collect():
+        return [r async for r in reconciler.reconcile(records(rows))]
+    return asyncio.run(collect())
+
+
+def test_reconcile_classifies_records_in_batches():
+    db = {
+        "mainstaging": MockCollection([
+            {"eventid": 1, "payloadstr": json.dumps({"ticket_number": "T1"})},
+            {"eventid": "2", "payloadstr": json.dumps({"ticket_number": "OTHER"})},
+        ]),
+        "errortable": MockCollection([{"eventid": "3"}]),
+        "errorstaging": MockCollection([]),
+    }
+    reconciler = ReportReconciler(db=db, batch_size=2)
+
+    results = run(reconciler, [["TICKET_NO", "EVENTID"], ["T1", "1"], ["T2", "2"], ["T3", "3"], ["T4", "4"], ["T5", ""]])
+
+    assert [r["status"] for r in results] == ["matched", "mismatched", "mismatched", "missing", "unparsed"]
+    assert results[2]["reasons"] == ["Not in mainstaging", "In errortable"]
+    assert reconciler.summary == {"records": 5, "header": True, "matched": 1, "missing": 1, "mismatched": 2, "unparsed": 1}
+    assert len(db["mainstaging"].queries) == 2
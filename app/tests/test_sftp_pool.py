@@ -0,0 +1,166 @@
+import asyncio
+
+import paramiko
+import pytest
+
+from app.ftp.breaker import CircuitBreaker, CircuitOpenError
+from app.ftp.folders import FolderManager
+from app.ftp.pool import SFTPPool
+
+
+class MockFTPUtil:
+    host = "localhost"
+    port = 22
+
+    def __init__(self):
+        self.connected = False
+
+    def acquire_sftp_channel(self):
+        self.connected = True
+
+    def release_sftp_channel(self):
+        self.connected = False
+
+    def is_alive(self):
+        return self.connected
+
+    def ping(self):
+        return self.connected
+
+
+def test_pool_reuses_released_connection():
+    pool = SFTPPool(MockFTPUtil, max_size=2)
+
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert pool.stats()["created"] == 1
+    assert pool.stats()["reused"] == 1
+
+
+def test_pool_discards_connection_on_transport_error():
+    pool = SFTPPool(MockFTPUtil, max_size=1)
+
+    with pytest.raises(paramiko.SSHException):
+        with pool.connection() as ftputil:
+            raise paramiko.SSHException("connection reset")
+
+    assert not ftputil.connected
+    assert pool.stats() == {"max_size": 1, "idle": 0, "in_use": 0, "created": 1, "reused": 0, "discarded": 1}
+
+
+def test_pool_replaces_dead_idle_connection():
+    pool = SFTPPool(MockFTPUtil, max_size=1)
+
+    first = pool.acquire()
+    pool.release(first)
+    first.connected = False
+
+    assert pool.acquire() is not first
+
+
+def test_pool_times_out_when_exhausted():
+    pool = SFTPPool(MockFTPUtil, max_size=1, acquire_timeout=0.01)
+    pool.acquire()
+
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+
+def test_pool_refuses_to_block_the_event_loop():
+    pool = SFTPPool(MockFTPUtil, max_size=1)
+
+    async def acquire_on_loop():
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    asyncio.run(acquire_on_loop())
+    assert pool.stats()["in_use"] == 0
+
+
+def test_connection_errors_exclude_per_request_failures():
+    from app.ftp.pool import CONNECTION_ERRORS
+
+    assert not issubclass(FileNotFoundError, CONNECTION_ERRORS)
+    assert not issubclass(PermissionError, CONNECTION_ERRORS)
+    assert issubclass(paramiko.SSHException, CONNECTION_ERRORS)
+
+
+def test_evict_idle_closes_expired_connections():
+    pool = SFTPPool(MockFTPUtil, max_size=1, idle_timeout=0)
+    ftputil = pool.acquire()
+    pool.release(ftputil)
+    ftputil.last_used -= 1
+
+    assert pool.evict_idle() == 1
+    assert not ftputil.connected
+
+
+class MockFolderSFTP:
+    def __init__(self, existing):
+        self.existing = set(existing)
+        self.calls = []
+
+    def stat(self, path):
+        self.calls.append(("stat", path))
+        if path not in self.existing:
+            raise FileNotFoundError(path)
+
+    def mkdir(self, path):
+        self.calls.append(("mkdir", path))
+        self.existing.add(path)
+
+
+def test_folder_manager_creates_missing_depth_once():
+    folders = FolderManager()
+    sftp = MockFolderSFTP({"/dev"})
+
+    folders.ensure(sftp, "/dev/primerecon/2024/10")
+    folders.ensure(sftp, "/dev/primerecon/2024/10")
+    folders.ensure(sftp, "/dev/primerecon")
+
+    assert [c for c in sftp.calls if c[0] == "mkdir"] == [
+        ("mkdir", "/dev/primerecon"), ("mkdir", "/dev/primerecon/2024"), ("mkdir", "/dev/primerecon/2024/10")
+    ]
+    assert len(sftp.calls) == 7
+
+
+def test_folder_manager_forgets_subtree():
+    folders = FolderManager()
+    folders.ensure(MockFolderSFTP({"/dev/primerecon/2024"}), "/dev/primerecon/2024")
+
+    folders.forget("/dev/primerecon")
+
+    assert folders.is_verified("/dev")
+    assert not folders.is_verified("/dev/primerecon")
+    assert not folders.is_verified("/dev/primerecon/2024")
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("sftp", failure_threshold=2, reset_timeout=30)
+
+    breaker.record_failure(TimeoutError("connect"))
+    breaker.check()
+    breaker.record_failure(TimeoutError("connect"))
+
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.check()
+    assert 0 < excinfo.value.retry_after <= 30
+    assert not breaker.probe_due()
+
+
+def test_breaker_probe_closes_or_reopens():
+    breaker = CircuitBreaker("sftp", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure(EOFError())
+    assert breaker.probe_due()
+
+    breaker.start_probe()
+    breaker.record_failure(EOFError())
+    assert breaker.state == "open"
+
+    breaker.start_probe()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.check()
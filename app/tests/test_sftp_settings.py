@@ -0,0 +1,44 @@
+import base64
+import io
+
+import paramiko
+import pytest
+
+from app.ftp.settings import SFTPConfigError, SFTPSettings
+
+
+@pytest.fixture
+def sftp_env(monkeypatch):
+    monkeypatch.setenv("PRIME_SFTP_SERVER", "sftp.example.com")
+    monkeypatch.setenv("PRIME_SFTP_USER", "ride")
+    monkeypatch.setenv("PRIME_SFTP_PASS", "secret")
+    monkeypatch.setenv("ENV", "LOCAL")
+    monkeypatch.delenv("PRIME_SFTP_PRIV_KEY_FILE", raising=False)
+    monkeypatch.delenv("PRIME_SFTP_PUB_KEY_FILE", raising=False)
+    monkeypatch.delenv("PRIME_SFTP_SERVER_PORT", raising=False)
+    return monkeypatch
+
+
+def test_settings_parse_private_key_once(sftp_env):
+    key_io = io.StringIO()
+    paramiko.RSAKey.generate(1024).write_private_key(key_io)
+    sftp_env.setenv("PRIME_SFTP_PRIV_KEY_FILE", base64.b64encode(key_io.getvalue().encode()).decode())
+
+    settings = SFTPSettings.from_env()
+
+    assert isinstance(settings.private_key, paramiko.RSAKey)
+    assert (settings.host, settings.port, settings.user) == ("sftp.example.com", 22, "ride")
+
+
+def test_settings_reject_broken_key(sftp_env):
+    sftp_env.setenv("PRIME_SFTP_PRIV_KEY_FILE", base64.b64encode(b"not a key").decode())
+
+    with pytest.raises(SFTPConfigError):
+        SFTPSettings.from_env()
+
+
+def test_settings_reject_bad_port(sftp_env):
+    sftp_env.setenv("PRIME_SFTP_SERVER_PORT", "twenty-two")
+
+    with pytest.raises(SFTPConfigError):
+        SFTPSettings.from_env()
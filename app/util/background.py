@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def start_periodic_task(name: str, interval: float, func: Callable[[], Awaitable], initial_delay: float = 0,
+                        wake: Optional[asyncio.Event] = None) -> asyncio.Task:
+    """
+    Run ``func`` every ``interval`` seconds on the event loop until the task is cancelled.
+
+    Failures are logged and the loop carries on, so a transient outage never stops the job.
+    Setting ``wake`` runs the job early instead of waiting out the interval.
+    """
+    async def runner():
+        if initial_delay:
+            await asyncio.sleep(initial_delay)
+        while True:
+            try:
+                await func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Background task '{name}' failed: {e}")
+            await sleep_or_wake(interval, wake)
+
+    logger.info(f"Starting background task '{name}' (every {interval}s)")
+    return asyncio.create_task(runner(), name=name)
+
+
+async def sleep_or_wake(interval: float, wake: Optional[asyncio.Event]) -> None:
+    if wake is None:
+        await asyncio.sleep(interval)
+        return
+    try:
+        await asyncio.wait_for(wake.wait(), interval)
+    except asyncio.TimeoutError:
+        pass
+    wake.clear()
+
+
+async def cancel_tasks(tasks: Iterable[asyncio.Task]) -> None:
+    """Cancel background tasks and wait for them to finish."""
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
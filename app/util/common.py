@@ -1,3 +1,5 @@
+import json
+
 from bson import ObjectId
 
 
@@ -6,3 +8,8 @@ def clean_mongo_doc(doc):
     if "_id" in doc and isinstance(doc["_id"], ObjectId):
         doc["_id"] = str(doc["_id"])
     return doc
+
+
+def ndjson(item: dict) -> bytes:
+    """Encode one line of a newline-delimited JSON stream."""
+    return (json.dumps(item, default=str) + "\n").encode()